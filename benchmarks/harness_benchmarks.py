@@ -0,0 +1,338 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Benchmarks of the cost of the test harness: the time and the number of REST calls to build (open) and
+tear down (close) a test, and the round trip time of a run, as the number of inputs and outputs, the size
+of the base process group and the payload grow. By default the benchmarks run against the in-process
+fake nifi (see nipytest.fake_nifi), with a fixed latency per REST call, so the results count calls rather
+than the speed of a particular nifi
+
+Results are written as json, to compare between commits:
+    python -m benchmarks.harness_benchmarks --output before.json
+    python -m benchmarks.harness_benchmarks --output after.json --compare before.json
+"""
+import argparse
+import json
+import logging
+import platform
+import socket
+import statistics as stats
+import subprocess
+import sys
+import time
+
+from nipyapi import canvas, config, nifi
+from nipytest import canvas_extension as canvas_ext
+from nipytest import instrumentation
+from nipytest.canvas_navigator import CanvasNavigator
+from nipytest.fake_nifi import FakeNifi
+from nipytest.flow_plan import FlowPlan
+from nipytest.models.flowfile import FlowFile
+from nipytest.models.location import Location
+from nipytest.test_1_to_1 import Test1To1
+from nipytest.test_1_to_n import Test1ToN
+
+# Harness classes that can be benchmarked, by name
+HARNESSES: dict = {"Test1To1": Test1To1, "Test1ToN": Test1ToN}
+
+# Name of the process group the benchmark flows are created in
+BASE_NAME: str = "nipytest_benchmark"
+
+# Type of the processors of the benchmark flows; passes its flowfiles on unchanged
+PROCESSOR_TYPE: str = "org.apache.nifi.processors.standard.DebugFlow"
+
+# Maximum number of concurrent requests while creating the benchmark flows
+SETUP_WORKERS: int = 8
+
+# Phase of the calls made while posting the runs; should be none
+RUN_PHASE: str = "run"
+
+# Build and teardown durations and call counts compared by --compare
+COMPARED: tuple = ("build_s", "teardown_s", "build_calls", "teardown_calls")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the nipytest harness")
+    parser.add_argument("--harness", default="Test1To1,Test1ToN",
+                        help="Comma separated harnesses to benchmark: " + ", ".join(HARNESSES))
+    parser.add_argument("--endpoints", default="1,4,16",
+                        help="Comma separated numbers of inputs (and as many outputs) to register")
+    parser.add_argument("--base-sizes", default="0,100",
+                        help="Comma separated numbers of processors in the base process group besides the "
+                             "flows under test")
+    parser.add_argument("--payloads", default="1024,1048576", help="Comma separated payload sizes in bytes")
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs per payload size")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of builds and teardowns per case")
+    parser.add_argument("--latency", type=float, default=0.002,
+                        help="Seconds every REST call to the fake nifi is delayed")
+    parser.add_argument("--no-template", action="store_true",
+                        help="Create the test components one by one instead of from a template")
+    parser.add_argument("--nifi", help="Url of a real nifi api to use instead of the fake, "
+                                       "e.g. http://localhost:8080/nifi-api")
+    parser.add_argument("--port", type=int, default=0,
+                        help="Port of the HandleHttpRequest; by default a free port with the fake nifi, "
+                             "and 8081 with --nifi")
+    parser.add_argument("--output", help="File to write the results to as json")
+    parser.add_argument("--compare", help="Results of an earlier benchmark to compare with")
+    args = parser.parse_args(argv)
+
+    # The build issues more concurrent calls than nipyapi keeps connections for; not relevant for the results
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
+
+    settings = {
+        "harnesses": _list(args.harness, str),
+        "endpoints": _list(args.endpoints, int),
+        "base_sizes": _list(args.base_sizes, int),
+        "payloads": _list(args.payloads, int),
+        "runs": args.runs,
+        "repeat": args.repeat,
+        "latency": None if args.nifi else args.latency,
+        "use_template": not args.no_template,
+        "nifi": args.nifi or "fake"
+    }
+    for name in settings["harnesses"]:
+        assert name in HARNESSES, "Unknown harness: " + name
+
+    if args.nifi:
+        config.nifi_config.host = args.nifi
+        config.nifi_config.api_client = None
+        results = run_benchmarks(settings, args.port or 8081)
+    else:
+        with FakeNifi(latency=args.latency) as fake:
+            fake.configure()
+            results = run_benchmarks(settings, args.port)
+
+    report = {
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "settings": settings,
+        "results": results
+    }
+    print(format_results(results))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            print()
+            print(format_comparison(json.load(file)["results"], results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+def run_benchmarks(settings, port):
+    """
+    Runs all cases: every harness with every number of endpoints and every base size
+
+    Args:
+        settings (dict): The settings, see main
+        port (int): Port of the HandleHttpRequest; a free port when 0
+
+    Returns:
+        (list of dict): The result of every case, see run_case
+    """
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.enable()
+    try:
+        results = []
+        for base_size in settings["base_sizes"]:
+            for endpoints in settings["endpoints"]:
+                base, inputs, outputs = create_base(endpoints, base_size)
+                try:
+                    for name in settings["harnesses"]:
+                        results.append(run_case(HARNESSES[name], base, inputs, outputs, base_size, settings,
+                                                port or _free_port()))
+                        print("Done: %s, %d endpoints, base size %d" % (name, endpoints, base_size),
+                              file=sys.stderr)
+                finally:
+                    canvas.delete_process_group(canvas.get_process_group(base.id, 'id'), force=True)
+        return results
+    finally:
+        if not was_enabled:
+            instrumentation.disable()
+
+
+def create_base(endpoints, base_size):
+    """
+    Creates a base process group with a flow under test per endpoint: input -> output -> end, and
+        base_size other processors in pairs
+
+    Args:
+        endpoints (int): Number of flows under test
+        base_size (int): Number of other processors
+
+    Returns:
+        (ProcessGroupEntity, list of ProcessorEntity, list of ProcessorEntity): The base process group,
+            the inputs and the outputs
+    """
+    nav = CanvasNavigator()
+    for pg in nav.groups(BASE_NAME):
+        canvas.delete_process_group(pg, force=True)
+    base = canvas.create_process_group(nav.current, BASE_NAME, (0, 0))
+
+    plan = FlowPlan()
+    location = Location()
+    for i in range(endpoints):
+        plan.add_processor("in:%d" % i, _processor(location, "Input %d" % i))
+        plan.add_processor("out:%d" % i, _processor(location, "Output %d" % i))
+        plan.add_processor("end:%d" % i, _processor(location, "End %d" % i, ["success", "failure"]))
+        plan.connect("in:%d" % i, "out:%d" % i, ["success", "failure"])
+        plan.connect("out:%d" % i, "end:%d" % i, ["success", "failure"])
+    for i in range(0, base_size, 2):
+        plan.add_processor("other:%d" % i, _processor(location, "Other %d" % i))
+        plan.add_processor("other:%d" % (i + 1), _processor(location, "Other %d" % (i + 1), ["success", "failure"]))
+        plan.connect("other:%d" % i, "other:%d" % (i + 1), ["success", "failure"])
+    created = canvas_ext.create_plan(base, plan, SETUP_WORKERS)
+    canvas.schedule_process_group(base.id, True)
+
+    inputs = [created["in:%d" % i] for i in range(endpoints)]
+    outputs = [created["out:%d" % i] for i in range(endpoints)]
+    return base, inputs, outputs
+
+
+def run_case(harness_class, base, inputs, outputs, base_size, settings, port):
+    """
+    Builds and tears down a test with all inputs and outputs registered, and posts runs of every
+        payload size to the first input while it is open
+
+    Returns:
+        (dict): The case and its results: build and teardown seconds and REST calls (medians over the
+            repeats), run round trip milliseconds per payload size, and the calls per phase and endpoint
+    """
+    builds, teardowns, build_calls, teardown_calls = [], [], [], []
+    runs = {}
+    profile = None
+    for _ in range(settings["repeat"]):
+        test = harness_class("benchmark", base, port=port, use_template=settings["use_template"])
+        for obj in inputs:
+            test.add_input(obj)
+        for obj in outputs:
+            test.add_output(obj)
+
+        instrumentation.profile.reset()
+        start = time.perf_counter()
+        test.open()
+        builds.append(time.perf_counter() - start)
+        try:
+            with instrumentation.phase(RUN_PHASE):
+                for payload in settings["payloads"]:
+                    test.statistics.reset()
+                    content = bytes(payload)
+                    for _ in range(settings["runs"]):
+                        output = test.run(inputs[0].component.name, FlowFile(content, {}))
+                        if isinstance(test, Test1ToN):
+                            output = list(output)
+                    runs.setdefault(payload, []).append(test.statistics.summary()["round_trip_ms"])
+        finally:
+            start = time.perf_counter()
+            test.close()
+            teardowns.append(time.perf_counter() - start)
+        phases = instrumentation.profile.phases()
+        build_calls.append(phases.get("build", {}).get("count", 0))
+        teardown_calls.append(phases.get("teardown", {}).get("count", 0))
+        profile = instrumentation.profile.entries()
+
+    return {
+        "harness": harness_class.__name__,
+        "endpoints": len(inputs),
+        "base_size": base_size,
+        "build_s": stats.median(builds),
+        "teardown_s": stats.median(teardowns),
+        "build_calls": stats.median(build_calls),
+        "teardown_calls": stats.median(teardown_calls),
+        "run_ms": {str(payload): {"p50": stats.median(summary["p50"] for summary in summaries),
+                                  "mean": stats.mean(summary["mean"] for summary in summaries)}
+                   for payload, summaries in runs.items()},
+        "calls": [{key: entry[key] for key in ("phase", "method", "endpoint", "count", "total_ms")}
+                  for entry in profile]
+    }
+
+
+def format_results(results):
+    """
+    Returns:
+        (str): The results as a table
+    """
+    payloads = sorted({int(payload) for result in results for payload in result["run_ms"]})
+    lines = ["%-10s%10s%10s%10s%8s%12s%8s" % ("harness", "endpoints", "base", "build s", "calls", "teardown s",
+                                              "calls")
+             + "".join("%14s" % ("run ms %s" % _size(payload)) for payload in payloads)]
+    for result in results:
+        lines.append("%-10s%10d%10d%10.3f%8d%12.3f%8d" % (
+            result["harness"], result["endpoints"], result["base_size"], result["build_s"], result["build_calls"],
+            result["teardown_s"], result["teardown_calls"])
+            + "".join("%14.3f" % result["run_ms"][str(payload)]["p50"] for payload in payloads))
+    return "\n".join(lines)
+
+
+def format_comparison(baseline, results):
+    """
+    Args:
+        baseline (list of dict): Results of an earlier benchmark
+        results (list of dict): Results to compare with the baseline
+
+    Returns:
+        (str): Table of the change of the build and teardown durations and calls of the cases in both
+    """
+    def key(result):
+        return result["harness"], result["endpoints"], result["base_size"]
+
+    earlier = {key(result): result for result in baseline}
+    lines = ["%-10s%10s%10s" % ("harness", "endpoints", "base") + "".join("%22s" % name for name in COMPARED)]
+    for result in results:
+        before = earlier.get(key(result))
+        if before is None:
+            continue
+        changes = []
+        for name in COMPARED:
+            change = "%s -> %s" % (_number(before[name]), _number(result[name]))
+            if before[name]:
+                change += " (%+.0f%%)" % ((result[name] - before[name]) / before[name] * 100)
+            changes.append("%22s" % change)
+        lines.append("%-10s%10d%10d" % key(result) + "".join(changes))
+    return "\n".join(lines)
+
+
+def _processor(location, name, auto_terminated_relationships=None):
+    location.x += 400
+    return nifi.ProcessorDTO(
+        type=PROCESSOR_TYPE,
+        name=name,
+        position=nifi.PositionDTO(x=location.x, y=location.y),
+        config=nifi.ProcessorConfigDTO(auto_terminated_relationships=auto_terminated_relationships)
+    )
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _list(value, cast):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def _size(size):
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024 or unit == "MB":
+            return "%g%s" % (size, unit)
+        size /= 1024
+
+
+def _number(value):
+    return "%.3f" % value if isinstance(value, float) else str(value)
+
+
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -5,61 +5,174 @@ Created on 20 Feb 2019
 
 Extension to the nipyapi canvas module, used to create the objects on the
 canvas to create the tests
+The *_component functions only describe an object; the create_* functions
+place it on the canvas. A FlowPlan of components can be created one by one
+with create_plan, or all at once from a template with instantiate_plan
 """
-from nipyapi import nifi, canvas
+import logging
+import os
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+
+from nipyapi import nifi, canvas, config, utils
+from nipyapi.nifi.rest import ApiException
+from nipytest import instrumentation
+from nipytest.revision_cache import cache as revisions
+from nipytest.flow_plan import FlowPlan
 from nipytest.models.location import Location
 
+logger = logging.getLogger("nipytest.canvas_extension")
+
+# Name of the port that connections to the test inputs are parked on, see parking_port_component
+PARKING_PORT_NAME: str = "Parked connections"
+
+# Maximum number of concurrent requests of delete_all_connections
+DEFAULT_DELETE_WORKERS: int = 8
+
+# Seconds between polls of the drop requests of purge_connections
+DROP_REQUEST_POLL_DELAY: float = 0.1
+
+
+def http_context_map_component(name):
+    """
+    Describes a StandardHttpContextMap
+
+    Args:
+        name (string): Name of the controller
+
+    Returns:
+        (ControllerServiceDTO)
+    """
+    assert isinstance(name, str)
+
+    return nifi.ControllerServiceDTO(
+        type="org.apache.nifi.http.StandardHttpContextMap",
+        name=name
+    )
+
 
 def create_http_context_map(parent_pg, name):
     """
     Creates and enables a StandardHttpContextMap
-    
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             controller
         name (string): Name of the controller
-        
+
     Returns:
         (ControllerServiceEntity)
     """
     assert isinstance(parent_pg, nifi.ProcessGroupEntity)
     assert isinstance(name, str)
 
-    http_context = nifi.ProcessGroupsApi().create_controller_service(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.http.StandardHttpContextMap",
-                name=name
-            )
-        )
-    )
+    http_context = _create_controller_service(parent_pg.component.id, http_context_map_component(name))
     # canvas.create_controller not working properly...
-    return nifi.ControllerServicesApi().update_controller_service(
-        id=http_context.component.id,
-        body=nifi.ControllerServiceEntity(
-            revision=nifi.RevisionDTO(version=1),
-            component=nifi.ControllerServiceDTO(
-                state="ENABLED",
-                id=http_context.component.id
+    return enable_controller_service(http_context)
+
+
+def enable_controller_service(controller_service):
+    """
+    Enables a controller service
+
+    Args:
+        controller_service (ControllerServiceEntity): The controller service to enable
+
+    Returns:
+        (ControllerServiceEntity)
+    """
+    assert isinstance(controller_service, nifi.ControllerServiceEntity)
+
+    def enable(revision):
+        return nifi.ControllerServicesApi().update_controller_service(
+            id=controller_service.component.id,
+            body=nifi.ControllerServiceEntity(
+                revision=revision,
+                component=nifi.ControllerServiceDTO(
+                    state="ENABLED",
+                    id=controller_service.component.id
+                )
             )
         )
+    return _with_latest_revision(controller_service, enable)
+
+
+def disable_controller_service(controller_service):
+    """
+    Disables a controller service, and waits until it is disabled
+
+    Args:
+        controller_service (ControllerServiceEntity): The controller service to disable
+
+    Returns:
+        (ControllerServiceEntity)
+    """
+    assert isinstance(controller_service, nifi.ControllerServiceEntity)
+
+    def disable(revision):
+        return nifi.ControllerServicesApi().update_run_status(
+            id=controller_service.component.id,
+            body=nifi.ControllerServiceRunStatusEntity(revision=revision, state="DISABLED")
+        )
+
+    def disabled_service():
+        entity = nifi.ControllerServicesApi().get_controller_service(controller_service.component.id)
+        return entity if entity.component.state == "DISABLED" else False
+
+    disabled = _with_latest_revision(controller_service, disable)
+    if disabled.component.state != "DISABLED":
+        disabled = utils.wait_to_complete(disabled_service)
+    return disabled
+
+
+def request_handler_component(location, http_context_id, port):
+    """
+    Describes a HandleHttpRequest connected to the Http controller service
+
+    Args:
+        location (Location): x,y coordinated to place the processor
+        http_context_id (str): Id of the StandardHttpContextMap to
+            connect the processor to
+        port (int): port number to use
+
+    Returns:
+        (ProcessorDTO)
+    """
+    assert isinstance(location, Location)
+    assert isinstance(http_context_id, str)
+    assert isinstance(port, int)
+
+    return nifi.ProcessorDTO(
+        type="org.apache.nifi.processors.standard.HandleHttpRequest",
+        name="Receive test message",
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        ),
+        config=nifi.ProcessorConfigDTO(
+            properties={
+                "HTTP Context Map": http_context_id,
+                "Listening Port": port
+            }
+        )
     )
 
 
 def create_request_handler(parent_pg, location, http_context, port):
     """
     Creates a HandleHttpRequest and connects it to the Http controller service
-    
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             processor
         location (Location): x,y coordinated to place the processor
         http_context (ControllerServiceEntity): StandardHttpContextMap to
             connect the processor to
         port (int): port number to use
-        
+
     Returns:
         (ProcessorEntity)
     """
@@ -69,32 +182,46 @@ def create_request_handler(parent_pg, location, http_context, port):
     assert isinstance(http_context, nifi.ControllerServiceEntity)
     assert isinstance(port, int)
 
-    return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.standard.HandleHttpRequest",
-                name="Receive test message",
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties={
-                        "HTTP Context Map": http_context.component.id,
-                        "Listening Port": port
-                    }
-                )
-            )
+    return _create_processor(parent_pg.component.id,
+                             request_handler_component(location, http_context.component.id, port))
+
+
+def input_attribute_component(location, name):
+    """
+    Describes a UpdateAttribute to register the test_start_time, the
+        test_input_name and the test_correlation_id of the request to the flowfile
+
+    Args:
+        location (Location): x,y coordinated to place the processor
+        name (string): Name of the processor
+
+    Returns:
+        (ProcessorDTO)
+    """
+    assert isinstance(location, Location)
+    assert isinstance(name, str)
+
+    return nifi.ProcessorDTO(
+        type="org.apache.nifi.processors.attributes.UpdateAttribute",
+        name=name,
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        ),
+        config=nifi.ProcessorConfigDTO(
+            properties={
+                "test_start_time": "${now():toNumber()}",
+                "test_input_name": "${http.headers.test_input_name}",
+                "test_correlation_id": "${http.headers.test_correlation_id}"
+            }
         )
     )
 
 
 def create_input_attribute(parent_pg, location, name):
     """
-    Creates a UpdateAttribute to register the test_start_time to the
-        flowfile
+    Creates a UpdateAttribute to register the test_start_time, the
+        test_input_name and the test_correlation_id of the request to the flowfile
 
     Args:
         parent_pg (ProcessGroupEntity): Target process group to place
@@ -110,23 +237,39 @@ def create_input_attribute(parent_pg, location, name):
     assert isinstance(location, Location)
     assert isinstance(name, str)
 
-    return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.attributes.UpdateAttribute",
-                name=name,
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties={
-                        "test_start_time": "${now():toNumber()}"
-                    }
-                )
-            )
+    return _create_processor(parent_pg.component.id, input_attribute_component(location, name))
+
+
+def input_router_component(location, input_names):
+    """
+    Describes a RouteOnAttribute, routing each different input
+    Only flow files with a matching http.headers.test_input_name attribute
+        will be routed to an (corresponding) input
+
+    Args:
+        location (Location): x,y coordinated to place the processor
+        input_names (list of str): names of the inputs; each is a relationship
+            of the router
+
+    Returns:
+        (ProcessorDTO)
+    """
+    assert isinstance(location, Location)
+
+    route_properties = {}
+    for input_name in input_names:
+        route_properties[input_name] = "${http.headers.test_input_name:equals('" + input_name + "')}"
+
+    return nifi.ProcessorDTO(
+        type="org.apache.nifi.processors.standard.RouteOnAttribute",
+        name="Route to correct input",
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        ),
+        config=nifi.ProcessorConfigDTO(
+            properties=route_properties,
+            auto_terminated_relationships=["unmatched"]
         )
     )
 
@@ -136,14 +279,14 @@ def create_input_router(parent_pg, location, test_inputs):
     Creates a RouteOnAttribute, routing each different input
     Only flow files with a matching http.headers.test_input_name attribute
         will be routed to an (corresponding) input
-    
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             processor
         location (Location): x,y coordinated to place the processor
         test_inputs (array of ProcessorEntity, InputPortEntity and OutputPortEntity):
             array of outputs for the router, routed to the different inputs
-        
+
     Returns:
         (ProcessorEntity)
     """
@@ -152,27 +295,30 @@ def create_input_router(parent_pg, location, test_inputs):
     assert isinstance(location, Location)
     #     assert isinstance(test_inputs, array)
 
-    route_properties = {}
-    for test_input in test_inputs:
-        route_properties[test_input.component.name] = "${http.headers.test_input_name:equals('" \
-                                                      + test_input.component.name + "')}"
+    input_names = [test_input.component.name for test_input in test_inputs]
+    return _create_processor(parent_pg.component.id, input_router_component(location, input_names))
 
-    return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.standard.RouteOnAttribute",
-                name="Route to correct input",
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties=route_properties,
-                    auto_terminated_relationships=["unmatched"]
-                )
-            )
+
+def test_input_component(location, name):
+    """
+    Describes a test input (as an output port in the test process
+        group)
+
+    Args:
+        location (Location): x,y coordinated to place the port
+        name (string): Name of the test input
+
+    Returns:
+        (PortDTO)
+    """
+    assert isinstance(location, Location)
+    assert isinstance(name, str)
+
+    return nifi.PortDTO(
+        name=name,
+        position=nifi.PositionDTO(
+            x=location.x + 50,
+            y=location.y
         )
     )
 
@@ -181,13 +327,13 @@ def create_test_input(parent_pg, location, name):
     """
     Creates a test input (as an output port in the test process
         group)
-    
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             processor
         location (Location): x,y coordinated to place the processor
         name (string): Name of the test input
-        
+
     Returns:
         (OutputPortEntity)
     """
@@ -196,17 +342,34 @@ def create_test_input(parent_pg, location, name):
     assert isinstance(location, Location)
     assert isinstance(name, str)
 
-    return nifi.ProcessGroupsApi().create_output_port(
-        id=parent_pg.component.id,
-        body=nifi.PortEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.PortDTO(
-                name=name,
-                position=nifi.PositionDTO(
-                    x=location.x + 50,
-                    y=location.y
-                )
-            )
+    return _create_output_port(parent_pg.component.id, test_input_component(location, name))
+
+
+def output_router_component(location, name):
+    """
+    Describes a RouteOnAttribute to filter all incoming messages from
+        the actual test results
+
+    Args:
+        location (Location): x,y coordinated to place the processor
+        name (string): Name of the test input
+
+    Returns:
+        (ProcessorDTO)
+    """
+    assert isinstance(location, Location)
+    assert isinstance(name, str)
+
+    return nifi.ProcessorDTO(
+        type="org.apache.nifi.processors.standard.RouteOnAttribute",
+        name="Filter only test messages",
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        ),
+        config=nifi.ProcessorConfigDTO(
+            properties={"test": "${http.request.uri:equals('/" + name + "')}"},
+            auto_terminated_relationships=["unmatched"]
         )
     )
 
@@ -214,14 +377,14 @@ def create_test_input(parent_pg, location, name):
 def create_output_router(parent_pg, location, name):
     """
     Creates a RouteOnAttribute to filter all incoming messages from
-        the actual test results 
-    
+        the actual test results
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             processor
         location (Location): x,y coordinated to place the processor
         name (string): Name of the test input
-        
+
     Returns:
         (ProcessorEntity)
     """
@@ -230,77 +393,75 @@ def create_output_router(parent_pg, location, name):
     assert isinstance(location, Location)
     assert isinstance(name, str)
 
-    return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.standard.RouteOnAttribute",
-                name="Filter only test messages",
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties={"test": "${http.request.uri:equals('/" + name + "')}"},
-                    auto_terminated_relationships=["unmatched"]
-                )
-            )
-        )
-    )
+    return _create_processor(parent_pg.component.id, output_router_component(location, name))
 
 
-def create_output_replacetext(parent_pg, location, name):
+def output_mergecontent_component(location, name, properties=None):
     """
-    Creates a ReplaceText to write attributes into the flowfile. When
-        we later merge the contents, we would otherwise lose the
-        attributes
+    Describes a MergeContent to combine flowfiles from different outputs.
+        Flowfiles are only merged with flowfiles of the same request, so
+        concurrent requests are answered separately. Flowfiles are packaged
+        with their attributes (FlowFile Stream v3), see flowfile_package
 
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place
-            processor
         location (Location): x,y coordinated to place the processor
         name (string): Name of the test input
+        properties (dict): Additional properties, e.g. the number of entries
+            to wait for (see mergecontent_entries_properties)
 
     Returns:
-        (ProcessorEntity)
+        (ProcessorDTO)
     """
-
-    assert isinstance(parent_pg, nifi.ProcessGroupEntity)
     assert isinstance(location, Location)
     assert isinstance(name, str)
+    assert properties is None or isinstance(properties, dict)
 
-    return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.standard.ReplaceText",
-                name="Merge flowfile and attributes",
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties={
-                        # "Search Value": "^(.*)$",
-                        "Replacement Value": "{\"flowfile\":\"$1\",\"attributes\":{" +
-                                             "\"test_start_time\":\"${test_start_time}\"," +
-                                             "\"test_end_time\":\"${test_end_time}\"," +
-                                             "\"test_duration\":\"${test_duration}\"," +
-                                             "\"test_input_name\":\"${http.headers.test_input_name}\"," +
-                                             "\"test_output_name\":\"${test_output_name}\"" +
-                                             "}}"
-                    },
-                    auto_terminated_relationships=["failure"]
-                )
-            )
+    return nifi.ProcessorDTO(
+        type="org.apache.nifi.processors.standard.MergeContent",
+        name="Merge outputs",
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        ),
+        config=nifi.ProcessorConfigDTO(
+            properties=dict({
+                "Merge Format": "FlowFile Stream, v3",
+                "Correlation Attribute Name": "http.context.identifier",
+                # One bin per request in flight; HandleHttpRequest queues at most 50 requests
+                "Maximum number of Bins": "50"
+            }, **(properties or {})),
+            auto_terminated_relationships=["failure", "original"]
         )
     )
 
+
+def mergecontent_entries_properties(number_entries, max_bin_age):
+    """
+    Properties of a MergeContent to wait for a number of flowfiles per bin, or for
+        a maximum time
+
+    Args:
+        number_entries (int): Number of flowfiles to merge
+        max_bin_age (float): Seconds after which a bin is merged with fewer flowfiles
+
+    Returns:
+        (dict)
+    """
+    assert isinstance(number_entries, int) and number_entries > 0
+
+    return {
+        "Minimum Number of Entries": str(number_entries),
+        "Maximum Number of Entries": str(number_entries),
+        "Max Bin Age": str(max(1, int(max_bin_age * 1000))) + " ms"
+    }
+
+
 def create_output_mergecontent(parent_pg, location, name):
     """
-    Creates a MergeContent to combine flowfiles from different outputs
+    Creates a MergeContent to combine flowfiles from different outputs.
+        Flowfiles are only merged with flowfiles of the same request, so
+        concurrent requests are answered separately. Flowfiles are packaged
+        with their attributes (FlowFile Stream v3), see flowfile_package
 
     Args:
         parent_pg (ProcessGroupEntity): Target process group to place
@@ -316,40 +477,58 @@ def create_output_mergecontent(parent_pg, location, name):
     assert isinstance(location, Location)
     assert isinstance(name, str)
 
-    return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.standard.MergeContent",
-                name="Merge outputs",
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties={
-                        "Header": "[",
-                        "Footer": "]",
-                        "Demarcator": ","
-                    },
-                    auto_terminated_relationships=["failure", "original"]
-                )
-            )
+    return _create_processor(parent_pg.component.id, output_mergecontent_component(location, name))
+
+
+def response_handler_component(location, http_context_id):
+    """
+    Describes a HandleHttpResponse connected to the Http controller service
+
+    Args:
+        location (Location): x,y coordinated to place the processor
+        http_context_id (str): Id of the StandardHttpContextMap to
+            connect the processor to
+
+    Returns:
+        (ProcessorDTO)
+    """
+    assert isinstance(location, Location)
+    assert isinstance(http_context_id, str)
+
+    return nifi.ProcessorDTO(
+        type="org.apache.nifi.processors.standard.HandleHttpResponse",
+        name="Return test result",
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        ),
+        config=nifi.ProcessorConfigDTO(
+            properties={
+                "HTTP Context Map": http_context_id,
+                "HTTP Status Code": "200",
+                "test_input_name": "${http.headers.test_input_name}",
+                "test_output_name": "${test_output_name}",
+                "test_start_time": "${test_start_time}",
+                "test_end_time": "${test_end_time}",
+                "test_duration": "${test_duration}",
+                "test_correlation_id": "${test_correlation_id}"
+            },
+            auto_terminated_relationships=["failure", "success"]
         )
     )
 
+
 def create_response_handler(parent_pg, location, http_context):
     """
     Creates a HandleHttpResponse and connects it to the Http controller service
-    
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             processor
         location (Location): x,y coordinated to place the processor
         http_context (ControllerServiceEntity): StandardHttpContextMap to
             connect the processor to
-        
+
     Returns:
         (ProcessorEntity)
     """
@@ -358,30 +537,29 @@ def create_response_handler(parent_pg, location, http_context):
     assert isinstance(location, Location)
     assert isinstance(http_context, nifi.ControllerServiceEntity)
 
-    return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
-        body=nifi.ProcessorEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.standard.HandleHttpResponse",
-                name="Return test result",
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties={
-                        "HTTP Context Map": http_context.component.id,
-                        "HTTP Status Code": "200",
-                        "test_input_name": "${http.headers.test_input_name}",
-                        "test_output_name": "${test_output_name}",
-                        "test_start_time": "${test_start_time}",
-                        "test_end_time": "${test_end_time}",
-                        "test_duration": "${test_duration}"
-                    },
-                    auto_terminated_relationships=["failure", "success"]
-                )
-            )
+    return _create_processor(parent_pg.component.id, response_handler_component(location, http_context.component.id))
+
+
+def test_output_component(location, name):
+    """
+    Describes a test output (as an input port in the test process
+        group)
+
+    Args:
+        location (Location): x,y coordinated to place the port
+        name (string): Name of the test output
+
+    Returns:
+        (PortDTO)
+    """
+    assert isinstance(location, Location)
+    assert isinstance(name, str)
+
+    return nifi.PortDTO(
+        name=name,
+        position=nifi.PositionDTO(
+            x=location.x + 50,
+            y=location.y
         )
     )
 
@@ -390,13 +568,13 @@ def create_test_output(parent_pg, location, name):
     """
     Creates a test output (as an input port in the test process
         group)
-    
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             processor
         location (Location): x,y coordinated to place the processor
         name (string): Name of the test output
-        
+
     Returns:
         (InputPortEntity)
     """
@@ -405,17 +583,60 @@ def create_test_output(parent_pg, location, name):
     assert isinstance(location, Location)
     assert isinstance(name, str)
 
-    return nifi.ProcessGroupsApi().create_input_port(
-        id=parent_pg.component.id,
-        body=nifi.PortEntity(
-            revision=nifi.RevisionDTO(version=0),
-            component=nifi.PortDTO(
-                name=name,
-                position=nifi.PositionDTO(
-                    x=location.x + 50,
-                    y=location.y
-                )
-            )
+    return _create_input_port(parent_pg.component.id, test_output_component(location, name))
+
+
+def parking_port_component(location):
+    """
+    Describes the port in the test process group that the connections to the test inputs are redirected
+        to while a test is open (see redirect_connection). It has no outgoing connections, so the
+        flowfiles stay queued in the redirected connections
+
+    Args:
+        location (Location): x,y coordinated to place the port
+
+    Returns:
+        (PortDTO)
+    """
+    assert isinstance(location, Location)
+
+    return nifi.PortDTO(
+        name=PARKING_PORT_NAME,
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        )
+    )
+
+
+def output_attribute_component(location, name):
+    """
+    Describes a UpdateAttribute to register the test_output_name to the
+        response
+
+    Args:
+        location (Location): x,y coordinated to place the processor
+        name (string): Name of the test output
+
+    Returns:
+        (ProcessorDTO)
+    """
+    assert isinstance(location, Location)
+    assert isinstance(name, str)
+
+    return nifi.ProcessorDTO(
+        type="org.apache.nifi.processors.attributes.UpdateAttribute",
+        name="Set output name '" + name + "'",
+        position=nifi.PositionDTO(
+            x=location.x,
+            y=location.y
+        ),
+        config=nifi.ProcessorConfigDTO(
+            properties={
+                "test_output_name": name,
+                "test_end_time": "${now():toNumber()}",
+                "test_duration": "${now():toNumber():minus(${test_start_time})}"
+            }
         )
     )
 
@@ -424,13 +645,13 @@ def create_output_attribute(parent_pg, location, name):
     """
     Creates a UpdateAttribute to register the test_output_name to the
         response
-    
+
     Args:
-        parent_pg (ProcessGroupEntity): Target process group to place 
+        parent_pg (ProcessGroupEntity): Target process group to place
             processor
         location (Location): x,y coordinated to place the processor
         name (string): Name of the test output
-        
+
     Returns:
         (ProcessorEntity)
     """
@@ -439,37 +660,267 @@ def create_output_attribute(parent_pg, location, name):
     assert isinstance(location, Location)
     assert isinstance(name, str)
 
+    return _create_processor(parent_pg.component.id, output_attribute_component(location, name))
+
+
+def _create_controller_service(pg_id, component):
+    return nifi.ProcessGroupsApi().create_controller_service(
+        id=pg_id,
+        body=nifi.ControllerServiceEntity(
+            revision=nifi.RevisionDTO(version=0),
+            component=component
+        )
+    )
+
+
+def _create_processor(pg_id, component):
     return nifi.ProcessGroupsApi().create_processor(
-        id=parent_pg.component.id,
+        id=pg_id,
         body=nifi.ProcessorEntity(
             revision=nifi.RevisionDTO(version=0),
-            component=nifi.ProcessorDTO(
-                type="org.apache.nifi.processors.attributes.UpdateAttribute",
-                name="Set output name '" + name + "'",
-                position=nifi.PositionDTO(
-                    x=location.x,
-                    y=location.y
-                ),
-                config=nifi.ProcessorConfigDTO(
-                    properties={
-                        "test_output_name": name,
-                        "test_end_time": "${now():toNumber()}",
-                        "test_duration": "${now():toNumber():minus(${test_start_time})}"
-                    }
-                )
+            component=component
+        )
+    )
+
+
+def _create_input_port(pg_id, component):
+    return nifi.ProcessGroupsApi().create_input_port(
+        id=pg_id,
+        body=nifi.PortEntity(
+            revision=nifi.RevisionDTO(version=0),
+            component=component
+        )
+    )
+
+
+def _create_output_port(pg_id, component):
+    return nifi.ProcessGroupsApi().create_output_port(
+        id=pg_id,
+        body=nifi.PortEntity(
+            revision=nifi.RevisionDTO(version=0),
+            component=component
+        )
+    )
+
+
+def connect(parent_pg_id, source, target, relationships=None):
+    """
+    Creates a connection between two objects in (or directly below) a known
+        process group. Unlike canvas.create_connection, this does not look up
+        the parent process group
+
+    Args:
+        parent_pg_id (str): Id of the process group to place the connection in
+        source: Object to initiate the connection, e.g. ProcessorEntity
+        target: Object to terminate the connection, e.g. PortEntity
+        relationships (list): list of strings of relationships to connect;
+            all relationships of a processor source if not provided
+
+    Returns:
+        (ConnectionEntity)
+    """
+    assert isinstance(parent_pg_id, str)
+
+    source_type = utils.infer_object_label_from_class(source)
+    target_type = utils.infer_object_label_from_class(target)
+    if source_type == "PROCESSOR" and not relationships:
+        relationships = [x.name for x in source.component.relationships]
+
+    return nifi.ProcessGroupsApi().create_connection(
+        id=parent_pg_id,
+        body=nifi.ConnectionEntity(
+            revision=nifi.RevisionDTO(version=0),
+            source_type=source_type,
+            destination_type=target_type,
+            component=nifi.ConnectionDTO(
+                source=_connectable(source),
+                destination=_connectable(target),
+                selected_relationships=relationships
             )
         )
     )
 
 
+def create_plan(parent_pg, plan, workers=1):
+    """
+    Creates all components and connections of a plan, and enables its controller
+        services. With more than one worker, independent creates are issued
+        concurrently; a processor waits for the controller services it refers to
+        and a connection waits for both its endpoints
+
+    Args:
+        parent_pg (ProcessGroupEntity): Target process group to place the
+            components
+        plan (FlowPlan): The components and connections to create
+        workers (int): Maximum number of concurrent requests
+
+    Returns:
+        (dict of str: entity): The created components by their key in the plan
+    """
+    assert isinstance(parent_pg, nifi.ProcessGroupEntity)
+    assert isinstance(plan, FlowPlan)
+    assert isinstance(workers, int) and workers > 0
+
+    pg_id = parent_pg.component.id
+    created = {}
+    # Planned ids of the controller services, to replace them with the actual ids in properties
+    planned_services = {component.id: key for key, component in plan.controller_services.items()}
+
+    def create_processor(component):
+        component = _unplanned(component)
+        properties = component.config.properties if component.config is not None else None
+        if properties:
+            component.config.properties = {
+                k: created[planned_services[v]].id if v in planned_services else v for k, v in properties.items()
+            }
+        return _create_processor(pg_id, component)
+
+    # Tasks by key: (keys of the tasks to wait for, function to call)
+    tasks = {}
+    for key, component in plan.controller_services.items():
+        tasks[key] = ([], partial(_create_controller_service, pg_id, _unplanned(component)))
+    for key, component in plan.processors.items():
+        properties = component.config.properties if component.config is not None else None
+        dependencies = [planned_services[v] for v in (properties or {}).values() if v in planned_services]
+        tasks[key] = (dependencies, partial(create_processor, component))
+    for key, component in plan.input_ports.items():
+        tasks[key] = ([], partial(_create_input_port, pg_id, _unplanned(component)))
+    for key, component in plan.output_ports.items():
+        tasks[key] = ([], partial(_create_output_port, pg_id, _unplanned(component)))
+    for i, (source_key, destination_key, relationships) in enumerate(plan.connections):
+        tasks[("connection", i)] = ([source_key, destination_key], partial(
+            lambda s, d, r: connect(pg_id, created[s], created[d], r), source_key, destination_key, relationships))
+    for key in plan.controller_services:
+        # Enabled once everything is in place, like the processors referring to it
+        tasks[("enable", key)] = (list(tasks), partial(lambda k: enable_controller_service(created[k]), key))
+
+    _run_tasks(tasks, workers, created)
+    for key in plan.controller_services:
+        created[key] = created[("enable", key)]
+    return {key: created[key] for key in plan.keys()}
+
+
+def _run_tasks(tasks, workers, results):
+    # Runs each task as soon as all tasks it waits for are done, on at most workers threads.
+    # Results are stored by task key, so later tasks can use them
+    waiting = dict(tasks)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while waiting or running:
+            for key in [k for k, (dependencies, _) in waiting.items()
+                        if all(d in results for d in dependencies)]:
+                running[executor.submit(instrumentation.propagate(waiting.pop(key)[1]))] = key
+            assert running, "Tasks wait for each other: " + str(list(waiting))
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Raises the first error; tasks already running are finished by the executor
+                results[running.pop(future)] = future.result()
+    return results
+
+
+def concurrently(function, items, workers=1):
+    """
+    Calls a function for all items, on at most workers threads. The items must be independent of each other
+
+    Args:
+        function (callable): Function taking an item
+        items (list): The items
+        workers (int): Maximum number of concurrent calls
+
+    Returns:
+        (list): The results, in the order of the items
+    """
+    assert isinstance(workers, int) and workers > 0
+
+    if workers == 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    results = _run_tasks({i: ([], partial(function, item)) for i, item in enumerate(items)}, workers, {})
+    return [results[i] for i in range(len(items))]
+
+
+def _unplanned(component):
+    # Copy of the component without its planned id; nifi assigns the id on creation
+    copy = type(component)(**{attr: getattr(component, attr) for attr in component.swagger_types})
+    copy.id = None
+    return copy
+
+
+def instantiate_plan(parent_pg, plan, name):
+    """
+    Creates all components and connections of a plan at once: the plan is uploaded
+        as a template, instantiated in the process group and the template is removed
+        again. The controller services of the plan are enabled afterwards
+
+    Args:
+        parent_pg (ProcessGroupEntity): Target process group to place the
+            components
+        plan (FlowPlan): The components and connections to create
+        name (str): Name of the template; must be unique within nifi
+
+    Returns:
+        (dict of str: entity): The created components by their key in the plan
+    """
+    assert isinstance(parent_pg, nifi.ProcessGroupEntity)
+    assert isinstance(plan, FlowPlan)
+    assert isinstance(name, str)
+
+    pg_id = parent_pg.component.id
+    handle, template_file = tempfile.mkstemp(suffix=".xml")
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            file.write(plan.to_template(name))
+        template = nifi.ProcessGroupsApi().upload_template(id=pg_id, template=template_file)
+    finally:
+        os.remove(template_file)
+
+    try:
+        flow = nifi.ProcessGroupsApi().instantiate_template(
+            id=pg_id,
+            body=nifi.InstantiateTemplateRequestEntity(
+                origin_x=0.0,
+                origin_y=0.0,
+                template_id=template.template.id
+            )
+        ).flow
+    finally:
+        nifi.TemplatesApi().remove_template(id=template.template.id)
+
+    created = {}
+    for processor in flow.processors:
+        _map_instantiated(plan, created, processor, processor.component.config.comments)
+    for port in flow.input_ports + flow.output_ports:
+        _map_instantiated(plan, created, port, port.component.comments)
+    if len(plan.controller_services) > 0:
+        controller_services = nifi.FlowApi().get_controller_services_from_group(
+            id=pg_id,
+            include_ancestor_groups=False,
+            include_descendant_groups=False
+        ).controller_services
+        for controller_service in controller_services:
+            _map_instantiated(plan, created, controller_service, controller_service.component.comments)
+        for key in plan.controller_services:
+            created[key] = enable_controller_service(created[key])
+
+    missing = [key for key in plan.keys() if key not in created]
+    assert len(missing) == 0, "Components missing after instantiating template: " + str(missing)
+    return created
+
+
+def _map_instantiated(plan, created, entity, comments):
+    key = plan.key_of(comments)
+    if key is not None:
+        created[key] = entity
+
+
 def recreate_connection(connection):
     """
-    Creates the connection provided (assuming it's been deleted 
+    Creates the connection provided (assuming it's been deleted
         from the canvas before)
-    
+
     Args:
         connection (ConnectionEntity): Connection to re-create
-    
+
     Returns:
         (ConnectionEntity)
     """
@@ -489,19 +940,439 @@ def recreate_connection(connection):
     )
 
 
-def delete_all_connections(process_group, purge=True, descendants=True):
+def redirect_connection(connection, destination):
+    """
+    Points a connection to another destination, with a single update. Unlike deleting and re-creating
+        it, the connection keeps its id, its settings and the flowfiles queued in it. Nifi refuses
+        (ApiException) while the current destination is running
+
+    Args:
+        connection (ConnectionEntity): Connection to redirect
+        destination: The new destination, e.g. a PortEntity, or the ConnectableDTO of an earlier
+            destination
+
+    Returns:
+        (ConnectionEntity): The redirected connection
+    """
+    assert isinstance(connection, nifi.ConnectionEntity)
+
+    if not isinstance(destination, nifi.ConnectableDTO):
+        destination = _connectable(destination)
+
+    def change(revision):
+        return nifi.ConnectionsApi().update_connection(
+            id=connection.id,
+            body=nifi.ConnectionEntity(
+                revision=revision,
+                source_type=connection.source_type,
+                destination_type=destination.type,
+                component=nifi.ConnectionDTO(
+                    id=connection.id,
+                    destination=destination
+                )
+            )
+        )
+    return _with_latest_revision(connection, change)
+
+
+def update_processor(processor, update):
+    """
+    Updates the configuration of a processor. Unlike canvas.update_processor, the processor is not
+        fetched first, unless its revision is outdated (see revision_cache)
+
+    Args:
+        processor (ProcessorEntity): The processor to update
+        update (ProcessorConfigDTO): The configuration to change
+
+    Returns:
+        (ProcessorEntity): The updated processor
+    """
+    assert isinstance(processor, nifi.ProcessorEntity)
+    assert isinstance(update, nifi.ProcessorConfigDTO)
+
+    def change(revision):
+        return nifi.ProcessorsApi().update_processor(
+            id=processor.id,
+            body=nifi.ProcessorEntity(
+                revision=revision,
+                component=nifi.ProcessorDTO(
+                    config=update,
+                    id=processor.id
+                )
+            )
+        )
+    return _with_latest_revision(processor, change)
+
+
+def schedule_processor(processor, scheduled):
+    """
+    Starts or stops a processor. Stopping waits until the threads of the processor have ended
+
+    Args:
+        processor (ProcessorEntity): The processor to schedule
+        scheduled (bool): True to start, False to stop
+
+    Returns:
+        (ProcessorEntity): The scheduled processor
+    """
+    assert isinstance(processor, nifi.ProcessorEntity)
+    assert isinstance(scheduled, bool)
+
+    def change(revision):
+        return nifi.ProcessorsApi().update_run_status(
+            id=processor.id,
+            body=nifi.ProcessorRunStatusEntity(revision=revision, state="RUNNING" if scheduled else "STOPPED")
+        )
+
+    def stopped_processor():
+        entity = nifi.ProcessorsApi().get_processor(processor.id)
+        return entity if not _active_threads(entity) else False
+
+    result = _with_latest_revision(processor, change)
+    if not scheduled and _active_threads(result):
+        result = utils.wait_to_complete(stopped_processor)
+    return result
+
+
+def schedule_process_group(process_group_id, scheduled):
+    """
+    Starts or stops all components in a process group. Unlike canvas.schedule_process_group, the
+        process group is not fetched first. Stopping waits until the threads of the components have
+        ended
+
+    Args:
+        process_group_id (str): Id of the process group
+        scheduled (bool): True to start, False to stop
+    """
+    assert isinstance(process_group_id, str)
+    assert isinstance(scheduled, bool)
+
+    nifi.FlowApi().schedule_components(
+        id=process_group_id,
+        body=nifi.ScheduleComponentsEntity(
+            id=process_group_id,
+            state="RUNNING" if scheduled else "STOPPED"
+        )
+    )
+    if not scheduled:
+        utils.wait_to_complete(
+            lambda: not _active_threads(nifi.ProcessGroupsApi().get_process_group(process_group_id)))
+
+
+def schedule_components(process_group_id, scheduled, components):
+    """
+    Starts or stops some of the components in a process group, with a single request
+
+    Args:
+        process_group_id (str): Id of the process group the components are in
+        scheduled (bool): True to start, False to stop
+        components (list of ProcessorEntity and PortEntity): The components to schedule
+    """
+    assert isinstance(process_group_id, str)
+    assert isinstance(scheduled, bool)
+
+    def schedule(latest):
+        nifi.FlowApi().schedule_components(
+            id=process_group_id,
+            body=nifi.ScheduleComponentsEntity(
+                id=process_group_id,
+                state="RUNNING" if scheduled else "STOPPED",
+                components=latest
+            )
+        )
+
+    latest = {component.id: _latest_revision(component) for component in components}
+    try:
+        schedule(latest)
+    except ApiException as e:
+        if e.status != 409:
+            raise
+        latest = {component.id: _refetch_revision(component) for component in components}
+        schedule(latest)
+    # Nifi raises the revision of every scheduled component, without returning it
+    for component_id, revision in latest.items():
+        revisions.update(component_id, nifi.RevisionDTO(version=revision.version + 1, client_id=revision.client_id))
+
+
+def disable_input_port(port):
+    """
+    Disables an input port, so it is skipped when its process group is started
+
+    Args:
+        port (PortEntity): The input port to disable
+
+    Returns:
+        (PortEntity): The disabled port
+    """
+    assert isinstance(port, nifi.PortEntity)
+
+    return _with_latest_revision(port, lambda revision: nifi.InputPortsApi().update_run_status(
+        id=port.id, body=nifi.PortRunStatusEntity(revision=revision, state="DISABLED")))
+
+
+def queued_connections(process_group_id):
+    """
+    Args:
+        process_group_id (str): Id of the process group
+
+    Returns:
+        (set of str): Ids of the connections directly in the process group that hold flowfiles, from a
+            single status request
+    """
+    assert isinstance(process_group_id, str)
+
+    snapshot = nifi.FlowApi().get_process_group_status(id=process_group_id).process_group_status.aggregate_snapshot
+    return set(entity.id for entity in snapshot.connection_status_snapshots or []
+               if entity.connection_status_snapshot.flow_files_queued)
+
+
+def purge_connections(connections, workers=1):
     """
-    Purges and deletes all connections inside a process group
+    Drops the flowfiles in connections. Unlike canvas.purge_connection for each connection, the drop
+        requests of all connections are issued first, and their completion is polled for all of them
+        together
+
+    Args:
+        connections (list of ConnectionEntity): Connections to purge
+        workers (int): Maximum number of concurrent requests
+
+    Returns:
+        (int): Number of dropped flowfiles
+    """
+    assert isinstance(workers, int) and workers > 0
+
+    queues = nifi.FlowfileQueuesApi()
+    pending = concurrently(lambda connection: (connection.id, queues.create_drop_request(connection.id).drop_request),
+                           connections, workers)
+    dropped = 0
+    deadline = time.perf_counter() + config.long_max_wait
+    while True:
+        for connection_id, drop_request in pending:
+            if drop_request.finished and drop_request.failure_reason:
+                raise ValueError("Unable to complete drop request of connection %s, error was %s"
+                                 % (connection_id, drop_request.failure_reason))
+        dropped += sum(drop_request.dropped_count or 0 for _, drop_request in pending if drop_request.finished)
+        pending = [(connection_id, drop_request) for connection_id, drop_request in pending
+                   if not drop_request.finished]
+        if not pending:
+            return dropped
+        if time.perf_counter() > deadline:
+            raise ValueError("Timed out waiting for the drop requests of connections "
+                             + ", ".join(connection_id for connection_id, _ in pending))
+        time.sleep(DROP_REQUEST_POLL_DELAY)
+        pending = concurrently(lambda item: (item[0], queues.get_drop_request(item[0], item[1].id).drop_request),
+                               pending, workers)
+
+
+def delete_connection(connection, purge=False):
+    """
+    Deletes a connection, optionally purges it first. Unlike canvas.delete_connection, the latest known
+        revision is used, see revision_cache
+
+    Args:
+        connection (ConnectionEntity): Connection to delete
+        purge (bool): True to drop the flowfiles in the connection first
+
+    Returns:
+        (ConnectionEntity): The deleted connection
+    """
+    assert isinstance(connection, nifi.ConnectionEntity)
+
+    if purge:
+        canvas.purge_connection(connection.id)
+    deleted = _with_latest_revision(connection, lambda revision: nifi.ConnectionsApi().delete_connection(
+        id=connection.id, **_revision_params(revision)))
+    revisions.forget(connection.id)
+    return deleted
+
+
+def create_process_group(parent_pg, name, location, comments=None):
+    """
+    Creates a process group. Unlike canvas.create_process_group, with comments
+
+    Args:
+        parent_pg (ProcessGroupEntity): The process group to create the new process group in
+        name (str): Name of the new process group
+        location (tuple[x, y]): Position of the new process group in its parent
+        comments (str): Comments of the new process group
+
+    Returns:
+        (ProcessGroupEntity): The new process group
+    """
+    assert isinstance(parent_pg, nifi.ProcessGroupEntity)
+    assert isinstance(name, str)
+    assert isinstance(location, tuple)
+
+    return nifi.ProcessGroupsApi().create_process_group(
+        id=parent_pg.id,
+        body=nifi.ProcessGroupEntity(
+            revision=nifi.RevisionDTO(version=0),
+            component=nifi.ProcessGroupDTO(
+                name=name,
+                comments=comments,
+                position=nifi.PositionDTO(x=float(location[0]), y=float(location[1]))
+            )
+        )
+    )
+
+
+def delete_process_group(process_group):
+    """
+    Deletes a process group. Unlike canvas.delete_process_group, nothing is stopped, disabled or purged
+        first; nifi refuses to delete a group that is running, has enabled controller services, queued
+        flowfiles or connections to components outside of it
+
+    Args:
+        process_group (ProcessGroupEntity): The process group to delete
+
+    Returns:
+        (ProcessGroupEntity): The deleted process group
+    """
+    assert isinstance(process_group, nifi.ProcessGroupEntity)
+
+    deleted = _with_latest_revision(process_group, lambda revision: nifi.ProcessGroupsApi().remove_process_group(
+        id=process_group.id, **_revision_params(revision)))
+    revisions.forget(process_group.id)
+    return deleted
+
+
+def remove_process_group(process_group, connections=(), controller_services=(), stop=True, workers=1):
+    """
+    Deletes a process group of which the contents are known, without looking them up: stops it, deletes
+        the connections to and from it, disables its controller services and deletes it. Unlike
+        canvas.delete_process_group with force, nothing is purged or scanned for; nifi refuses (ApiException)
+        when flowfiles are queued in the group or other connections lead to it
+
+    Args:
+        process_group (ProcessGroupEntity): The process group to delete
+        connections (list of ConnectionEntity): The connections between the group and its parent
+        controller_services (list of ControllerServiceEntity): The enabled controller services in the group
+        stop (bool): False when the group is stopped already
+        workers (int): Maximum number of concurrent requests
+    """
+    assert isinstance(process_group, nifi.ProcessGroupEntity)
+    assert isinstance(workers, int) and workers > 0
+
+    if stop:
+        schedule_process_group(process_group.id, False)
+    tasks = {("connection", i): ([], partial(delete_connection, connection))
+             for i, connection in enumerate(connections)}
+    tasks.update({("controller_service", i): ([], partial(disable_controller_service, controller_service))
+                  for i, controller_service in enumerate(controller_services)})
+    _run_tasks(tasks, workers, {})
+    delete_process_group(process_group)
+
+
+def _with_latest_revision(entity, change):
+    """
+    Makes a change that requires the latest revision of a component. The revision is taken from the
+        revision cache; it is fetched when outdated, and taken from the entity when unknown. When nifi
+        rejects the revision as outdated (409 Conflict), the component is fetched and the change is retried,
+        once. The revisions that are fetched or returned are recorded in the cache, also when it is not
+        installed
+
+    Args:
+        entity: The component to change, e.g. a ProcessorEntity
+        change (callable): Function making the change, taking the RevisionDTO to use
+
+    Returns:
+        The result of change
+    """
+    revision = _latest_revision(entity)
+    try:
+        result = change(revision)
+    except ApiException as e:
+        if e.status != 409:
+            raise
+        latest = _refetch_revision(entity)
+        if latest.version == revision.version:
+            # Not a revision conflict; e.g. the component is running
+            raise
+        result = change(latest)
+    revisions.learn(result)
+    return result
+
+
+def _latest_revision(entity):
+    # The revision of the entity itself when the cache does not know the component
+    revision = revisions.get(entity.id)
+    if revision is not None:
+        return revision
+    if revisions.is_outdated(entity.id):
+        return _refetch_revision(entity)
+    return entity.revision
+
+
+def _refetch_revision(entity):
+    fetched = _fetch(entity)
+    revisions.learn(fetched)
+    return fetched.revision
+
+
+def _fetch(entity):
+    if isinstance(entity, nifi.ProcessorEntity):
+        return nifi.ProcessorsApi().get_processor(entity.id)
+    if isinstance(entity, nifi.ConnectionEntity):
+        return nifi.ConnectionsApi().get_connection(entity.id)
+    if isinstance(entity, nifi.ControllerServiceEntity):
+        return nifi.ControllerServicesApi().get_controller_service(entity.id)
+    if isinstance(entity, nifi.ProcessGroupEntity):
+        return nifi.ProcessGroupsApi().get_process_group(entity.id)
+    if isinstance(entity, nifi.PortEntity) and entity.port_type == "INPUT_PORT":
+        return nifi.InputPortsApi().get_input_port(entity.id)
+    if isinstance(entity, nifi.PortEntity):
+        return nifi.OutputPortsApi().get_output_port(entity.id)
+    raise ValueError("Can not fetch a " + type(entity).__name__)
+
+
+def _connectable(component):
+    # The source or destination of a connection
+    return nifi.ConnectableDTO(
+        id=component.id,
+        group_id=component.component.parent_group_id,
+        type=utils.infer_object_label_from_class(component)
+    )
+
+
+def _revision_params(revision):
+    # The revision as query parameters of a delete
+    params = {"version": revision.version}
+    if revision.client_id is not None:
+        params["client_id"] = revision.client_id
+    return params
+
+
+def _active_threads(entity):
+    snapshot = entity.status.aggregate_snapshot if entity.status is not None else None
+    return snapshot.active_thread_count if snapshot is not None else 0
+
+
+def delete_all_connections(process_group, purge=True, descendants=True, workers=DEFAULT_DELETE_WORKERS):
+    """
+    Purges and deletes all connections inside a process group: all connections are purged together (see
+        purge_connections), then deleted on at most workers threads. Nifi refuses (ApiException) to delete
+        a connection of which the source is running
 
     Args:
         process_group (ProcessGroupEntity): Process group where connections should be purged and deleted
         purge (bool): True to Purge, Defaults to True
         descendants (bool): True to recurse child PGs, False to not
+        workers (int): Maximum number of concurrent requests
+
+    Returns:
+        (list of ConnectionEntity): The deleted connections
     """
     assert isinstance(process_group, nifi.ProcessGroupEntity)
+    assert isinstance(workers, int) and workers > 0
 
     connections = canvas.list_all_connections(process_group.component.id, descendants=descendants)
-    print("Listing connections in " + process_group.component.id)
-    print(connections)
+    logger.info("Deleting %d connections in process group %s", len(connections), process_group.component.id)
     for connection in connections:
-        canvas.delete_connection(connection, purge=purge)
+        logger.debug("Connection %s: %s -> %s", connection.id, connection.component.source.name,
+                     connection.component.destination.name)
+    start = time.perf_counter()
+    dropped = purge_connections(connections, workers) if purge else 0
+    deleted = concurrently(delete_connection, connections, workers)
+    logger.info("Deleted %d connections in process group %s, dropping %d flowfiles, in %.3fs", len(deleted),
+                process_group.component.id, dropped, time.perf_counter() - start)
+    return deleted
@@ -6,56 +6,159 @@ Created on 9 Feb 2019
 @author: Frank Ypma
 """
 import logging
+import time
 from nipyapi import canvas, nifi
 
 
 # Separator used for "paths"
 SEPARATOR: str = "/"
 
+# Number of seconds a loaded flow is used for lookups before it is loaded again. None to keep it until refresh()
+DEFAULT_CACHE_TTL: float = 5.0
+
+# Child types that are served from the loaded flow, with the field they are listed in
+FLOW_CHILD_TYPES: dict = {
+    "PROCESS_GROUP": "process_groups",
+    "PROCESSOR": "processors",
+    "INPUT_PORT": "input_ports",
+    "OUTPUT_PORT": "output_ports"
+}
+
 
 class CanvasNavigator:
     """
     Navigtor module to ascend and descend the processor group tree on the nifi canvas
     Works with some standard linux commands as cd and ls
     Can return certain objects inside the current process group
+    The contents of a process group are loaded with a single flow request and kept for cache_ttl
+        seconds. A lookup that finds nothing in a cached flow loads the flow again before failing
+    Process groups that were visited or listed are indexed by their full path for cache_ttl seconds as
+        well, so changing to a known path costs no requests at all. Expired paths are looked up again.
+        Paths below a process group are forgotten as soon as a reload of its flow shows that its child
+        groups have changed
     """
 
-    def __init__(self):
+    def __init__(self, cache_ttl=DEFAULT_CACHE_TTL):
         self.logger = logging.getLogger('CanvasNavigator')
         self.logger.setLevel(logging.DEBUG)
-        self.current = nifi.ProcessGroupsApi().get_process_group(canvas.get_root_pg_id())
+        self.cache_ttl = cache_ttl
+        self.__flows = {}
+        self.__root_id = canvas.get_root_pg_id()
+        self.current = nifi.ProcessGroupsApi().get_process_group(self.__root_id)
+        self.__current_path = SEPARATOR
+        self.__clear_paths()
 
     # Jump directly into process group id
     def cd_to_id(self, pg_id):
+        path = self.__path_ids.get(pg_id)
+        pg = self.__known_path(path)
+        if pg is not None:
+            self.current = pg
+            self.__current_path = path
+            return
         self.current = nifi.ProcessGroupsApi().get_process_group(pg_id)
+        if path is None and pg_id == self.__root_id:
+            path = SEPARATOR
+        self.__current_path = path
+        if path is not None:
+            self.__remember_path(path, self.current)
 
     # Print child process groups
     def ls(self):
         print("Showing contents of " + self.current_id() + " - " + self.current_name())
-        for child in self.__child_groups():
+        flow = self.__flow()
+        for child in flow.process_groups:
             print("\t" + child.component.id + " - PG - " + child.component.name)
-        for child in self.__child_procossors():
+        for child in flow.processors:
             print("\t" + child.component.id + " - Pr - " + child.component.name)
-        for child in self.__child_input_ports():
+        for child in flow.input_ports:
             print("\t" + child.component.id + " - IP - " + child.component.name)
-        for child in self.__child_output_ports():
+        for child in flow.output_ports:
             print("\t" + child.component.id + " - OP - " + child.component.name)
 
-    # Returns children process groups
-    def __child_groups(self):
-        return nifi.ProcessGroupsApi().get_process_groups(self.current_id()).process_groups
-
-    # Returns children processors
-    def __child_processors(self):
-        return nifi.ProcessGroupsApi().get_processors(self.current_id()).processors
-
-    # Returns children input ports
-    def __child_input_ports(self):
-        return nifi.ProcessGroupsApi().get_input_ports(self.current_id()).input_ports
-
-    # Returns children output ports
-    def __child_output_ports(self):
-        return nifi.ProcessGroupsApi().get_output_ports(self.current_id()).output_ports
+    # Load the contents of the current process group again; optionally of all process groups below it as well
+    def refresh(self, recursive=False):
+        self.__load_flow(self.current_id(), recursive)
+
+    # Forget all loaded flows and known paths
+    def invalidate(self):
+        self.__flows = {}
+        self.__clear_paths()
+
+    # Load the contents of a process group with a single request
+    def __load_flow(self, pg_id, recursive=False):
+        previous = self.__flows.get(pg_id)
+        flow = nifi.FlowApi().get_flow(pg_id).process_group_flow.flow
+        loaded_at = time.monotonic()
+        self.__flows[pg_id] = (loaded_at, flow)
+        if previous is not None and self.__child_group_names(previous[1]) != self.__child_group_names(flow):
+            self.__forget_paths_below(pg_id)
+        self.__index_child_paths(pg_id, flow, loaded_at)
+        if recursive:
+            for child in flow.process_groups:
+                self.__load_flow(child.id, recursive)
+        return flow
+
+    # Returns the contents of the current process group, loaded if not cached or expired
+    def __flow(self, reload=False):
+        cached = self.__flows.get(self.current_id())
+        if reload or cached is None or self.__expired(cached[0]):
+            return self.__load_flow(self.current_id())
+        return cached[1]
+
+    def __expired(self, loaded_at):
+        return self.cache_ttl is not None and time.monotonic() - loaded_at > self.cache_ttl
+
+    # Returns if the contents of the current process group are served from cache
+    def __cached(self):
+        cached = self.__flows.get(self.current_id())
+        return cached is not None and not self.__expired(cached[0])
+
+    @staticmethod
+    def __child_group_names(flow):
+        return sorted((child.id, child.component.name) for child in flow.process_groups)
+
+    # Remember the paths of the child groups of a process group with a known path; skips ambiguous names
+    def __index_child_paths(self, pg_id, flow, loaded_at):
+        path = self.__path_ids.get(pg_id)
+        if path is None:
+            return
+        names = [child.component.name for child in flow.process_groups]
+        for child in flow.process_groups:
+            if names.count(child.component.name) == 1:
+                self.__remember_path(self.__join(path, child.component.name), child, loaded_at)
+
+    def __remember_path(self, path, pg, loaded_at=None):
+        self.__paths[path] = (time.monotonic() if loaded_at is None else loaded_at, pg)
+        self.__path_ids[pg.component.id] = path
+
+    # Returns the process group at a path, or None if the path is unknown or expired
+    def __known_path(self, path):
+        known = self.__paths.get(path)
+        if known is None or self.__expired(known[0]):
+            return None
+        return known[1]
+
+    def __forget_paths_below(self, pg_id):
+        path = self.__path_ids.get(pg_id)
+        if path is None:
+            self.__clear_paths()
+            return
+        prefix = path if path == SEPARATOR else path + SEPARATOR
+        for known_path in [x for x in self.__paths if x.startswith(prefix) and x != path]:
+            del self.__path_ids[self.__paths.pop(known_path)[1].component.id]
+
+    def __clear_paths(self):
+        self.__paths = {}
+        self.__path_ids = {}
+        if self.__current_path == SEPARATOR:
+            self.__remember_path(SEPARATOR, self.current)
+
+    @staticmethod
+    def __join(path, name):
+        if path == SEPARATOR:
+            return SEPARATOR + name
+        return path + SEPARATOR + name
 
     # Returns children controller services
     def __child_controller_services(self):
@@ -65,24 +168,48 @@ class CanvasNavigator:
     # Change current process group to child with name
     def cd(self, path):
         if path[:1] == SEPARATOR:
-            self.cd_to_id(canvas.get_root_pg_id())  # Go to root
+            self.cd_to_id(self.__root_id)  # Go to root
             path = path[1:]  # Remove top level SEPARATOR; traverse path relative from root
 
         if len(path) > 0:
             if path == "..":
-                if self.current_id() == canvas.get_root_pg_id():
+                if self.current_id() == self.__root_id:
                     return
-                return self.cd_to_id(self.current_parent_id())
+                return self.__cd_to_parent()
 
             child_pg_names = path.split(SEPARATOR)
             for child_pg_name in child_pg_names:
                 self.__cd_to_child(child_pg_name)
 
+    # Change current process group to parent
+    def __cd_to_parent(self):
+        path = self.__current_path
+        self.cd_to_id(self.current_parent_id())
+        if path is not None and self.__current_path is None:
+            self.__current_path = path[:path.rindex(SEPARATOR)] or SEPARATOR
+            self.__remember_path(self.__current_path, self.current)
+
     # Change current process group to child with name
     def __cd_to_child(self, child_pg_name):
+        path = None
+        if self.__current_path is not None:
+            path = self.__join(self.__current_path, child_pg_name)
+            pg = self.__known_path(path)
+            if pg is not None:
+                self.current = pg
+                self.__current_path = path
+                return
+
         pg = self.group(child_pg_name)
         if pg is not None:
             self.current = pg
+            self.__current_path = path
+            if path is not None:
+                self.__remember_path(path, pg)
+
+    # Return the full path of the current process group, or None if it was entered by id
+    def current_path(self):
+        return self.__current_path
 
     # Return current process group id
     def current_id(self):
@@ -98,23 +225,21 @@ class CanvasNavigator:
 
     # Return children of certain type with certain name
     def __children(self, child_type, name):
-        children = None
-
-        if child_type == "PROCESS_GROUP":
-            children = self.__child_groups()
-        elif child_type == "PROCESSOR":
-            children = self.__child_processors()
-        elif child_type == "INPUT_PORT":
-            children = self.__child_input_ports()
-        elif child_type == "OUTPUT_PORT":
-            children = self.__child_output_ports()
-        elif child_type == "CONTROLLER_SERVICE":
+        if child_type == "CONTROLLER_SERVICE":
             children = self.__child_controller_services()
+            return [child for child in children if child.component.name == name]
 
-        if children is None:
+        if child_type not in FLOW_CHILD_TYPES:
             raise Exception("Search for type "+child_type+"not supported")
 
-        return [child for child in children if child.component.name == name]
+        was_cached = self.__cached()
+        children = getattr(self.__flow(), FLOW_CHILD_TYPES[child_type])
+        matched = [child for child in children if child.component.name == name]
+        if len(matched) == 0 and was_cached:
+            # Child may have been created after the flow was loaded
+            children = getattr(self.__flow(reload=True), FLOW_CHILD_TYPES[child_type])
+            matched = [child for child in children if child.component.name == name]
+        return matched
 
     # Return child of certain type with certain name
     def __child(self, child_type, name):
@@ -0,0 +1,77 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Snapshot of the connections on the canvas, indexed by the components they connect
+"""
+from nipyapi import nifi, canvas
+
+
+class ConnectionIndex(object):
+    """
+    Connections indexed by source id and destination id, so the connections of a component
+    can be looked up without walking the canvas again
+    """
+
+    def __init__(self, connections):
+        """
+        Args:
+            connections (collections.Iterable of ConnectionEntity): The connections to index
+        """
+        self.connections = []
+        self.__by_source = {}
+        self.__by_destination = {}
+        for connection in connections:
+            assert isinstance(connection, nifi.ConnectionEntity)
+            self.connections.append(connection)
+            self.__by_source.setdefault(connection.source_id, []).append(connection)
+            self.__by_destination.setdefault(connection.destination_id, []).append(connection)
+
+    @classmethod
+    def from_process_group(cls, pg_id, descendants=True):
+        """
+        Takes a snapshot of all connections inside a process group, with one flow request per
+            process group
+
+        Args:
+            pg_id (str): Id of the process group
+            descendants (bool): True to include the connections in child process groups
+
+        Returns:
+            (ConnectionIndex)
+        """
+        assert isinstance(pg_id, str)
+
+        def walk(flow_entity):
+            flow = flow_entity.process_group_flow.flow
+            yield from flow.connections
+            if descendants:
+                for child in flow.process_groups:
+                    yield from walk(canvas.get_flow(child.id))
+
+        return cls(walk(canvas.get_flow(pg_id)))
+
+    def incoming(self, component_id):
+        """
+        Returns the connections ending in a component
+
+        Args:
+            component_id (str): Id of the destination component
+
+        Returns:
+            (list of ConnectionEntity)
+        """
+        return list(self.__by_destination.get(component_id, []))
+
+    def outgoing(self, component_id):
+        """
+        Returns the connections starting from a component
+
+        Args:
+            component_id (str): Id of the source component
+
+        Returns:
+            (list of ConnectionEntity)
+        """
+        return list(self.__by_source.get(component_id, []))
@@ -0,0 +1,1129 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+In-process stand-in for the nifi REST api, to run and benchmark the tests without a nifi instance.
+The process groups, processors, ports, connections, controller services and templates are kept in
+memory, and the calls made by nipytest and nipyapi are answered with the json nifi would return,
+including the revision checks and the checks on running components. Every call can be delayed by a
+fixed latency, to mimic a remote nifi
+
+A running HandleHttpRequest listens on its port. The requests it receives are passed through the flow
+in memory: UpdateAttribute, RouteOnAttribute, MergeContent and HandleHttpResponse are simulated (with
+the part of the expression language the test components use), any other processor passes its
+flowfiles on unchanged over its success relationship
+
+    with FakeNifi(latency=0.005) as fake:
+        fake.configure()
+        with Test1To1("my test", base, port=8081) as test:
+            test.run("input", flowfile)
+"""
+import email.parser
+import json
+import logging
+import re
+import socketserver
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ElementTree
+
+from collections import deque
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+
+from nipyapi import config
+from nipytest import flowfile_package
+from nipytest.models.flowfile import FlowFile
+
+logger = logging.getLogger("nipytest.fake_nifi")
+
+# Version of nifi the fake reports
+NIFI_VERSION: str = "1.9.2"
+
+# Path all api resources are under
+API_PATH: str = "/nifi-api"
+
+# Seconds a request to a HandleHttpRequest waits for its response before it is answered with 503, like
+# the Request Expiration of a StandardHttpContextMap
+DEFAULT_REQUEST_EXPIRATION: float = 60.0
+
+# Relationships of the processor types the fake knows; other types have success and failure
+RELATIONSHIPS: dict = {
+    "org.apache.nifi.processors.attributes.UpdateAttribute": ["success"],
+    "org.apache.nifi.processors.standard.DebugFlow": ["success", "failure"],
+    "org.apache.nifi.processors.standard.GenerateFlowFile": ["success"],
+    "org.apache.nifi.processors.standard.HandleHttpRequest": ["success"],
+    "org.apache.nifi.processors.standard.HandleHttpResponse": ["success", "failure"],
+    "org.apache.nifi.processors.standard.LogAttribute": ["success"],
+    "org.apache.nifi.processors.standard.MergeContent": ["merged", "original", "failure"],
+    "org.apache.nifi.processors.standard.ReplaceText": ["success", "failure"],
+    "org.apache.nifi.processors.standard.RouteOnAttribute": ["unmatched"]
+}
+
+# Properties of the simulated processors that are settings, not attributes, routes or headers
+SETTINGS: dict = {
+    "UpdateAttribute": {"Delete Attributes Expression", "Store State", "Stateful Variables Initial Value",
+                        "canonical-value-lookup-cache-size"},
+    "RouteOnAttribute": {"Routing Strategy"},
+    "HandleHttpResponse": {"HTTP Context Map", "HTTP Status Code", "Attributes to add to the HTTP Response (Regex)"}
+}
+
+# Resource path of every kind of component
+_RESOURCES = {
+    "PROCESS_GROUP": "process-groups",
+    "PROCESSOR": "processors",
+    "INPUT_PORT": "input-ports",
+    "OUTPUT_PORT": "output-ports",
+    "CONNECTION": "connections",
+    "CONTROLLER_SERVICE": "controller-services"
+}
+_KINDS = {resource: kind for kind, resource in _RESOURCES.items()}
+
+# Key of every kind of component in the contents of a process group
+_FLOW_KEYS = {
+    "PROCESS_GROUP": "processGroups",
+    "PROCESSOR": "processors",
+    "INPUT_PORT": "inputPorts",
+    "OUTPUT_PORT": "outputPorts",
+    "CONNECTION": "connections"
+}
+
+# Kinds of the components that can be started
+_SCHEDULABLE = ("PROCESSOR", "INPUT_PORT", "OUTPUT_PORT")
+
+# Template elements that hold a list, even when they occur once
+_TEMPLATE_LISTS = {"controllerServices", "processors", "inputPorts", "outputPorts", "connections", "processGroups",
+                   "funnels", "labels", "remoteProcessGroups", "selectedRelationships", "autoTerminatedRelationships"}
+
+# Seconds between the checks of a server for shutdown; stopping a HandleHttpRequest waits for the next check
+_POLL_INTERVAL = 0.01
+
+# Maximum number of times a flowfile is passed on while simulating a single request; guards against loops
+_MAX_STEPS = 100000
+
+_DURATION_UNITS = {"ms": 0.001, "millis": 0.001, "milliseconds": 0.001, "sec": 1, "secs": 1, "second": 1,
+                   "seconds": 1, "min": 60, "mins": 60, "minute": 60, "minutes": 60, "hr": 3600, "hour": 3600,
+                   "hours": 3600}
+
+
+class FakeNifi(object):
+    """
+    Fake nifi api on a local port. Safe to call from concurrent clients
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, request_expiration=DEFAULT_REQUEST_EXPIRATION):
+        """
+        Args:
+            host (str): Address to listen on; the HandleHttpRequest processors listen on the same address
+            port (int): Port of the api; a free port when 0
+            latency (float): Seconds every api call is delayed
+            request_expiration (float): Seconds a request to a HandleHttpRequest waits for its response
+        """
+        assert isinstance(host, str)
+        assert isinstance(port, int)
+        assert latency >= 0
+        assert request_expiration > 0
+
+        self.host = host
+        self.latency = latency
+        self.request_expiration = request_expiration
+        self.__lock = threading.RLock()
+        self.__stopping = threading.Event()
+        self.__items = {}
+        self.__children = {}
+        self.__outgoing = {}
+        self.__incoming = {}
+        self.__templates = {}
+        self.__listeners = {}
+        self.root_id = self.__add("PROCESS_GROUP", None, {"name": "NiFi Flow", "position": {"x": 0.0, "y": 0.0}})["id"]
+        self.__routes = self.__route_table()
+        self.__server = _Server((host, port), _ApiHandler, self)
+        self.__thread = None
+
+    @property
+    def port(self):
+        return self.__server.server_address[1]
+
+    @property
+    def url(self):
+        """
+        Returns:
+            (str): Address of the api, to use as nipyapi host
+        """
+        return "http://%s:%d%s" % (self.host, self.port, API_PATH)
+
+    def configure(self):
+        """
+        Points nipyapi at this fake
+        """
+        config.nifi_config.host = self.url
+        # The api client keeps the host it was created with
+        config.nifi_config.api_client = None
+
+    def start(self):
+        """
+        Returns:
+            (FakeNifi): self
+        """
+        self.__thread = threading.Thread(target=self.__server.serve_forever, args=(_POLL_INTERVAL,),
+                                         name="fake-nifi", daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the api and all HandleHttpRequest listeners. Requests waiting for a response are answered
+        """
+        self.__stopping.set()
+        with self.__lock:
+            for processor_id in list(self.__listeners):
+                self.__stop_listener(processor_id)
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # Api
+
+    def _handle_api(self, handler):
+        body = _read_body(handler)
+        if self.latency > 0:
+            time.sleep(self.latency)
+        parsed = urlparse(handler.path)
+        request = _Request(parse_qs(parsed.query), body, handler.headers.get("Content-Type", ""))
+        try:
+            if not parsed.path.startswith(API_PATH + "/"):
+                raise _ApiError(404, "Not found: " + parsed.path)
+            with self.__lock:
+                status, payload = self.__route(handler.command, parsed.path[len(API_PATH):], request)
+        except _ApiError as e:
+            status, payload = e.status, e.message
+        except Exception as e:
+            logger.exception("Failed to handle %s %s", handler.command, handler.path)
+            status, payload = 500, repr(e)
+
+        if isinstance(payload, str):
+            _respond(handler, status, payload.encode("utf-8"), {"Content-Type": "text/plain"})
+        else:
+            _respond(handler, status, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"})
+
+    def __route(self, method, path, request):
+        for route_method, pattern, function in self.__routes:
+            match = pattern.fullmatch(path)
+            if match is not None and route_method == method:
+                return function(request, *match.groups())
+        raise _ApiError(404, "No resource for %s %s" % (method, path))
+
+    def __route_table(self):
+        children = "(processors|input-ports|output-ports|connections|process-groups|controller-services)"
+        components = "(process-groups|processors|input-ports|output-ports|connections|controller-services)"
+        routes = [
+            ("GET", r"/flow/process-groups/([^/]+)/status", self.__group_status),
+            ("GET", r"/flow/process-groups/([^/]+)", self.__get_flow),
+            ("PUT", r"/flow/process-groups/([^/]+)", self.__schedule_components),
+            ("GET", r"/flow/process-groups/([^/]+)/controller-services", self.__list_controller_services),
+            ("GET", r"/flow/templates", self.__list_templates),
+            ("GET", r"/flow/processor-types", self.__processor_types),
+            ("GET", r"/system-diagnostics", self.__system_diagnostics),
+            ("GET", r"/process-groups/([^/]+)/" + children, self.__list_children),
+            ("GET", r"/process-groups/([^/]+)/(funnels|remote-process-groups)", self.__list_unsupported),
+            ("POST", r"/process-groups/([^/]+)/" + children, self.__create_component),
+            ("POST", r"/process-groups/([^/]+)/templates/upload", self.__upload_template),
+            ("POST", r"/process-groups/([^/]+)/template-instance", self.__instantiate_template),
+            ("DELETE", r"/templates/([^/]+)", self.__remove_template),
+            ("POST", r"/flowfile-queues/([^/]+)/drop-requests", self.__drop_request),
+            ("GET", r"/flowfile-queues/([^/]+)/drop-requests/([^/]+)", self.__drop_request),
+            ("DELETE", r"/flowfile-queues/([^/]+)/drop-requests/([^/]+)", self.__drop_request),
+            ("PUT", r"/(processors|input-ports|output-ports|controller-services)/([^/]+)/run-status",
+             self.__update_run_status),
+            ("GET", r"/" + components + r"/([^/]+)", self.__get_component),
+            ("PUT", r"/" + components + r"/([^/]+)", self.__update_component),
+            ("DELETE", r"/" + components + r"/([^/]+)", self.__delete_component)
+        ]
+        return [(method, re.compile(pattern), function) for method, pattern, function in routes]
+
+    def __group_status(self, request, group_id):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        status = self.__status(group)
+        snapshot = status["aggregateSnapshot"]
+        snapshot.update(processorStatusSnapshots=[], inputPortStatusSnapshots=[], outputPortStatusSnapshots=[],
+                        connectionStatusSnapshots=[])
+        for child_id in self.__children.get(group["id"], {}):
+            item = self.__items[child_id]
+            if item["kind"] == "CONNECTION":
+                # Queues are always empty
+                snapshot["connectionStatusSnapshots"].append({"id": child_id, "connectionStatusSnapshot": {
+                    "id": child_id, "groupId": group["id"], "flowFilesQueued": 0, "queuedCount": "0"}})
+                continue
+            if item["kind"] not in _SCHEDULABLE:
+                continue
+            child_status = self.__status(item)
+            child_snapshot = dict(child_status["aggregateSnapshot"], runStatus=child_status["runStatus"])
+            if item["kind"] == "PROCESSOR":
+                snapshot["processorStatusSnapshots"].append({"id": child_id,
+                                                             "processorStatusSnapshot": child_snapshot})
+            else:
+                key = "inputPortStatusSnapshots" if item["kind"] == "INPUT_PORT" else "outputPortStatusSnapshots"
+                snapshot[key].append({"id": child_id, "portStatusSnapshot": child_snapshot})
+        return 200, {"processGroupStatus": status}
+
+    def __get_flow(self, request, group_id):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        contents = {key: [] for key in _FLOW_KEYS.values()}
+        contents.update(funnels=[], labels=[], remoteProcessGroups=[])
+        for child_id in self.__children.get(group["id"], {}):
+            item = self.__items[child_id]
+            if item["kind"] in _FLOW_KEYS:
+                contents[_FLOW_KEYS[item["kind"]]].append(self.__entity(item))
+        return 200, {"processGroupFlow": {
+            "id": group["id"],
+            "uri": self.__uri(group),
+            "parentGroupId": group["group_id"],
+            "breadcrumb": {"id": group["id"], "breadcrumb": {"id": group["id"], "name": group["component"]["name"]}},
+            "flow": contents,
+            "lastRefreshed": time.strftime("%H:%M:%S %Z")
+        }}
+
+    def __schedule_components(self, request, group_id):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        body = request.json()
+        state = body.get("state")
+        if state not in ("RUNNING", "STOPPED"):
+            raise _ApiError(400, "The desired state is not valid: %s" % state)
+
+        if body.get("components") is None:
+            # The whole group; like nifi, disabled and invalid components are skipped
+            targets = [item for item in self.__descendants(group["id"]) if item["kind"] in _SCHEDULABLE
+                       and item["component"]["state"] != "DISABLED"
+                       and (state == "STOPPED" or not self.__validation_errors(item))]
+        else:
+            targets = []
+            for component_id, revision in body["components"].items():
+                item = self.__get(component_id)
+                self.__check_revision(item, revision)
+                if state == "RUNNING" and self.__validation_errors(item):
+                    raise _ApiError(409, "%s is not in a valid state: %s" % (
+                        item["id"], "; ".join(self.__validation_errors(item))))
+                targets.append(item)
+        for item in targets:
+            if self.__set_state(item, state):
+                item["version"] += 1
+        return 200, {"id": group["id"], "state": state}
+
+    def __list_controller_services(self, request, group_id):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        if request.param("includeDescendantGroups") == "true":
+            items = self.__descendants(group["id"])
+        else:
+            items = [self.__items[child_id] for child_id in self.__children.get(group["id"], {})]
+        return 200, {"controllerServices": [self.__entity(item) for item in items
+                                            if item["kind"] == "CONTROLLER_SERVICE"]}
+
+    def __list_templates(self, request):
+        return 200, {"templates": [self.__template_entity(template) for template in self.__templates.values()]}
+
+    @staticmethod
+    def __processor_types(request):
+        return 200, {"processorTypes": [{
+            "type": processor_type,
+            "bundle": {"group": "org.apache.nifi", "artifact": "nifi-standard-nar", "version": NIFI_VERSION},
+            "tags": []
+        } for processor_type in RELATIONSHIPS]}
+
+    @staticmethod
+    def __system_diagnostics(request):
+        return 200, {"systemDiagnostics": {"aggregateSnapshot": {"versionInfo": {"niFiVersion": NIFI_VERSION}}}}
+
+    def __list_children(self, request, group_id, resource):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        kind = _KINDS[resource]
+        items = [self.__items[child_id] for child_id in self.__children.get(group["id"], {})]
+        key = _FLOW_KEYS.get(kind, "controllerServices")
+        return 200, {key: [self.__entity(item) for item in items if item["kind"] == kind]}
+
+    @staticmethod
+    def __list_unsupported(request, group_id, resource):
+        return 200, {"funnels" if resource == "funnels" else "remoteProcessGroups": []}
+
+    def __create_component(self, request, group_id, resource):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        component = request.json().get("component") or {}
+        component.pop("id", None)
+        item = self.__add(_KINDS[resource], group["id"], component)
+        return 201, self.__entity(item)
+
+    def __get_component(self, request, resource, component_id):
+        return 200, self.__entity(self.__get(component_id, _KINDS[resource]))
+
+    def __update_component(self, request, resource, component_id):
+        item = self.__get(component_id, _KINDS[resource])
+        body = request.json()
+        self.__check_revision(item, body.get("revision"))
+        update = dict(body.get("component") or {})
+        state = update.pop("state", None)
+        for key in ("id", "parentGroupId", "relationships", "validationErrors", "validationStatus"):
+            update.pop(key, None)
+
+        if update:
+            self.__check_can_update(item, update)
+            self.__merge(item, update)
+        if state is not None and state != item["component"].get("state"):
+            self.__change_state(item, state)
+        item["version"] += 1
+        return 200, self.__entity(item)
+
+    def __update_run_status(self, request, resource, component_id):
+        item = self.__get(component_id, _KINDS[resource])
+        body = request.json()
+        self.__check_revision(item, body.get("revision"))
+        self.__change_state(item, body.get("state"))
+        item["version"] += 1
+        return 200, self.__entity(item)
+
+    def __delete_component(self, request, resource, component_id):
+        item = self.__get(component_id, _KINDS[resource])
+        version = request.param("version")
+        self.__check_revision(item, {"version": int(version) if version is not None else None})
+        self.__check_can_delete(item)
+        entity = self.__entity(item)
+        self.__remove(item)
+        return 200, entity
+
+    def __upload_template(self, request, group_id):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        message = email.parser.BytesParser().parsebytes(
+            b"Content-Type: " + request.content_type.encode("latin-1") + b"\r\n\r\n" + request.body)
+        parts = [part for part in message.walk() if part.get_param("name", header="content-disposition") == "template"]
+        if not parts:
+            raise _ApiError(400, "Template file is missing")
+
+        root = ElementTree.fromstring(parts[0].get_payload(decode=True))
+        name = root.findtext("name")
+        if any(template["name"] == name for template in self.__templates.values()):
+            raise _ApiError(409, "A template named '%s' already exists." % name)
+        template = {
+            "id": str(uuid.uuid4()),
+            "groupId": group["id"],
+            "name": name,
+            "description": root.findtext("description"),
+            "snippet": _template_value(root.find("snippet")) or {}
+        }
+        self.__templates[template["id"]] = template
+        return 201, self.__template_entity(template)
+
+    def __instantiate_template(self, request, group_id):
+        group = self.__get(group_id, "PROCESS_GROUP")
+        template = self.__templates.get(request.json().get("templateId"))
+        if template is None:
+            raise _ApiError(404, "Unable to find template")
+
+        snippet = template["snippet"]
+        ids = {}
+        created = []
+        for tag, kind in [("controllerServices", "CONTROLLER_SERVICE"), ("processors", "PROCESSOR"),
+                          ("inputPorts", "INPUT_PORT"), ("outputPorts", "OUTPUT_PORT")]:
+            for component in snippet.get(tag, []):
+                component = dict(component)
+                original_id = component.pop("id", None)
+                if kind == "PROCESSOR":
+                    # References to the controller services of the template are replaced, like nifi does
+                    component["config"] = dict(component.get("config") or {})
+                    properties = component["config"].get("properties") or {}
+                    component["config"]["properties"] = {key: ids.get(value, value)
+                                                         for key, value in properties.items()}
+                item = self.__add(kind, group["id"], component)
+                ids[original_id] = item["id"]
+                created.append(item)
+        for component in snippet.get("connections", []):
+            component = dict(component)
+            component.pop("id", None)
+            for end in ("source", "destination"):
+                component[end] = dict(component[end], id=ids.get(component[end]["id"], component[end]["id"]))
+            created.append(self.__add("CONNECTION", group["id"], component))
+
+        flow = {key: [] for key in _FLOW_KEYS.values()}
+        flow.update(funnels=[], labels=[], remoteProcessGroups=[])
+        for item in created:
+            if item["kind"] in _FLOW_KEYS:
+                flow[_FLOW_KEYS[item["kind"]]].append(self.__entity(item))
+        return 201, {"flow": flow}
+
+    def __remove_template(self, request, template_id):
+        template = self.__templates.pop(template_id, None)
+        if template is None:
+            raise _ApiError(404, "Unable to find template with id '%s'." % template_id)
+        return 200, self.__template_entity(template)
+
+    def __drop_request(self, request, connection_id, drop_request_id=None):
+        # Queues are always empty, so a drop request is finished right away
+        connection = self.__get(connection_id, "CONNECTION")
+        status = 200 if drop_request_id is not None else 202
+        drop_request_id = drop_request_id or str(uuid.uuid4())
+        return status, {"dropRequest": {
+            "id": drop_request_id,
+            "uri": self.__uri(connection) + "/drop-requests/" + drop_request_id,
+            "finished": True,
+            "percentCompleted": 100,
+            "currentCount": 0,
+            "droppedCount": 0,
+            "originalCount": 0,
+            "state": "Completed"
+        }}
+
+    # Components
+
+    def __add(self, kind, group_id, component):
+        item_id = str(uuid.uuid4())
+        component = dict(component, id=item_id, parentGroupId=group_id)
+        item = {"id": item_id, "kind": kind, "group_id": group_id, "version": 1, "component": component}
+
+        if kind == "PROCESSOR":
+            component["config"] = dict(component.get("config") or {})
+            component["config"]["properties"] = _strings(component["config"].get("properties"))
+            component["config"].setdefault("autoTerminatedRelationships", [])
+            component["config"].setdefault("comments", "")
+            component.setdefault("name", component.get("type", "").split(".")[-1])
+            component["state"] = "STOPPED"
+        elif kind in ("INPUT_PORT", "OUTPUT_PORT"):
+            component["type"] = kind
+            component["state"] = "STOPPED"
+        elif kind == "CONTROLLER_SERVICE":
+            component["properties"] = _strings(component.get("properties"))
+            component["state"] = "DISABLED"
+        elif kind == "CONNECTION":
+            for end in ("source", "destination"):
+                connectable = component.get(end) or {}
+                target = self.__items.get(connectable.get("id"))
+                if target is None or target["kind"] not in _SCHEDULABLE:
+                    raise _ApiError(400, "Unable to find the %s of the connection" % end)
+                component[end] = {"id": target["id"], "groupId": target["group_id"], "type": target["kind"],
+                                  "name": target["component"].get("name")}
+            component["selectedRelationships"] = list(component.get("selectedRelationships") or [])
+
+        self.__items[item_id] = item
+        if group_id is not None:
+            self.__children.setdefault(group_id, {})[item_id] = None
+        if kind == "CONNECTION":
+            self.__index_connection(item)
+        return item
+
+    def __remove(self, item):
+        for child_id in list(self.__children.get(item["id"], {})):
+            self.__remove(self.__items[child_id])
+        self.__children.pop(item["id"], None)
+        if item["kind"] == "CONNECTION":
+            self.__unindex_connection(item)
+        if item["id"] in self.__listeners:
+            self.__stop_listener(item["id"])
+        self.__children.get(item["group_id"], {}).pop(item["id"], None)
+        del self.__items[item["id"]]
+
+    def __index_connection(self, item):
+        self.__outgoing.setdefault(item["component"]["source"]["id"], {})[item["id"]] = None
+        self.__incoming.setdefault(item["component"]["destination"]["id"], {})[item["id"]] = None
+
+    def __unindex_connection(self, item):
+        self.__outgoing.get(item["component"]["source"]["id"], {}).pop(item["id"], None)
+        self.__incoming.get(item["component"]["destination"]["id"], {}).pop(item["id"], None)
+
+    def __get(self, component_id, kind=None):
+        item = self.__items.get(self.root_id if component_id == "root" else component_id)
+        if item is None or (kind is not None and item["kind"] != kind):
+            raise _ApiError(404, "Unable to find component with id '%s'." % component_id)
+        return item
+
+    def __descendants(self, group_id):
+        for child_id in self.__children.get(group_id, {}):
+            yield self.__items[child_id]
+            yield from self.__descendants(child_id)
+
+    def __connections(self, index, component_id):
+        return [self.__items[connection_id] for connection_id in index.get(component_id, {})]
+
+    @staticmethod
+    def __check_revision(item, revision):
+        version = revision.get("version") if isinstance(revision, dict) else None
+        if version is None:
+            raise _ApiError(400, "Revision must be specified.")
+        if version != item["version"]:
+            raise _ApiError(409, "[%d, %s] is not the most up-to-date revision. This component appears to have "
+                                 "been modified" % (version, item["id"]))
+
+    def __check_can_update(self, item, update):
+        state = item["component"].get("state")
+        if item["kind"] in _SCHEDULABLE and state == "RUNNING":
+            raise _ApiError(409, "%s cannot be updated while it is running" % item["id"])
+        if item["kind"] == "CONTROLLER_SERVICE" and state == "ENABLED" and "properties" in update:
+            raise _ApiError(409, "Controller Service %s cannot be updated while it is enabled" % item["id"])
+        if item["kind"] == "CONNECTION":
+            destination = update.get("destination")
+            if destination is not None and destination.get("id") != item["component"]["destination"]["id"] \
+                    and self.__is_running(item["component"]["destination"]["id"]):
+                raise _ApiError(409, "Cannot change the destination of connection %s because the current "
+                                     "destination is running" % item["id"])
+            if "selectedRelationships" in update and self.__is_running(item["component"]["source"]["id"]):
+                raise _ApiError(409, "Cannot change the relationships of connection %s because the source is "
+                                     "running" % item["id"])
+
+    def __check_can_delete(self, item):
+        kind = item["kind"]
+        if kind in _SCHEDULABLE:
+            if item["component"]["state"] == "RUNNING":
+                raise _ApiError(409, "%s is currently running" % item["id"])
+            if self.__incoming.get(item["id"]) or self.__outgoing.get(item["id"]):
+                raise _ApiError(409, "%s has at least one connection" % item["id"])
+        elif kind == "CONNECTION":
+            if self.__is_running(item["component"]["source"]["id"]):
+                raise _ApiError(409, "Cannot delete connection %s because its source is running" % item["id"])
+        elif kind == "CONTROLLER_SERVICE":
+            if item["component"]["state"] != "DISABLED":
+                raise _ApiError(409, "Controller Service %s is not disabled" % item["id"])
+        elif kind == "PROCESS_GROUP":
+            if item["id"] == self.root_id:
+                raise _ApiError(409, "The root process group cannot be deleted")
+            for child in self.__descendants(item["id"]):
+                if child["component"].get("state") in ("RUNNING", "ENABLED"):
+                    raise _ApiError(409, "Cannot delete process group %s because %s is %s" % (
+                        item["id"], child["id"], child["component"]["state"].lower()))
+            for child_id in self.__children.get(item["id"], {}):
+                for connection in self.__connections(self.__incoming, child_id) + \
+                        self.__connections(self.__outgoing, child_id):
+                    if connection["group_id"] != item["id"]:
+                        raise _ApiError(409, "Cannot delete process group %s because port %s has a connection "
+                                             "outside of it" % (item["id"], child_id))
+
+    def __merge(self, item, update):
+        component = item["component"]
+        if item["kind"] == "CONNECTION":
+            self.__unindex_connection(item)
+        for key, value in update.items():
+            if value is None:
+                continue
+            if key == "config":
+                config_update = dict(value)
+                properties = config_update.pop("properties", None)
+                component["config"].update({k: v for k, v in config_update.items() if v is not None})
+                if properties is not None:
+                    _merge_properties(component["config"]["properties"], properties)
+            elif key == "properties":
+                _merge_properties(component["properties"], value)
+            elif key in ("source", "destination"):
+                target = self.__get(value.get("id"))
+                component[key] = {"id": target["id"], "groupId": target["group_id"], "type": target["kind"],
+                                  "name": target["component"].get("name")}
+            else:
+                component[key] = value
+        if item["kind"] == "CONNECTION":
+            self.__index_connection(item)
+
+    def __change_state(self, item, state):
+        if item["kind"] == "CONTROLLER_SERVICE":
+            if state not in ("ENABLED", "DISABLED"):
+                raise _ApiError(400, "The desired state is not valid: %s" % state)
+            if state == "DISABLED" and any(self.__is_running(child_id) for child_id in self.__referencing(item)):
+                raise _ApiError(409, "Controller Service %s is referenced by running components" % item["id"])
+            item["component"]["state"] = state
+            return
+        if state not in ("RUNNING", "STOPPED", "DISABLED"):
+            raise _ApiError(400, "The desired state is not valid: %s" % state)
+        if state == "RUNNING" and self.__validation_errors(item):
+            raise _ApiError(409, "%s is not in a valid state: %s" % (
+                item["id"], "; ".join(self.__validation_errors(item))))
+        self.__set_state(item, state)
+
+    def __set_state(self, item, state):
+        # Returns True if the state changed
+        if item["component"]["state"] == state:
+            return False
+        item["component"]["state"] = state
+        if _short_type(item) == "HandleHttpRequest":
+            if state == "RUNNING":
+                self.__start_listener(item)
+            else:
+                self.__stop_listener(item["id"])
+        return True
+
+    def __is_running(self, component_id):
+        item = self.__items.get(component_id)
+        return item is not None and item["component"].get("state") == "RUNNING"
+
+    def __referencing(self, service):
+        return [item["id"] for item in self.__items.values() if item["kind"] == "PROCESSOR"
+                and service["id"] in item["component"]["config"]["properties"].values()]
+
+    def __relationships(self, item):
+        component = item["component"]
+        relationships = list(RELATIONSHIPS.get(component.get("type"), ["success", "failure"]))
+        if _short_type(item) == "RouteOnAttribute":
+            relationships += [key for key in component["config"]["properties"]
+                              if key not in SETTINGS["RouteOnAttribute"]]
+        return relationships
+
+    def __validation_errors(self, item):
+        errors = []
+        if item["kind"] == "PROCESSOR":
+            processor_config = item["component"]["config"]
+            connected = set()
+            for connection in self.__connections(self.__outgoing, item["id"]):
+                connected.update(connection["component"]["selectedRelationships"])
+            connected.update(processor_config["autoTerminatedRelationships"])
+            for relationship in self.__relationships(item):
+                if relationship not in connected:
+                    errors.append("'Relationship %s' is invalid because Relationship '%s' is not connected to any "
+                                  "component and is not auto-terminated" % (relationship, relationship))
+            for key, value in processor_config["properties"].items():
+                service = self.__items.get(value)
+                if service is not None and service["kind"] == "CONTROLLER_SERVICE" \
+                        and service["component"]["state"] != "ENABLED":
+                    errors.append("'%s' validated against '%s' is invalid because Controller Service is disabled"
+                                  % (key, value))
+        elif item["kind"] in ("INPUT_PORT", "OUTPUT_PORT"):
+            if not self.__outgoing.get(item["id"]):
+                errors.append("'Port' is invalid because Port has no outgoing connections")
+        return errors
+
+    # Entities
+
+    def __uri(self, item):
+        return self.url + "/" + _RESOURCES[item["kind"]] + "/" + item["id"]
+
+    def __entity(self, item):
+        kind = item["kind"]
+        component = dict(item["component"])
+        entity = {
+            "id": item["id"],
+            "uri": self.__uri(item),
+            "revision": {"version": item["version"]},
+            "permissions": {"canRead": True, "canWrite": True},
+            "component": component
+        }
+        if "position" in component:
+            entity["position"] = component["position"]
+
+        if kind in _SCHEDULABLE:
+            errors = self.__validation_errors(item)
+            component["validationErrors"] = errors or None
+            component["validationStatus"] = "INVALID" if errors else "VALID"
+            entity["status"] = self.__status(item)
+            if kind == "PROCESSOR":
+                auto_terminated = component["config"]["autoTerminatedRelationships"]
+                component["relationships"] = [{"name": name, "autoTerminate": name in auto_terminated}
+                                              for name in self.__relationships(item)]
+            else:
+                entity["portType"] = kind
+        elif kind == "CONNECTION":
+            source, destination = component["source"], component["destination"]
+            source_item = self.__items.get(source["id"])
+            if source_item is not None and source_item["kind"] == "PROCESSOR":
+                component["availableRelationships"] = self.__relationships(source_item)
+            entity.update(sourceId=source["id"], sourceGroupId=source["groupId"], sourceType=source["type"],
+                          destinationId=destination["id"], destinationGroupId=destination["groupId"],
+                          destinationType=destination["type"])
+            entity["status"] = {"id": item["id"], "groupId": item["group_id"],
+                                "aggregateSnapshot": {"flowFilesQueued": 0, "bytesQueued": 0}}
+        elif kind == "CONTROLLER_SERVICE":
+            entity["parentGroupId"] = item["group_id"]
+            component["validationErrors"] = None
+        elif kind == "PROCESS_GROUP":
+            counts = self.__counts(item)
+            component.update(counts)
+            entity.update(counts)
+            entity["status"] = self.__status(item)
+        return entity
+
+    def __status(self, item):
+        state = item["component"].get("state")
+        if item["kind"] in _SCHEDULABLE:
+            run_status = "Invalid" if state == "STOPPED" and self.__validation_errors(item) else state.title()
+        else:
+            run_status = None
+        snapshot = {"id": item["id"], "groupId": item["group_id"], "name": item["component"].get("name"),
+                    "activeThreadCount": 0, "flowFilesIn": 0, "flowFilesOut": 0, "flowFilesQueued": 0}
+        return {"id": item["id"], "groupId": item["group_id"], "name": item["component"].get("name"),
+                "runStatus": run_status, "aggregateSnapshot": snapshot}
+
+    def __counts(self, group):
+        counts = {"runningCount": 0, "stoppedCount": 0, "invalidCount": 0, "disabledCount": 0,
+                  "inputPortCount": 0, "outputPortCount": 0}
+        for item in self.__descendants(group["id"]):
+            if item["kind"] not in _SCHEDULABLE:
+                continue
+            state = item["component"]["state"]
+            if state == "RUNNING":
+                counts["runningCount"] += 1
+            elif state == "DISABLED":
+                counts["disabledCount"] += 1
+            elif self.__validation_errors(item):
+                counts["invalidCount"] += 1
+            else:
+                counts["stoppedCount"] += 1
+            if item["group_id"] == group["id"] and item["kind"] != "PROCESSOR":
+                counts["inputPortCount" if item["kind"] == "INPUT_PORT" else "outputPortCount"] += 1
+        return counts
+
+    @staticmethod
+    def __template_entity(template):
+        dto = {key: template[key] for key in ("id", "groupId", "name", "description")}
+        return {"id": template["id"], "template": dto}
+
+    # Simulated flow
+
+    def __start_listener(self, item):
+        port = int(item["component"]["config"]["properties"].get("Listening Port") or 80)
+        try:
+            server = _Server((self.host, port), _EchoHandler, self, item["id"])
+        except OSError as e:
+            # Nifi reports a bulletin and keeps the processor running
+            logger.error("HandleHttpRequest %s can not listen on port %d: %s", item["id"], port, e)
+            return
+        self.__listeners[item["id"]] = server
+        threading.Thread(target=server.serve_forever, args=(_POLL_INTERVAL,), name="fake-nifi-%d" % port,
+                         daemon=True).start()
+
+    def __stop_listener(self, processor_id):
+        server = self.__listeners.pop(processor_id, None)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    def _handle_echo(self, handler):
+        body = _read_body(handler)
+        parsed = urlparse(handler.path)
+        attributes = {
+            "http.method": handler.command,
+            "http.request.uri": parsed.path,
+            "http.query.string": parsed.query,
+            "http.context.identifier": str(uuid.uuid4()),
+            "http.remote.host": handler.client_address[0]
+        }
+        for key, value in handler.headers.items():
+            attributes["http.headers." + key] = value
+
+        try:
+            with self.__lock:
+                response, delay = self.__simulate(handler.server.processor_id, attributes, body)
+        except Exception as e:
+            logger.exception("Failed to simulate the flow for %s", handler.path)
+            _respond(handler, 500, repr(e).encode("utf-8"), {"Content-Type": "text/plain"})
+            return
+
+        if response is None:
+            # Nothing reached a HandleHttpResponse; the request expires
+            self.__stopping.wait(self.request_expiration)
+            _respond(handler, 503, b"Request expired", {"Content-Type": "text/plain"})
+            return
+        if delay > 0:
+            self.__stopping.wait(delay)
+        status, headers, content = response
+        _respond(handler, status, content, headers)
+
+    def __simulate(self, processor_id, attributes, content):
+        # Passes the request through the flow, starting at the HandleHttpRequest. Returns the status, headers
+        # and body of the first HandleHttpResponse reached (or None), and the seconds MergeContent waits
+        queue = deque([(processor_id, attributes, content)])
+        merges = {}
+        delay = 0.0
+        steps = 0
+        while queue or merges:
+            while queue:
+                steps += 1
+                if steps > _MAX_STEPS:
+                    raise ValueError("Flow does not end after %d steps" % _MAX_STEPS)
+                component_id, attributes, content = queue.popleft()
+                item = self.__items.get(component_id)
+                if item is None or item["component"].get("state") != "RUNNING":
+                    # Queued in front of a stopped component
+                    continue
+                short_type = _short_type(item)
+                if short_type == "MergeContent":
+                    merges.setdefault(component_id, []).append((attributes, content))
+                    continue
+                if short_type == "HandleHttpResponse":
+                    return _http_response(item, attributes, content), delay
+                for relationship, attributes_out, content_out in self.__process(item, attributes, content):
+                    self.__transfer(queue, item, relationship, attributes_out, content_out)
+
+            for component_id, flowfiles in merges.items():
+                item = self.__items[component_id]
+                for attributes, content, wait in _merge(item["component"]["config"]["properties"], flowfiles):
+                    delay = max(delay, wait)
+                    self.__transfer(queue, item, "merged", attributes, content)
+            merges = {}
+        return None, delay
+
+    def __process(self, item, attributes, content):
+        if item["kind"] != "PROCESSOR":
+            return [(None, attributes, content)]
+        properties = item["component"]["config"]["properties"]
+        short_type = _short_type(item)
+        if short_type == "UpdateAttribute":
+            updated = dict(attributes)
+            for key, value in properties.items():
+                if key not in SETTINGS["UpdateAttribute"] and value is not None:
+                    updated[key] = _evaluate(value, attributes)
+            return [("success", updated, content)]
+        if short_type == "RouteOnAttribute":
+            matched = [key for key, value in properties.items() if key not in SETTINGS["RouteOnAttribute"]
+                       and _evaluate(value, attributes) == "true"]
+            return [(relationship, attributes, content) for relationship in matched or ["unmatched"]]
+        relationships = self.__relationships(item)
+        if not relationships:
+            return []
+        return [("success" if "success" in relationships else relationships[0], attributes, content)]
+
+    def __transfer(self, queue, item, relationship, attributes, content):
+        for connection in self.__connections(self.__outgoing, item["id"]):
+            if relationship is None or relationship in connection["component"]["selectedRelationships"]:
+                queue.append((connection["component"]["destination"]["id"], dict(attributes), content))
+
+
+class _ApiError(Exception):
+
+    def __init__(self, status, message):
+        super(_ApiError, self).__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _Request(object):
+
+    def __init__(self, query, body, content_type):
+        self.query = query
+        self.body = body
+        self.content_type = content_type
+
+    def param(self, name):
+        values = self.query.get(name)
+        return values[0] if values else None
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8")) if self.body else {}
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, fake, processor_id=None):
+        self.fake = fake
+        self.processor_id = processor_id
+        HTTPServer.__init__(self, address, handler)
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this every response waits for a delayed ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.fake._handle_api(self)
+
+    do_POST = do_PUT = do_DELETE = do_GET
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class _EchoHandler(_ApiHandler):
+
+    def do_GET(self):
+        self.server.fake._handle_echo(self)
+
+    do_POST = do_PUT = do_DELETE = do_GET
+
+
+def _read_body(handler):
+    if handler.headers.get("Transfer-Encoding", "").lower() == "chunked":
+        body = BytesIO()
+        while True:
+            size = int(handler.rfile.readline().split(b";")[0].strip(), 16)
+            if size == 0:
+                # Skip the trailer
+                while handler.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return body.getvalue()
+            body.write(handler.rfile.read(size))
+            handler.rfile.readline()
+    length = int(handler.headers.get("Content-Length") or 0)
+    return handler.rfile.read(length) if length > 0 else b""
+
+
+def _respond(handler, status, body, headers):
+    handler.send_response(status)
+    for key, value in headers.items():
+        handler.send_header(key, value)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def _short_type(item):
+    return (item["component"].get("type") or "").split(".")[-1]
+
+
+def _strings(properties):
+    # Nifi holds all property values as strings
+    return {key: None if value is None else str(value) for key, value in (properties or {}).items()}
+
+
+def _merge_properties(properties, update):
+    # Like nifi, a property updated to null is removed
+    for key, value in update.items():
+        if value is None:
+            properties.pop(key, None)
+        else:
+            properties[key] = str(value)
+
+
+def _template_value(element):
+    # Reads an element of a template back into the json of a dto; see flow_plan._append
+    if element is None:
+        return None
+    children = list(element)
+    if not children:
+        if element.text in ("true", "false"):
+            return element.text == "true"
+        return element.text
+    if element.tag == "properties":
+        return {entry.findtext("key"): entry.findtext("value") for entry in children}
+    value = {}
+    for child in children:
+        if child.tag in _TEMPLATE_LISTS:
+            value.setdefault(child.tag, []).append(_template_value(child))
+        else:
+            value[child.tag] = _template_value(child)
+    return value
+
+
+def _http_response(item, attributes, content):
+    properties = item["component"]["config"]["properties"]
+    status = int(_evaluate(properties.get("HTTP Status Code") or "200", attributes))
+    headers = {key: _evaluate(value, attributes) for key, value in properties.items()
+               if key not in SETTINGS["HandleHttpResponse"] and value is not None}
+    return status, headers, content
+
+
+def _merge(properties, flowfiles):
+    # Bins the flowfiles of a MergeContent by correlation attribute. Returns the merged flowfiles with the
+    # seconds they wait for their bin to age out; bins that would never be merged are left out
+    minimum = int(properties.get("Minimum Number of Entries") or 1)
+    maximum = int(properties.get("Maximum Number of Entries") or 1000)
+    max_bin_age = _duration(properties.get("Max Bin Age"))
+    correlation = properties.get("Correlation Attribute Name")
+
+    bins = {}
+    for attributes, content in flowfiles:
+        bins.setdefault(attributes.get(correlation) if correlation else None, []).append((attributes, content))
+
+    merged = []
+    for entries in bins.values():
+        for start in range(0, len(entries), maximum):
+            chunk = entries[start:start + maximum]
+            wait = 0.0
+            if len(chunk) < minimum:
+                if max_bin_age is None:
+                    continue
+                wait = max_bin_age
+            if properties.get("Merge Format") == "FlowFile Stream, v3":
+                stream = BytesIO()
+                for attributes, content in chunk:
+                    flowfile_package.pack(FlowFile(content, attributes), stream)
+                content = stream.getvalue()
+            else:
+                content = b"".join(content for _, content in chunk)
+            # Attribute Strategy "Keep Only Common Attributes"
+            common = dict(chunk[0][0])
+            for attributes, _ in chunk[1:]:
+                common = {key: value for key, value in common.items() if attributes.get(key) == value}
+            merged.append((common, content, wait))
+    return merged
+
+
+def _duration(value):
+    if not value:
+        return None
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]+)\s*", value)
+    if match is None or match.group(2).lower() not in _DURATION_UNITS:
+        raise ValueError("Invalid time period: " + value)
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2).lower()]
+
+
+def _evaluate(value, attributes):
+    # Evaluates the expressions in a property value, innermost first:
+    # ${now():toNumber():minus(${test_start_time})} evaluates ${test_start_time} before the rest
+    innermost = re.compile(r"\$\{([^${}]*)\}")
+    while True:
+        match = innermost.search(value)
+        if match is None:
+            return value
+        value = value[:match.start()] + _evaluate_chain(match.group(1), attributes) + value[match.end():]
+
+
+def _evaluate_chain(expression, attributes):
+    parts = _split_chain(expression)
+    subject = parts[0].strip()
+    if subject == "now()":
+        result = str(int(time.time() * 1000))
+    else:
+        result = attributes.get(subject.strip("'\""))
+
+    for part in parts[1:]:
+        match = re.fullmatch(r"\s*(\w+)\((.*)\)\s*", part)
+        if match is None:
+            raise ValueError("Invalid expression: ${%s}" % expression)
+        function, argument = match.group(1), match.group(2).strip().strip("'\"")
+        if function == "toNumber":
+            result = str(int(result)) if result not in (None, "") else None
+        elif function == "toString":
+            result = "" if result is None else result
+        elif function == "equals":
+            result = str(result == argument).lower()
+        elif function == "isEmpty":
+            result = str(result is None or result.strip() == "").lower()
+        elif function == "not":
+            result = str(result != "true").lower()
+        elif function == "plus":
+            result = str(int(result) + int(argument))
+        elif function == "minus":
+            result = str(int(result) - int(argument))
+        elif function == "toUpper":
+            result = None if result is None else result.upper()
+        elif function == "toLower":
+            result = None if result is None else result.lower()
+        elif function == "append":
+            result = ("" if result is None else result) + argument
+        elif function == "prepend":
+            result = argument + ("" if result is None else result)
+        else:
+            raise ValueError("Expression function not supported by the fake: " + function)
+    return "" if result is None else result
+
+
+def _split_chain(expression):
+    # Splits subject:function():function() on the colons outside of quotes and parentheses
+    parts = [""]
+    depth = 0
+    quote = None
+    for character in expression:
+        if quote is not None:
+            if character == quote:
+                quote = None
+        elif character in "'\"":
+            quote = character
+        elif character == "(":
+            depth += 1
+        elif character == ")":
+            depth -= 1
+        elif character == ":" and depth == 0:
+            parts.append("")
+            continue
+        parts[-1] += character
+    return parts
@@ -0,0 +1,260 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Description of a set of components and connections to place in a single process group. A plan can be
+created component by component, or rendered as a nifi template and instantiated in one go
+"""
+import time
+import uuid
+import xml.etree.ElementTree as ElementTree
+
+from nipyapi import nifi
+
+# Template encoding version that the rendered templates follow
+TEMPLATE_ENCODING_VERSION: str = "1.2"
+
+# Prefix of the comments used to recognise the components of a plan after instantiating a template
+COMMENTS_PREFIX: str = "nipytest:"
+
+# Settings a template has to specify for every processor; nifi does not fill them in on instantiation
+PROCESSOR_CONFIG_DEFAULTS: dict = {
+    "bulletinLevel": "WARN",
+    "concurrentlySchedulableTaskCount": 1,
+    "executionNode": "ALL",
+    "lossTolerant": False,
+    "penaltyDuration": "30 sec",
+    "runDurationMillis": 0,
+    "schedulingPeriod": "0 sec",
+    "schedulingStrategy": "TIMER_DRIVEN",
+    "yieldDuration": "1 sec"
+}
+
+# Settings a template has to specify for every connection
+CONNECTION_DEFAULTS: dict = {
+    "backPressureDataSizeThreshold": "1 GB",
+    "backPressureObjectThreshold": 10000,
+    "flowFileExpiration": "0 sec",
+    "labelIndex": 1,
+    "loadBalanceCompression": "DO_NOT_COMPRESS",
+    "loadBalanceStrategy": "DO_NOT_LOAD_BALANCE",
+    "name": "",
+    "zIndex": 0
+}
+
+
+class FlowPlan(object):
+    """
+    Components and connections to create in a process group, identified by keys. Every component gets
+    a planned id up front, so components can refer to each other (e.g. a processor to its controller
+    service) before anything exists on the canvas
+    """
+
+    def __init__(self):
+        self.controller_services = {}
+        self.processors = {}
+        self.input_ports = {}
+        self.output_ports = {}
+        self.connections = []
+        self.__ids = {}
+
+    def add_controller_service(self, key, component):
+        """
+        Args:
+            key (str): Key to refer to the component in this plan
+            component (ControllerServiceDTO): The controller service to create
+
+        Returns:
+            (str): The planned id of the component
+        """
+        assert isinstance(component, nifi.ControllerServiceDTO)
+        return self.__add(self.controller_services, key, component)
+
+    def add_processor(self, key, component):
+        """
+        Args:
+            key (str): Key to refer to the component in this plan
+            component (ProcessorDTO): The processor to create
+
+        Returns:
+            (str): The planned id of the component
+        """
+        assert isinstance(component, nifi.ProcessorDTO)
+        return self.__add(self.processors, key, component)
+
+    def add_input_port(self, key, component):
+        """
+        Args:
+            key (str): Key to refer to the component in this plan
+            component (PortDTO): The input port to create
+
+        Returns:
+            (str): The planned id of the component
+        """
+        assert isinstance(component, nifi.PortDTO)
+        return self.__add(self.input_ports, key, component)
+
+    def add_output_port(self, key, component):
+        """
+        Args:
+            key (str): Key to refer to the component in this plan
+            component (PortDTO): The output port to create
+
+        Returns:
+            (str): The planned id of the component
+        """
+        assert isinstance(component, nifi.PortDTO)
+        return self.__add(self.output_ports, key, component)
+
+    def __add(self, components, key, component):
+        assert isinstance(key, str)
+        assert key not in self.__ids, "Key " + key + " is already used in this plan"
+
+        component.id = str(uuid.uuid4())
+        components[key] = component
+        self.__ids[key] = component.id
+        return component.id
+
+    def connect(self, source_key, destination_key, relationships=None):
+        """
+        Plans a connection between two planned components. Relationships are required when the source
+            is a processor
+
+        Args:
+            source_key (str): Key of the source component
+            destination_key (str): Key of the destination component
+            relationships (list of str): Relationships to connect
+        """
+        assert source_key in self.__ids
+        assert destination_key in self.__ids
+        assert relationships or self.kind(source_key) != "PROCESSOR", \
+            "Relationships are required for processor " + source_key
+
+        self.connections.append((source_key, destination_key, relationships))
+
+    def planned_id(self, key):
+        return self.__ids[key]
+
+    def keys(self):
+        return list(self.__ids)
+
+    def kind(self, key):
+        """
+        Returns the nifi connectable type of a planned component
+
+        Args:
+            key (str): Key of the component
+
+        Returns:
+            (str): PROCESSOR, INPUT_PORT, OUTPUT_PORT or CONTROLLER_SERVICE
+        """
+        if key in self.processors:
+            return "PROCESSOR"
+        if key in self.input_ports:
+            return "INPUT_PORT"
+        if key in self.output_ports:
+            return "OUTPUT_PORT"
+        if key in self.controller_services:
+            return "CONTROLLER_SERVICE"
+        raise KeyError(key)
+
+    def key_of(self, comments):
+        """
+        Returns the key of a component instantiated from the template of this plan
+
+        Args:
+            comments (str): Comments of the instantiated component
+
+        Returns:
+            (str): The key, or None when the component is not part of this plan
+        """
+        if comments is None or not comments.startswith(COMMENTS_PREFIX):
+            return None
+        key = comments[len(COMMENTS_PREFIX):]
+        return key if key in self.__ids else None
+
+    def to_template(self, name):
+        """
+        Renders the plan as a nifi template. Every component carries its key in its comments, so the
+            instantiated components can be mapped back to the plan
+
+        Args:
+            name (str): Name of the template; must be unique within nifi
+
+        Returns:
+            (str): The template xml
+        """
+        serializer = nifi.ApiClient()
+        group_id = str(uuid.uuid4())
+
+        template = ElementTree.Element("template", {"encoding-version": TEMPLATE_ENCODING_VERSION})
+        ElementTree.SubElement(template, "description").text = "Test scaffolding generated by nipytest"
+        ElementTree.SubElement(template, "groupId").text = group_id
+        ElementTree.SubElement(template, "name").text = name
+        snippet = ElementTree.SubElement(template, "snippet")
+
+        for key, component in self.controller_services.items():
+            values = serializer.sanitize_for_serialization(component)
+            values.update(parentGroupId=group_id, comments=COMMENTS_PREFIX + key)
+            _append(snippet, "controllerServices", values)
+
+        for key, component in self.processors.items():
+            values = serializer.sanitize_for_serialization(component)
+            values.update(parentGroupId=group_id, state="STOPPED")
+            config = dict(PROCESSOR_CONFIG_DEFAULTS)
+            config.update(values.get("config", {}))
+            config["comments"] = COMMENTS_PREFIX + key
+            values["config"] = config
+            _append(snippet, "processors", values)
+
+        for tag, ports, port_type in [("inputPorts", self.input_ports, "INPUT_PORT"),
+                                      ("outputPorts", self.output_ports, "OUTPUT_PORT")]:
+            for key, component in ports.items():
+                values = serializer.sanitize_for_serialization(component)
+                values.update(parentGroupId=group_id, comments=COMMENTS_PREFIX + key, state="STOPPED",
+                              type=port_type, concurrentlySchedulableTaskCount=1)
+                _append(snippet, tag, values)
+
+        for source_key, destination_key, relationships in self.connections:
+            values = dict(CONNECTION_DEFAULTS)
+            values.update(
+                id=str(uuid.uuid4()),
+                parentGroupId=group_id,
+                source={"groupId": group_id, "id": self.planned_id(source_key), "type": self.kind(source_key)},
+                destination={"groupId": group_id, "id": self.planned_id(destination_key),
+                             "type": self.kind(destination_key)},
+                selectedRelationships=relationships or []
+            )
+            _append(snippet, "connections", values)
+
+        ElementTree.SubElement(template, "timestamp").text = time.strftime("%m/%d/%Y %H:%M:%S %Z")
+        return ElementTree.tostring(template, encoding="unicode")
+
+
+def _append(parent, tag, value):
+    # Writes a serialized dto the way nifi (JAXB) writes templates: lists as repeated elements
+    # and property maps as entry elements
+    if isinstance(value, list):
+        for item in value:
+            _append(parent, tag, item)
+        return
+
+    element = ElementTree.SubElement(parent, tag)
+    if isinstance(value, dict):
+        for key in sorted(value):
+            if value[key] is None:
+                continue
+            if key == "properties":
+                properties = ElementTree.SubElement(element, key)
+                for property_key, property_value in value[key].items():
+                    entry = ElementTree.SubElement(properties, "entry")
+                    ElementTree.SubElement(entry, "key").text = property_key
+                    if property_value is not None:
+                        ElementTree.SubElement(entry, "value").text = str(property_value)
+            else:
+                _append(element, key, value[key])
+    elif isinstance(value, bool):
+        element.text = str(value).lower()
+    else:
+        element.text = str(value)
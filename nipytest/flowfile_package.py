@@ -0,0 +1,135 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Reading and writing of the nifi FlowFile Stream v3 format (FlowFilePackagerV3), as written by MergeContent
+with Merge Format "FlowFile Stream, v3". Every flowfile is written as:
+    NiFiFF3 | number of attributes | (key, value) per attribute | content length (8 bytes) | content
+Numbers of attributes and string lengths take 2 bytes, or 0xFFFF followed by 4 bytes for larger values.
+All numbers are big endian; strings are utf-8
+"""
+import struct
+import tempfile
+
+from nipytest.models.flowfile import FlowFile
+
+# Start of every packaged flowfile
+MAGIC_HEADER: bytes = b"NiFiFF3"
+
+# A field length of this value is followed by the actual length in 4 bytes
+MAX_VALUE_2_BYTES: int = 0xFFFF
+
+# Size up to which unpacked content is returned as bytes; larger content is spooled to a temporary file
+SPOOL_MAX_SIZE: int = 8 * 1024 * 1024
+
+# Size of the chunks content is copied in
+CHUNK_SIZE: int = 64 * 1024
+
+
+def unpack(stream, spool_max_size=SPOOL_MAX_SIZE):
+    """
+    Reads packaged flowfiles from a stream, one at a time. Only a single flowfile is held in memory;
+        content larger than spool_max_size is spooled to a temporary file
+
+    Args:
+        stream: Binary file-like object to read from
+        spool_max_size (int): Size up to which content is returned as bytes
+
+    Returns:
+        (generator of FlowFile): The flowfiles; the content is bytes, or a file-like object for large
+            content
+    """
+    while True:
+        header = _read_exactly(stream, len(MAGIC_HEADER), allow_end=True)
+        if header is None:
+            return
+        if header != MAGIC_HEADER:
+            raise ValueError("Not a FlowFile Stream v3 package: header " + repr(header))
+
+        attributes = {}
+        for _ in range(_read_field_length(stream)):
+            key = _read_string(stream)
+            attributes[key] = _read_string(stream)
+
+        length = struct.unpack(">q", _read_exactly(stream, 8))[0]
+        if length <= spool_max_size:
+            content = _read_exactly(stream, length)
+        else:
+            content = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+            remaining = length
+            while remaining > 0:
+                chunk = _read_exactly(stream, min(remaining, CHUNK_SIZE))
+                content.write(chunk)
+                remaining -= len(chunk)
+            content.seek(0)
+        yield FlowFile(content, attributes)
+
+
+def pack(flowfile, stream):
+    """
+    Writes a flowfile to a stream in the FlowFile Stream v3 format. Streamed content is copied in chunks
+
+    Args:
+        flowfile (FlowFile): The flowfile to write
+        stream: Binary file-like object to write to
+    """
+    assert isinstance(flowfile, FlowFile)
+
+    stream.write(MAGIC_HEADER)
+    stream.write(_field_length(len(flowfile.attributes)))
+    for key, value in flowfile.attributes.items():
+        stream.write(_string(key))
+        stream.write(_string(value))
+
+    content = flowfile.content
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    if hasattr(content, "read") and hasattr(content, "seek") and hasattr(content, "tell"):
+        # Length of the remaining content, without reading it
+        start = content.tell()
+        length = content.seek(0, 2) - start
+        content.seek(start)
+        stream.write(struct.pack(">q", length))
+        for chunk in iter(lambda: content.read(CHUNK_SIZE), b""):
+            stream.write(chunk)
+        return
+
+    if not isinstance(content, (bytes, bytearray, memoryview)):
+        content = flowfile.read()
+    stream.write(struct.pack(">q", len(content)))
+    stream.write(content)
+
+
+def _read_exactly(stream, length, allow_end=False):
+    data = bytearray()
+    while len(data) < length:
+        chunk = stream.read(length - len(data))
+        if not chunk:
+            if allow_end and len(data) == 0:
+                return None
+            raise ValueError("FlowFile Stream v3 package is truncated")
+        data += chunk
+    return bytes(data)
+
+
+def _read_field_length(stream):
+    length = struct.unpack(">H", _read_exactly(stream, 2))[0]
+    if length == MAX_VALUE_2_BYTES:
+        length = struct.unpack(">I", _read_exactly(stream, 4))[0]
+    return length
+
+
+def _read_string(stream):
+    return _read_exactly(stream, _read_field_length(stream)).decode("utf-8")
+
+
+def _field_length(length):
+    if length < MAX_VALUE_2_BYTES:
+        return struct.pack(">H", length)
+    return struct.pack(">HI", MAX_VALUE_2_BYTES, length)
+
+
+def _string(value):
+    data = str(value).encode("utf-8")
+    return _field_length(len(data)) + data
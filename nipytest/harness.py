@@ -0,0 +1,729 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Shared lifecycle of the nifi tests: the test process group is built once on open(), any number of
+flowfiles can be posted through it, and it is torn down again on close()
+"""
+
+import abc
+import logging
+import math
+import tempfile
+import time
+import uuid
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from nipyapi import nifi, config
+from nipytest.connection_index import ConnectionIndex
+from nipytest.flow_plan import FlowPlan
+from nipytest.models.location import Location
+from nipytest.models.run_result import RunResult
+from nipytest.schedule_scope import ScheduleScope
+from nipytest.statistics import RunStatistics, LoadReport
+from urllib.parse import urlparse
+from nipytest.models.flowfile import FlowFile
+from nipytest import canvas_extension as canvas_ext
+from nipytest import http_session
+from nipytest import instrumentation
+from nipytest import journal
+from nipytest import port_pool
+from nipytest import readiness
+from nipytest import revision_cache
+
+# Attribute that links the output of a test to the request that started it
+CORRELATION_ATTRIBUTE: str = "test_correlation_id"
+
+# Size up to which a streamed response is kept in memory; larger responses are spooled to a temporary file
+SPOOL_MAX_SIZE: int = 8 * 1024 * 1024
+
+# Size of the chunks a streamed response is read in
+STREAM_CHUNK_SIZE: int = 64 * 1024
+
+# Maximum number of requests in flight during a load test
+MAX_LOAD_WORKERS: int = 256
+
+# Maximum number of concurrent requests while building and tearing down the test process group
+DEFAULT_BUILD_WORKERS: int = 8
+
+
+class TestHarness(abc.ABC):
+    """
+    Base class for the tests on the nifi canvas. Takes care of registering the inputs and outputs,
+    building the test process group (HandleHttpRequest in, HandleHttpResponse out) and restoring
+    the canvas afterwards. Subclasses define how the outputs are collected and returned
+    The latencies of all runs are collected in statistics
+
+    Can be used as context manager:
+        with Test1To1("my test", base) as test:
+            test.run("input", flowfile_1)
+            test.run("input", flowfile_2)
+    """
+
+    def __init__(self, name, base, port=None, use_template=True, build_workers=DEFAULT_BUILD_WORKERS,
+                 scoped_scheduling=False, session=None, ready_timeout=readiness.DEFAULT_TIMEOUT,
+                 redirect_connections=False):
+        """
+        Prepares a test case. The test will be created on the canvas in the process group base, in a
+            process group named after the test and this instance, so instances of the same test can be
+            open at the same time. The name starts with journal.TEST_GROUP_PREFIX, to find the groups of
+            tests that were not closed.
+            It is expected that config.nifi_config.host has already been set. E.g., 'http://<host>:8080/nifi-api'
+
+        Args:
+            name (str): The name of this test case
+            base (nifi.ProcessGroupEntity): The process group to place the test; usually the process group where the
+                flow resides
+            port (int): The communication port; by default, a free port from port_pool.default_pool is
+                taken while the test is open
+            use_template (bool): True to create the test components from a single uploaded template;
+                False to create them one by one
+            build_workers (int): Maximum number of concurrent requests while building the test
+            scoped_scheduling (bool): True to only start and stop the components reachable from the inputs,
+                instead of the whole base process group. Components are restored to their state from
+                before the test was opened
+            session (requests.Session): Session to post the test messages with. By default, the session
+                shared by all tests posting to the same host and port (see http_session)
+            ready_timeout (float): Seconds to wait, after opening, until the test takes requests
+            redirect_connections (bool): True to point the connections of the inputs and outputs to the
+                test group while the test is open, and back afterwards, instead of deleting and re-creating
+                them. The connections keep their ids, settings and queued flowfiles. Only connections
+                directly in the base can be redirected; other connections are still deleted
+        """
+
+        assert isinstance(name, str)
+        assert isinstance(base, nifi.ProcessGroupEntity)
+        assert port is None or isinstance(port, int)
+        assert isinstance(use_template, bool)
+        assert isinstance(build_workers, int) and build_workers > 0
+        assert isinstance(scoped_scheduling, bool)
+        assert session is None or isinstance(session, requests.Session)
+        assert ready_timeout > 0
+        assert isinstance(redirect_connections, bool)
+
+        self.name = journal.TEST_GROUP_PREFIX + str.replace(name, " ", "_") + "_" + uuid.uuid4().hex[:8]
+        self.base = base
+        self.requested_port = port
+        self.port = port
+        self.use_template = use_template
+        self.build_workers = build_workers
+        self.scoped_scheduling = scoped_scheduling
+        self.session = session
+        self.ready_timeout = ready_timeout
+        self.redirect_connections = redirect_connections
+        self.__clear()
+
+        # Latencies of all runs of this test, see statistics.RunStatistics
+        self.statistics = RunStatistics()
+
+        self.logger = logging.getLogger(type(self).__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+    def __clear(self):
+        self.inputs = []
+        self.outputs = []
+        self.connections_to_remove = []
+        self.__connection_index = None
+        self.__clear_canvas_state()
+
+    def __clear_canvas_state(self):
+        self.is_open = False
+        self.output_attributes = []
+        self.test_group = None
+        self.test_connections = []
+        self.redirected_connections = []
+        self.journal = None
+        self.http_context = None
+        self.http_in = None
+        self.http_out = None
+        self.components = None
+        self.__scope = None
+        self.__redirects = {}
+
+    def add_input(self, obj, remove_existing_connections=True):
+        assert isinstance(obj, nifi.ProcessorEntity) or isinstance(obj, nifi.PortEntity)
+        assert not self.is_open, "Cannot add inputs to an open test"
+
+        self.inputs.append(obj)
+        if remove_existing_connections:
+            self.connections_to_remove += self.__connections().incoming(obj.component.id)
+
+    def add_output(self, obj, remove_existing_connections=True):
+        assert isinstance(obj, nifi.ProcessorEntity) or isinstance(obj, nifi.PortEntity)
+        assert not self.is_open, "Cannot add outputs to an open test"
+
+        self.outputs.append(obj)
+        if remove_existing_connections:
+            self.connections_to_remove += self.__connections().outgoing(obj.component.id)
+
+    def __connections(self):
+        # One snapshot of the connections in the base for all inputs and outputs, taken on first use
+        if self.__connection_index is None:
+            self.__connection_index = ConnectionIndex.from_process_group(self.base.component.id)
+        return self.__connection_index
+
+    def open(self, output_attributes=None):
+        """
+        Builds the test components on the nifi canvas, starts the base process group and waits until
+            the test takes requests (see readiness). As long as the test is open, every run only costs a
+            single http request
+
+        Args:
+            output_attributes (collections.Iterable of str): List of attributes to capture in the
+                test output
+
+        Returns:
+            (TestHarness): self
+        """
+        if self.is_open:
+            self.add_output_attributes(output_attributes)
+            return self
+
+        host = urlparse(config.nifi_config.host).hostname
+        if self.requested_port is None:
+            self.port = port_pool.default_pool.acquire(host)
+        # While open, changes to the canvas use the revisions learned from earlier responses
+        revision_cache.install()
+        try:
+            # Every change to the canvas is recorded before it is made, see journal
+            self.journal = journal.Journal.start(self.name, self.base.component.id, self.scoped_scheduling)
+        except BaseException:
+            # Nothing was changed yet
+            self.__release()
+            raise
+        try:
+            with instrumentation.phase("build"):
+                # Set up testing infrastructure. This will stop the base
+                self.__build()
+
+                # Adding requested attributes as header parameters
+                self.add_output_attributes(output_attributes)
+
+                # Start complete process group
+                self.__start_base()
+
+                # Posting before the test group takes requests would fail, or wait out the timeout
+                readiness.wait_until_ready([self.test_group.id], host, self.port, self.ready_timeout)
+        except BaseException:
+            try:
+                self.__undo()
+            except Exception:
+                # Logged; the error of opening is the one to raise
+                pass
+            finally:
+                self.__release(port_reusable=False)
+            raise
+        self.is_open = True
+        return self
+
+    def close(self):
+        """
+        Destroys all test components on the nifi canvas and restores the original connections, from the
+            journal. The registered inputs and outputs are kept, so the test can be opened again. The test is
+            closed also when restoring the canvas fails; the journal is then left to journal.recover()
+        """
+        if not self.is_open:
+            return
+        try:
+            self.__undo()
+        finally:
+            self.__release()
+
+    def __undo(self):
+        # Undoes the changes to the canvas, from the journal
+        try:
+            with instrumentation.phase("teardown"):
+                restored = self.journal.undo(self.build_workers)
+            # Recreated connections get a new id; keep those so the test can be opened again
+            self.connections_to_remove = [restored.get(connection.id, connection)
+                                          for connection in self.connections_to_remove]
+        except BaseException:
+            self.journal.abandon()
+            self.logger.error("Could not restore the canvas of test %s; recover it with python -m nipytest.journal",
+                              self.name)
+            raise
+        finally:
+            # Snapshot is outdated now
+            self.__connection_index = None
+            self.__clear_canvas_state()
+
+    def __release(self, port_reusable=True):
+        # Releases what open() took
+        revision_cache.uninstall()
+        if self.requested_port is None and self.port is not None:
+            port_pool.default_pool.release(self.port, port_reusable)
+            self.port = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_output_attributes(self, output_attributes):
+        """
+        Adds attributes to capture in the test output, as header parameters of the HandleHttpResponse.
+            Attributes that were already added are skipped. When the test is open, the
+            HandleHttpResponse is briefly stopped for the update
+
+        Args:
+            output_attributes (collections.Iterable of str): List of attributes to capture in the
+                test output
+        """
+        if output_attributes is None:
+            return
+        new_attributes = [attr for attr in output_attributes if attr not in self.output_attributes]
+        if len(new_attributes) == 0:
+            return
+
+        properties = {}
+        for attr in new_attributes:
+            properties[attr] = "${" + attr + "}"
+
+        self.http_out = self._update_component("http_out", properties)
+        self.output_attributes += new_attributes
+
+    def _update_component(self, key, properties):
+        """
+        Updates the properties of a processor in the test process group. When the test is open, the
+            processor is briefly stopped for the update
+
+        Args:
+            key (str): Key of the processor in the plan of the test process group, e.g. http_out
+            properties (dict): The properties to update
+
+        Returns:
+            (ProcessorEntity): The updated processor
+        """
+        processor = self.components[key]
+        if self.is_open:
+            processor = canvas_ext.schedule_processor(processor, False)
+        processor = canvas_ext.update_processor(processor, nifi.ProcessorConfigDTO(properties=properties))
+        if self.is_open:
+            processor = canvas_ext.schedule_processor(processor, True)
+        self.components[key] = processor
+        return processor
+
+    def run_many(self, cases, output_attributes=None, timeout=5, workers=1):
+        """
+        Runs a batch of test cases through a single build of the test process group. A failing or
+            timed out case does not abort the batch; its error is reported in its result
+            With more than one worker, the cases are posted concurrently. Each request carries its
+            own test_correlation_id, so outputs can not be mixed up between cases. Note that the
+            HandleHttpRequest only queues a limited number of requests (Container Queue Size, 50)
+
+        Args:
+            cases (collections.Iterable of (str, FlowFile)): The input names and flowfiles to post
+            output_attributes (collections.Iterable of str): List of attributes to capture in the
+                test output
+            timeout (integer): Timeout in seconds per case
+            workers (int): Number of requests to keep in flight
+
+        Returns:
+            (list of RunResult): The results, in the order of the cases
+        """
+        assert isinstance(workers, int) and workers > 0
+
+        cases = list(cases)
+        for input_name, flowfile in cases:
+            assert isinstance(input_name, str)
+            assert isinstance(flowfile, FlowFile)
+
+        opened_here = not self.is_open
+        self.open(output_attributes)
+        try:
+            if workers == 1:
+                return [self._run_case(input_name, flowfile, timeout) for input_name, flowfile in cases]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda case: self._run_case(case[0], case[1], timeout), cases))
+        finally:
+            if opened_here:
+                self.close()
+
+    def load(self, input_name, flowfile_source, rate, duration, output_attributes=None, timeout=5, workers=None):
+        """
+        Posts flowfiles at a fixed rate for a period of time through a single build of the test process
+            group. Requests are scheduled up front (open loop): a slow response does not delay the
+            requests after it, and its latency counts from the moment it should have been sent
+            Note that the HandleHttpRequest only queues a limited number of requests (Container Queue
+            Size, 50), so rates above what the flow can handle result in errors
+
+        Args:
+            input_name (str): The input to post the messages to
+            flowfile_source (FlowFile, iterable of FlowFile or callable): The flowfile to post every time,
+                flowfiles to post one after the other (the test ends early when they run out), or a
+                function returning the flowfile to post for the request number
+            rate (float): Requests per second
+            duration (float): Seconds to keep posting
+            output_attributes (collections.Iterable of str): List of attributes to capture in the
+                test output
+            timeout (integer): Timeout in seconds per request
+            workers (int): Maximum number of requests in flight; by default enough for the rate when
+                every request takes the timeout. Unless the test has its own session, the requests are
+                posted over a session that keeps a connection alive for every worker. A session given to
+                the test should keep as many connections, or the extra requests open a new connection each
+
+        Returns:
+            (LoadReport)
+        """
+        assert isinstance(input_name, str)
+        assert rate > 0
+        assert duration > 0
+        if workers is None:
+            workers = min(int(math.ceil(rate * timeout)) + 1, MAX_LOAD_WORKERS)
+        assert isinstance(workers, int) and workers > 0
+
+        next_flowfile = _flowfile_source(flowfile_source)
+        report = LoadReport(rate)
+
+        opened_here = not self.is_open
+        self.open(output_attributes)
+        session = self.session or http_session.create(**dict(http_session.settings(), pool_size=workers))
+        try:
+            start = time.perf_counter()
+            futures = []
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for i in range(int(rate * duration)):
+                    scheduled = start + i / rate
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    try:
+                        flowfile = next_flowfile(i)
+                    except StopIteration:
+                        break
+                    report.record_sent()
+                    futures.append(executor.submit(self.__load_case, input_name, flowfile, timeout, scheduled,
+                                                   report, session))
+            report.finish(time.perf_counter() - start)
+            # __load_case only records the failures of the request; anything else it raised is an error too
+            for future in futures:
+                if future.exception() is not None:
+                    self.logger.error("Load test request to input '%s' raised", input_name,
+                                      exc_info=future.exception())
+                    report.record_error()
+        finally:
+            if session is not self.session:
+                session.close()
+            if opened_here:
+                self.close()
+
+        self.logger.info("Load test of input '%s':\n%s", input_name, report)
+        return report
+
+    def __load_case(self, input_name, flowfile, timeout, scheduled, report, session):
+        try:
+            self._exchange(input_name, flowfile, timeout, session=session)
+        except requests.exceptions.Timeout:
+            report.record_error(timed_out=True)
+        except (requests.exceptions.RequestException, AssertionError, ValueError) as e:
+            self.logger.debug("Load test request to input '%s' failed: %r", input_name, e)
+            report.record_error()
+        else:
+            report.record_latency(time.perf_counter() - scheduled)
+
+    def _run_case(self, input_name, flowfile, timeout):
+        try:
+            output = self._exchange(input_name, flowfile, timeout)
+        except (requests.exceptions.RequestException, AssertionError, ValueError) as e:
+            self.logger.warning("Test case for input '%s' failed: %r", input_name, e)
+            return RunResult(input_name, flowfile, error=e)
+        return RunResult(input_name, flowfile, output)
+
+    def _exchange(self, input_name, flowfile, timeout, stream_response=False, session=None):
+        """
+        Posts a flowfile to the open test and reads the output
+
+        Args:
+            input_name (str): The input to post the message to
+            flowfile (FlowFile): The flowfile and attributes to post
+            timeout (integer): Timeout in seconds
+            stream_response (bool): True to stream the response instead of reading it into memory
+            session (requests.Session): Session to post with; see _post
+
+        Returns:
+            The test output, see _read_response
+        """
+        response = self._post(input_name, flowfile, timeout, stream_response, session)
+        return self._read_response(response, stream_response)
+
+    def _check_correlation(self, output, response):
+        """
+        Checks that an output belongs to the request by its test_correlation_id, and records its
+            duration inside the flow in the statistics
+
+        Args:
+            output (FlowFile): The output
+            response (requests.Response): The response the output was read from
+
+        Returns:
+            (FlowFile): The output
+        """
+        correlation_id = response.request.headers[CORRELATION_ATTRIBUTE]
+        assert output.attributes.get(CORRELATION_ATTRIBUTE) == correlation_id, \
+            "Output does not belong to request " + correlation_id
+        self.statistics.record_output(output)
+        return output
+
+    @abc.abstractmethod
+    def _read_response(self, response, stream_response=False):
+        """
+        Converts the response of the HandleHttpResponse into the test output, checking that it
+            belongs to the request (see _check_correlation)
+
+        Args:
+            response (requests.Response): The response to the posted flowfile
+            stream_response (bool): True when the response was requested as stream
+
+        Returns:
+            The test output; a FlowFile, or the FlowFiles when a test returns more than one
+        """
+
+    @staticmethod
+    def _check_status(response):
+        """
+        Checks that the HandleHttpResponse answered 200. Otherwise the response is closed before raising, so
+            a streamed response does not hold on to its pooled connection
+
+        Args:
+            response (requests.Response): The response to the posted flowfile
+        """
+        if response.status_code != 200:
+            response.close()
+            raise AssertionError("Test response status %d %s" % (response.status_code, response.reason))
+
+    @staticmethod
+    def _spool(response):
+        """
+        Reads a streamed response into a file-like object; in memory for small responses, and in a
+            temporary file for large ones
+
+        Args:
+            response (requests.Response): A response requested as stream
+
+        Returns:
+            (tempfile.SpooledTemporaryFile): The body of the response, positioned at the start
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        with response:
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                spool.write(chunk)
+        spool.seek(0)
+        return spool
+
+    def _post(self, input_name, flowfile, timeout, stream_response=False, session=None):
+        """
+        Posts a flowfile to the HandleHttpRequest of the open test, with a newly generated
+            test_correlation_id
+
+        Args:
+            input_name (str): The input to post the message to
+            flowfile (FlowFile): The flowfile and attributes to post
+            timeout (integer): Timeout in seconds. Will throw requests.exceptions.ReadTimeout
+                when timeout expires
+            stream_response (bool): True to leave the body of the response unread
+            session (requests.Session): Session to post with; by default the session of the test, or the
+                shared session for the host and port (see http_session)
+
+        Returns:
+            (requests.Response)
+        """
+        assert self.is_open, "Test should be opened before posting"
+
+        # Prepare request
+        parsed_url = urlparse(config.nifi_config.host)
+        url = parsed_url.scheme+'://'+parsed_url.hostname+':'+str(self.port)+'/'+self.name
+        headers = dict(flowfile.attributes)
+        headers["test_input_name"] = input_name
+        headers[CORRELATION_ATTRIBUTE] = uuid.uuid4().hex
+
+        # Perform actual request, on a kept alive connection. Streamed content is not read into memory
+        session = session or self.session or http_session.get(url)
+        start = time.perf_counter()
+        try:
+            response = session.post(url, data=flowfile.body(), headers=headers, timeout=timeout,
+                                    stream=stream_response)
+        except requests.exceptions.RequestException as e:
+            self.statistics.record_error(isinstance(e, requests.exceptions.Timeout))
+            raise
+        if response.status_code == 200:
+            self.statistics.record_round_trip(time.perf_counter() - start)
+        else:
+            self.statistics.record_error()
+        return response
+
+    def __remove_outgoing_connections(self):
+        deleted = [connection for connection in self.connections_to_remove if connection.id not in self.__redirects]
+        # A connection from an output to an input is listed for both
+        redirected = list({connection.id: connection for connection in self.connections_to_remove
+                           if connection.id in self.__redirects}.values())
+        self.journal.record_removed_connections(deleted)
+        self.journal.record_redirected_connections(redirected, [connection.id for connection in redirected
+                                                                if self.__redirects[connection.id] == "parking"])
+        canvas_ext.concurrently(lambda connection: canvas_ext.delete_connection(connection, purge=True), deleted,
+                                self.build_workers)
+        self.journal.confirm_deleted_connections(deleted)
+        self.redirected_connections = canvas_ext.concurrently(
+            lambda connection: canvas_ext.redirect_connection(connection,
+                                                              self.components[self.__redirects[connection.id]]),
+            redirected, self.build_workers)
+        self.journal.confirm_redirected_connections(self.redirected_connections)
+
+    def __plan_redirects(self):
+        # The key in the test plan of the new destination of each redirected connection: the test port of
+        # an output, or the parking port for the connections to an input
+        if not self.redirect_connections:
+            return {}
+        output_keys = {output.component.id: "output:%d" % i for i, output in enumerate(self.outputs)}
+        redirects = {}
+        covered = {}
+        # A connection from an output to an input is listed for both
+        for connection in {connection.id: connection for connection in self.connections_to_remove}.values():
+            # Only the connections in the base can lead to the test group
+            if connection.component.parent_group_id != self.base.component.id:
+                continue
+            key = output_keys.get(connection.source_id)
+            if key is None:
+                redirects[connection.id] = "parking"
+                continue
+            # A flowfile of an output reaches its test port once; connections that would duplicate it are
+            # deleted instead. A port has a single, unnamed relationship
+            relationships = set(connection.component.selected_relationships or [""])
+            if covered.setdefault(key, set()).isdisjoint(relationships):
+                covered[key] |= relationships
+                redirects[connection.id] = key
+        return redirects
+
+    def __output_relationships(self, output, key):
+        # The relationships to connect an output to its test port with: all (None), or the ones that are not
+        # redirected to the test port already
+        redirected = [connection for connection in self.connections_to_remove
+                      if self.__redirects.get(connection.id) == key]
+        if not redirected:
+            return None
+        if not isinstance(output, nifi.ProcessorEntity):
+            return []
+        selected = set(relationship for connection in redirected
+                       for relationship in connection.component.selected_relationships or [])
+        return [relationship.name for relationship in output.component.relationships
+                if relationship.name not in selected]
+
+    def __build(self):
+        if self.scoped_scheduling:
+            self.__prepare_scope()
+        self.journal.stop_components()
+        self.__redirects = self.__plan_redirects()
+        self.__create_test_group()
+        self.__remove_outgoing_connections()
+
+    def __create_test_group(self):
+        # Create group, with its owner to find it when the journal is lost
+        self.test_group = canvas_ext.create_process_group(self.base, self.name, (0, 0), journal.owner())
+        self.journal.update(test_group_id=self.test_group.id)
+        # Create contents
+        plan = FlowPlan()
+        self._plan_inputs(plan)
+        self._plan_outputs(plan)
+        if "parking" in self.__redirects.values():
+            plan.add_input_port("parking", canvas_ext.parking_port_component(Location(-400, 0)))
+        if self.use_template:
+            self.logger.debug("Instantiating %d test components from a template", len(plan.keys()))
+            created = canvas_ext.instantiate_plan(self.test_group, plan, self.name + "_" + uuid.uuid4().hex)
+        else:
+            self.logger.debug("Creating %d test components", len(plan.keys()))
+            created = canvas_ext.create_plan(self.test_group, plan, self.build_workers)
+        self.http_context = created["http_context"]
+        self.journal.record_controller_services([self.http_context])
+        self.http_in = created["http_in"]
+        self.http_out = created["http_out"]
+        self.components = created
+        if "parking" in created:
+            # Not started with the test group; the parked flowfiles stay in their connections
+            canvas_ext.disable_input_port(created["parking"])
+
+        # Connect the test group to the flow under test; these connections are independent of each other
+        endpoints = [(created["input:%d" % i], test_input, None) for i, test_input in enumerate(self.inputs)]
+        for i, output in enumerate(self.outputs):
+            relationships = self.__output_relationships(output, "output:%d" % i)
+            if relationships != []:
+                endpoints.append((output, created["output:%d" % i], relationships))
+        self.logger.debug("Connecting %d test ports", len(endpoints))
+        self.test_connections = canvas_ext.concurrently(
+            lambda endpoint: canvas_ext.connect(self.base.component.id, *endpoint), endpoints, self.build_workers)
+        self.journal.record_test_connections(self.test_connections)
+
+    def _plan_inputs(self, plan):
+        """
+        Plans the components that receive the test requests: http context, HandleHttpRequest,
+            UpdateAttribute, RouteOnAttribute and a port per input, keyed "input:<index>"
+
+        Args:
+            plan (FlowPlan): The plan to add the components to
+        """
+        # Http context map for communication
+        http_context_id = plan.add_controller_service(
+            "http_context", canvas_ext.http_context_map_component(self.name))
+
+        # Keep track of "cursor" location on canvas
+        location = Location()
+
+        # Http request for starting a test
+        plan.add_processor("http_in", canvas_ext.request_handler_component(location, http_context_id, self.port))
+
+        location.y += 200
+
+        # Set start time
+        plan.add_processor("in_attribute", canvas_ext.input_attribute_component(location, "Set test start time"))
+        plan.connect("http_in", "in_attribute", ["success"])
+
+        location.y += 200
+
+        # Route request to correct port
+        input_names = [test_input.component.name for test_input in self.inputs]
+        plan.add_processor("in_route", canvas_ext.input_router_component(location, input_names))
+        plan.connect("in_attribute", "in_route", ["success"])
+
+        location.y += 300  # Taking some extra vertical space, because we can have so many ports
+
+        for i, input_name in enumerate(input_names):
+            plan.add_output_port("input:%d" % i, canvas_ext.test_input_component(location, input_name))
+            plan.connect("in_route", "input:%d" % i, [input_name])
+            location.x += 400
+
+    @abc.abstractmethod
+    def _plan_outputs(self, plan):
+        """
+        Plans the components that return the test outputs: a port per output, keyed
+            "output:<index>", up to the HandleHttpResponse, keyed "http_out"
+
+        Args:
+            plan (FlowPlan): The plan to add the components to
+        """
+
+    def __prepare_scope(self):
+        # The components under test run during the test. The other ends of the removed connections are only
+        # stopped, to be able to change their connections
+        self.__scope = ScheduleScope.reachable(self.__connections(), self.inputs, self.outputs)
+        stop_scope = self.__scope.union(ScheduleScope.endpoints(self.connections_to_remove))
+        # Restored when the test is closed, see journal
+        self.journal.update(stop_scope=stop_scope.components, running_before=stop_scope.running().components)
+        self.logger.debug("Scheduling %d components under test", len(self.__scope.components))
+
+    def __start_base(self):
+        if self.scoped_scheduling:
+            self.__scope.schedule(True)
+            canvas_ext.schedule_process_group(self.test_group.component.id, True)
+        else:
+            canvas_ext.schedule_process_group(self.base.component.id, True)
+
+
+def _flowfile_source(flowfile_source):
+    # Function returning the flowfile for a request number; raises StopIteration when the flowfiles run out
+    if isinstance(flowfile_source, FlowFile):
+        return lambda i: flowfile_source
+    if callable(flowfile_source):
+        return flowfile_source
+    flowfiles = iter(flowfile_source)
+    return lambda i: next(flowfiles)
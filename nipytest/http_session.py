@@ -0,0 +1,121 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Shared http sessions for posting test messages. All tests that post to the same host and port use the same
+session, so the connections to the HandleHttpRequest are kept alive and reused between runs
+"""
+import threading
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+
+# Number of connections kept alive per host and port; should be at least the number of concurrent requests
+DEFAULT_POOL_SIZE: int = 10
+
+# Number of times a request is retried when the connection can not be made. Requests that reached nifi are
+# never retried, because that would post the flowfile twice
+DEFAULT_RETRIES: int = 3
+
+# Seconds to wait between retries, doubled on every retry
+DEFAULT_BACKOFF: float = 0.1
+
+_settings = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "retries": DEFAULT_RETRIES,
+    "backoff": DEFAULT_BACKOFF,
+    "keep_alive": True
+}
+_sessions = {}
+_lock = threading.Lock()
+
+
+def configure(pool_size=None, retries=None, backoff=None, keep_alive=None):
+    """
+    Changes the settings of the shared sessions. Sessions that already exist are closed, so the new
+        settings are used from the next request on
+
+    Args:
+        pool_size (int): Number of connections kept alive per host and port
+        retries (int): Number of times a request is retried when the connection can not be made
+        backoff (float): Seconds to wait between retries, doubled on every retry
+        keep_alive (bool): False to close the connection after every request
+    """
+    assert pool_size is None or (isinstance(pool_size, int) and pool_size > 0)
+    assert retries is None or (isinstance(retries, int) and retries >= 0)
+    assert backoff is None or backoff >= 0
+    assert keep_alive is None or isinstance(keep_alive, bool)
+
+    with _lock:
+        for key, value in [("pool_size", pool_size), ("retries", retries), ("backoff", backoff),
+                           ("keep_alive", keep_alive)]:
+            if value is not None:
+                _settings[key] = value
+    close_all()
+
+
+def settings():
+    """
+    Returns:
+        (dict): The settings of the shared sessions, as keyword arguments of create()
+    """
+    with _lock:
+        return dict(_settings)
+
+
+def get(url):
+    """
+    Returns the shared session for the scheme, host and port of a url; created on first use
+
+    Args:
+        url (str): Url to post to
+
+    Returns:
+        (requests.Session)
+    """
+    parsed_url = urlparse(url)
+    key = (parsed_url.scheme, parsed_url.hostname, parsed_url.port)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = create(**_settings)
+    return session
+
+
+def create(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, keep_alive=True):
+    """
+    Creates a new session with its own connection pool
+
+    Args:
+        pool_size (int): Number of connections kept alive per host and port
+        retries (int): Number of times a request is retried when the connection can not be made
+        backoff (float): Seconds to wait between retries, doubled on every retry
+        keep_alive (bool): False to close the connection after every request
+
+    Returns:
+        (requests.Session)
+    """
+    # Only failed connects are retried; a read or status retry would post the flowfile again
+    retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=backoff)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def close_all():
+    """
+    Closes all shared sessions and their connections
+    """
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
@@ -0,0 +1,297 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Timing of the nifi REST calls made through nipyapi. Once enabled, every call is recorded with its method,
+endpoint, status, latency and payload sizes, and handed to the listeners: the in-process profile, an optional
+structured (json lines) log and anything registered with add_listener
+Calls are labelled with the phase they were made in (e.g. build or teardown), see phase()
+"""
+import json
+import logging
+import threading
+import time
+
+from contextlib import contextmanager
+from nipyapi.nifi import ApiClient
+from nipyapi.nifi.rest import RESTClientObject, ApiException
+
+logger = logging.getLogger("nipytest.instrumentation")
+
+# Phase of calls made outside of any phase
+NO_PHASE: str = "-"
+
+
+class CallRecord(object):
+    """
+    A single REST call
+    """
+
+    def __init__(self, method, endpoint, phase, status, seconds, request_bytes, response_bytes, response=None):
+        """
+        Args:
+            method (str): Http method
+            endpoint (str): Resource path, with its parameters as placeholders, e.g. /processors/{id}
+            phase (str): Phase the call was made in
+            status (int): Http status, or None when no response was received
+            seconds (float): Latency
+            request_bytes (int): Size of the request body
+            response_bytes (int): Size of the response body
+            response: The deserialized response, e.g. a ProcessorEntity; None on failure
+        """
+        self.method = method
+        self.endpoint = endpoint
+        self.phase = phase
+        self.status = status
+        self.seconds = seconds
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+        self.response = response
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "endpoint": self.endpoint,
+            "phase": self.phase,
+            "status": self.status,
+            "ms": round(self.seconds * 1000, 3),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes
+        }
+
+    def __str__(self):
+        return json.dumps(self.to_dict())
+
+    __repr__ = __str__
+
+
+class Profile(object):
+    """
+    Number of calls, total and maximum latency and payload sizes per phase, method and endpoint.
+    Safe to use from concurrent calls
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__entries = {}
+
+    def __call__(self, record):
+        key = (record.phase, record.method, record.endpoint)
+        with self.__lock:
+            entry = self.__entries.setdefault(key, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                                    "request_bytes": 0, "response_bytes": 0})
+            milliseconds = record.seconds * 1000
+            entry["count"] += 1
+            if record.status is None or record.status >= 400:
+                entry["errors"] += 1
+            entry["total_ms"] += milliseconds
+            entry["max_ms"] = max(entry["max_ms"], milliseconds)
+            entry["request_bytes"] += record.request_bytes
+            entry["response_bytes"] += record.response_bytes
+
+    def entries(self):
+        """
+        Returns:
+            (list of dict): Phase, method, endpoint, count, errors, total_ms, max_ms, request_bytes and
+                response_bytes, slowest (by total) first
+        """
+        with self.__lock:
+            entries = [dict(entry, phase=phase, method=method, endpoint=endpoint)
+                       for (phase, method, endpoint), entry in self.__entries.items()]
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+    def phases(self):
+        """
+        Returns:
+            (dict of str: dict): Number of calls and total_ms per phase
+        """
+        phases = {}
+        for entry in self.entries():
+            totals = phases.setdefault(entry["phase"], {"count": 0, "total_ms": 0.0})
+            totals["count"] += entry["count"]
+            totals["total_ms"] += entry["total_ms"]
+        return phases
+
+    def report(self):
+        """
+        Returns:
+            (str): The profile as a table
+        """
+        lines = ["%-10s%-8s%-60s%8s%8s%12s%10s" % ("phase", "method", "endpoint", "count", "errors", "total ms",
+                                                   "max ms")]
+        for entry in self.entries():
+            lines.append("%-10s%-8s%-60s%8d%8d%12.1f%10.1f" % (
+                entry["phase"], entry["method"], entry["endpoint"], entry["count"], entry["errors"],
+                entry["total_ms"], entry["max_ms"]))
+        return "\n".join(lines)
+
+
+# The in-process profile, fed while instrumentation is enabled
+profile = Profile()
+
+_listeners = []
+_local = threading.local()
+_lock = threading.Lock()
+_originals = {}
+_log_file = None
+_enabled = False
+
+
+def enable(log_file=None):
+    """
+    Starts recording all nipyapi calls to the nifi api. Calls are added to the profile
+
+    Args:
+        log_file (str): Path of a file to append every call to, as a line of json
+    """
+    global _log_file, _enabled
+    with _lock:
+        if log_file is not None and _log_file is None:
+            _log_file = open(log_file, "a", encoding="utf-8")
+        _enabled = True
+        _install()
+
+
+def disable():
+    """
+    Stops recording calls. The profile is kept. Listeners are still called
+    """
+    global _log_file, _enabled
+    with _lock:
+        _enabled = False
+        if _log_file is not None:
+            _log_file.close()
+            _log_file = None
+        if not _listeners:
+            _uninstall()
+
+
+def is_enabled():
+    return _enabled
+
+
+def add_listener(listener):
+    """
+    Registers a function to call with the CallRecord of every call, from the thread that made the call.
+        Listeners are called whether or not recording is enabled
+
+    Args:
+        listener (callable): Function taking a CallRecord
+    """
+    with _lock:
+        _listeners.append(listener)
+        _install()
+
+
+def remove_listener(listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+        if not _listeners and not _enabled:
+            _uninstall()
+
+
+def _install():
+    # Wraps the nipyapi calls, once
+    if not _originals:
+        _originals["call_api"] = ApiClient.call_api
+        _originals["request"] = RESTClientObject.request
+        ApiClient.call_api = _call_api
+        RESTClientObject.request = _request
+
+
+def _uninstall():
+    if _originals:
+        ApiClient.call_api = _originals.pop("call_api")
+        RESTClientObject.request = _originals.pop("request")
+
+
+@contextmanager
+def phase(name):
+    """
+    Labels the calls made by this thread inside the with block
+
+    Args:
+        name (str): Name of the phase, e.g. build
+    """
+    previous = current_phase()
+    _local.phase = name
+    try:
+        yield
+    finally:
+        _local.phase = previous
+
+
+def current_phase():
+    return getattr(_local, "phase", NO_PHASE)
+
+
+def propagate(function):
+    """
+    Wraps a function that is run on another thread, so its calls are labelled with the phase of the
+        current thread
+
+    Args:
+        function (callable): The function
+
+    Returns:
+        (callable)
+    """
+    name = current_phase()
+
+    def run_in_phase(*args, **kwargs):
+        with phase(name):
+            return function(*args, **kwargs)
+    return run_in_phase
+
+
+def _call_api(self, resource_path, method, *args, **kwargs):
+    # The body and response sizes are filled in by _request, which runs within this call on the same thread
+    _local.sizes = [0, 0, None]
+    start = time.perf_counter()
+    response = None
+    status = None
+    try:
+        response = _originals["call_api"](self, resource_path, method, *args, **kwargs)
+        status = _local.sizes[2]
+        return response
+    except ApiException as e:
+        status = e.status
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        request_bytes, response_bytes = _local.sizes[0], _local.sizes[1]
+        result = response[0] if isinstance(response, tuple) else response
+        _notify(CallRecord(method, resource_path, current_phase(), status, seconds, request_bytes, response_bytes,
+                           result))
+
+
+def _request(self, method, url, *args, **kwargs):
+    body = kwargs.get("body", args[2] if len(args) > 2 else None)
+    sizes = getattr(_local, "sizes", None)
+    if sizes is not None and body is not None:
+        sizes[0] = len(body) if isinstance(body, (str, bytes)) else len(json.dumps(body))
+    response = _originals["request"](self, method, url, *args, **kwargs)
+    if sizes is not None:
+        sizes[1] = len(response.data) if response.data is not None else 0
+        sizes[2] = response.status
+    return response
+
+
+def _notify(record):
+    if _enabled:
+        if _log_file is not None:
+            line = str(record) + "\n"
+            with _lock:
+                _log_file.write(line)
+                _log_file.flush()
+        logger.debug("%s %s (%s): %s in %.1f ms", record.method, record.endpoint, record.phase, record.status,
+                     record.seconds * 1000)
+        profile(record)
+    for listener in list(_listeners):
+        listener(record)
@@ -0,0 +1,567 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+On-disk record of what an open test changed on the canvas: the test process group it created, the
+connections it removed or redirected and the components it stopped. The journal is written before each change;
+closing the test undoes the changes from the journal (Journal.undo) and removes it. When a test process dies
+before that, or closing fails, recover() restores the canvas from the journals that are left, all in one
+pass. Test process groups of ended processes of which the journal is
+lost are found by their name (TEST_GROUP_PREFIX) and deleted:
+
+    python -m nipytest.journal --host http://<host>:8080/nifi-api
+"""
+import argparse
+import ctypes
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from nipyapi import nifi, canvas, config
+from nipyapi.nifi.rest import ApiException
+from nipytest import canvas_extension as canvas_ext
+from nipytest.schedule_scope import ScheduleScope
+
+logger = logging.getLogger("nipytest.journal")
+
+# Environment variable with the directory of the journals
+DIRECTORY_ENV: str = "NIPYTEST_JOURNAL_DIR"
+
+# Directory of the journals when DIRECTORY_ENV is not set
+DEFAULT_DIRECTORY: str = os.path.join(tempfile.gettempdir(), "nipytest-journal")
+
+# Extension of the journal files
+EXTENSION: str = ".json"
+
+# Prefix of the names of the test process groups; unlike the sandboxes (nipytest_<run id>), as run ids are
+# hexadecimal or numeric
+TEST_GROUP_PREFIX: str = "nipytest_test_"
+
+# Maximum number of concurrent requests per test while restoring the canvas
+RESTORE_WORKERS: int = 8
+
+# Access right to query the exit code of a Windows process
+PROCESS_QUERY_LIMITED_INFORMATION: int = 0x1000
+
+# Windows error of OpenProcess when no process has the id
+ERROR_INVALID_PARAMETER: int = 87
+
+# Exit code of a Windows process that has not ended
+STILL_ACTIVE: int = 259
+
+
+class Journal(object):
+    """
+    The changes of a single open test, written to a json file on every update. The changes are undone step by
+    step (see undo()); every step records its progress, so undoing can be repeated after a failure without
+    repeating what was done
+    """
+
+    def __init__(self, path, entry):
+        """
+        Args:
+            path (str): The journal file
+            entry (dict): The contents of the journal
+        """
+        self.path = path
+        self.entry = entry
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def start(cls, test_name, base_id, scoped_scheduling, directory=None):
+        """
+        Starts the journal of a test that is being opened
+
+        Args:
+            test_name (str): Name of the test
+            base_id (str): Id of the base process group of the test
+            scoped_scheduling (bool): True when only the components under test are stopped and started,
+                False when the whole base is
+            directory (str): Directory of the journal; see journal_directory()
+
+        Returns:
+            (Journal)
+        """
+        directory = journal_directory(directory)
+        os.makedirs(directory, exist_ok=True)
+        journal = cls(os.path.join(directory, test_name + EXTENSION), {
+            "host": config.nifi_config.host,
+            "machine": socket.gethostname(),
+            "pid": os.getpid(),
+            "started": time.time(),
+            "test": test_name,
+            "base_id": base_id,
+            "scoped_scheduling": scoped_scheduling,
+            # True when the test leaves undoing its changes to recover()
+            "abandoned": False,
+            # Components to stop before changing connections, and to start afterwards, when scoped
+            "stop_scope": {},
+            "running_before": {},
+            "test_group_id": None,
+            "test_connections": [],
+            "controller_services": [],
+            # Connections to delete, and the ones that are deleted; until recreated
+            "removed_connections": [],
+            "deleted_connection_ids": [],
+            # New id of each recreated connection, by its original id
+            "recreated_connections": {},
+            # Connections to redirect, with their original destination, and the ones that are redirected; until
+            # pointed back
+            "redirected_connections": [],
+            "redirected_connection_ids": [],
+            "parked_connection_ids": []
+        })
+        journal.__write()
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as file:
+            return cls(path, json.load(file))
+
+    def update(self, **changes):
+        """
+        Records changes, before they are made on the canvas
+
+        Args:
+            **changes: The keys of the entry to change, e.g. test_group_id
+        """
+        self.__record(lambda entry: entry.update(changes))
+
+    def record_test_connections(self, connections):
+        """
+        Args:
+            connections (list of ConnectionEntity): Connections between the test group and the base
+        """
+        self.update(test_connections=_dumped(connections))
+
+    def record_controller_services(self, controller_services):
+        """
+        Args:
+            controller_services (list of ControllerServiceEntity): Controller services in the test group
+        """
+        self.update(controller_services=_dumped(controller_services))
+
+    def record_removed_connections(self, connections):
+        """
+        Args:
+            connections (list of ConnectionEntity): Connections that are about to be deleted
+        """
+        self.update(removed_connections=_dumped(connections))
+
+    def confirm_deleted_connections(self, connections):
+        """
+        Args:
+            connections (list of ConnectionEntity): Connections that are deleted; connections that are not
+                confirmed are looked up before they are recreated
+        """
+        self.update(deleted_connection_ids=[connection.id for connection in connections])
+
+    def record_redirected_connections(self, connections, parked_connection_ids=()):
+        """
+        Args:
+            connections (list of ConnectionEntity): Connections that are about to be redirected to the test
+                group, with their original destination
+            parked_connection_ids (list of str): The connections among them that are redirected to the
+                parking port; the flowfiles in those are not purged when they are pointed back
+        """
+        self.update(redirected_connections=_dumped(connections), parked_connection_ids=list(parked_connection_ids))
+
+    def confirm_redirected_connections(self, connections):
+        """
+        Args:
+            connections (list of ConnectionEntity): Connections that are redirected; connections that are
+                not confirmed are looked up before they are pointed back
+        """
+        self.update(redirected_connection_ids=[connection.id for connection in connections])
+
+    def undo(self, workers=1):
+        """
+        Undoes the changes of the test: stops the components, points the redirected connections back, deletes
+            the test group, recreates the removed connections and starts the components again. The journal
+            is removed once all is undone
+
+        Args:
+            workers (int): Maximum number of concurrent requests
+
+        Returns:
+            (dict of str: ConnectionEntity): The connections that were pointed back or recreated, by their
+                id before the test was opened
+        """
+        self.stop_components()
+        restored = {connection.id: connection for connection in self.point_back_connections(workers)}
+        self.delete_test_group(workers)
+        restored.update(self.recreate_connections(workers))
+        self.start_components()
+        self.finish()
+        return restored
+
+    def stop_components(self):
+        """
+        Stops the base process group or, when scoped, the components in the stop scope and the test group
+        """
+        if not self.entry["scoped_scheduling"]:
+            canvas_ext.schedule_process_group(self.entry["base_id"], False)
+            return
+        ScheduleScope(self.entry["stop_scope"]).schedule(False)
+        # Unless scoped, the test group is stopped with the base
+        try:
+            if self.entry["test_group_id"] is not None:
+                canvas_ext.schedule_process_group(self.entry["test_group_id"], False)
+        except ApiException as e:
+            # Deleted before the test process ended
+            if e.status != 404:
+                raise
+
+    def start_components(self):
+        """
+        Starts the base process group or, when scoped, the components that were running before the test
+        """
+        if self.entry["scoped_scheduling"]:
+            ScheduleScope(self.entry["running_before"]).schedule(True)
+        else:
+            canvas_ext.schedule_process_group(self.entry["base_id"], True)
+
+    def point_back_connections(self, workers=1):
+        """
+        Points the redirected connections back to their original destination. The flowfiles in them are
+            purged first, as test flowfiles must not reach the flow; parked flowfiles are the flow's own
+
+        Args:
+            workers (int): Maximum number of concurrent requests
+
+        Returns:
+            (list of ConnectionEntity): The connections that were pointed back
+        """
+        connections = _loaded(self.entry["redirected_connections"])
+        if not connections:
+            return []
+        redirected = set(self.entry["redirected_connection_ids"])
+        parked = set(self.entry["parked_connection_ids"])
+        queued = canvas_ext.queued_connections(self.entry["base_id"])
+
+        def point_back(connection):
+            if connection.id not in redirected:
+                current = _fetch(nifi.ConnectionsApi().get_connection, connection.id)
+                if current is None or current.component.destination.id == connection.component.destination.id:
+                    self.__record(lambda entry: _discard(entry["redirected_connections"], connection.id))
+                    return None
+            if connection.id in queued and connection.id not in parked:
+                canvas.purge_connection(connection.id)
+            pointed_back = canvas_ext.redirect_connection(connection, connection.component.destination)
+            self.__record(lambda entry: _discard(entry["redirected_connections"], connection.id))
+            return pointed_back
+
+        return [connection for connection in canvas_ext.concurrently(point_back, connections, workers)
+                if connection is not None]
+
+    def delete_test_group(self, workers=1):
+        """
+        Deletes the test group: the connections to and from it, its controller services and the group itself.
+            When nifi refuses, e.g. because flowfiles are left in its queues, it is deleted by force
+
+        Args:
+            workers (int): Maximum number of concurrent requests
+        """
+        group_id = self.entry["test_group_id"]
+        if group_id is None:
+            return
+        # The latest revision is taken from the revision cache, or fetched when nifi rejects this one
+        group = nifi.ProcessGroupEntity(id=group_id, revision=nifi.RevisionDTO(version=0))
+        try:
+            canvas_ext.remove_process_group(group, _loaded(self.entry["test_connections"]),
+                                            _loaded(self.entry["controller_services"], "ControllerServiceEntity"),
+                                            False, workers)
+        except ApiException as e:
+            logger.debug("Could not remove test group %s, deleting it by force: %s", self.entry["test"], e.reason)
+            group = _fetch(nifi.ProcessGroupsApi().get_process_group, group_id)
+            if group is not None:
+                canvas.delete_process_group(group, force=True)
+        self.update(test_group_id=None, test_connections=[], controller_services=[])
+
+    def recreate_connections(self, workers=1):
+        """
+        Recreates the deleted connections; nifi gives them a new id
+
+        Args:
+            workers (int): Maximum number of concurrent requests
+
+        Returns:
+            (dict of str: ConnectionEntity): The recreated connections, by their original id
+        """
+        deleted = set(self.entry["deleted_connection_ids"])
+
+        def recreate(connection):
+            original_id = connection.id
+            if original_id not in deleted and _fetch(nifi.ConnectionsApi().get_connection, original_id) is not None:
+                # Not deleted before the test process ended
+                self.__record(lambda entry: _discard(entry["removed_connections"], original_id))
+                return None
+            recreated = canvas_ext.recreate_connection(connection)
+
+            def record(entry):
+                _discard(entry["removed_connections"], original_id)
+                entry["recreated_connections"][original_id] = recreated.id
+            self.__record(record)
+            return original_id, recreated
+
+        return dict(item for item in canvas_ext.concurrently(recreate, _loaded(self.entry["removed_connections"]),
+                                                             workers) if item is not None)
+
+    def abandon(self):
+        """
+        Leaves undoing the changes to recover(), e.g. after undo() failed
+        """
+        self.update(abandoned=True)
+
+    def finish(self):
+        """
+        Removes the journal, once the canvas is restored
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def is_abandoned(self):
+        # The process that wrote the journal does not run anymore, or left undoing the changes to recover()
+        return self.entry.get("abandoned", False) or _is_ended(self.entry["machine"], self.entry["pid"])
+
+    def __record(self, change):
+        # Changes the entry and writes it; steps record their progress from concurrent threads
+        with self.__lock:
+            change(self.entry)
+            self.__write()
+
+    def __write(self):
+        # Replaces the file at once, so a crash never leaves half a journal
+        temporary = "%s.%s.tmp" % (self.path, uuid.uuid4().hex)
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.entry, file)
+        os.replace(temporary, self.path)
+
+
+def journal_directory(directory=None):
+    return directory or os.environ.get(DIRECTORY_ENV) or DEFAULT_DIRECTORY
+
+
+def owner():
+    """
+    Returns:
+        (str): The comments of a new test process group: the machine and process that own it, to find it when
+            it is left without a journal, see orphaned_groups()
+    """
+    return json.dumps({"machine": socket.gethostname(), "pid": os.getpid()})
+
+
+def pending(directory=None):
+    """
+    Args:
+        directory (str): Directory of the journals; see journal_directory()
+
+    Returns:
+        (list of Journal): The journals left by tests against the configured nifi host, of which the process
+            ended
+    """
+    directory = journal_directory(directory)
+    if not os.path.isdir(directory):
+        return []
+    journals = [Journal.load(os.path.join(directory, name)) for name in sorted(os.listdir(directory))
+                if name.endswith(EXTENSION)]
+    return [journal for journal in journals
+            if journal.entry["host"] == config.nifi_config.host and journal.is_abandoned()]
+
+
+def recover(directory=None):
+    """
+    Restores the canvas from the journals of tests that were not closed; see restore()
+
+    Args:
+        directory (str): Directory of the journals; see journal_directory()
+
+    Returns:
+        (list of Journal): The journals that could not be restored
+    """
+    journals = pending(directory)
+    if journals:
+        logger.info("Recovering %d tests: %s", len(journals), ", ".join(j.entry["test"] for j in journals))
+    failed = restore(journals)
+    for group in orphaned_groups(directory):
+        logger.info("Deleting test group %s, left without journal", group.component.name)
+        try:
+            _delete_orphaned_group(group)
+        except (ApiException, ValueError) as e:
+            logger.warning("Could not delete test group %s: %r", group.component.name, e)
+    return failed
+
+
+def orphaned_groups(directory=None):
+    """
+    Finds the test process groups of ended processes that have no journal (anymore), e.g. because the
+        journal directory was lost. The canvas is restored only as far as deleting them
+
+    Args:
+        directory (str): Directory of the journals; see journal_directory()
+
+    Returns:
+        (list of ProcessGroupEntity): The test process groups
+    """
+    directory = journal_directory(directory)
+    # The groups of journals that were not restored are left to the next recover()
+    journaled = set(Journal.load(os.path.join(directory, name)).entry["test_group_id"]
+                    for name in (os.listdir(directory) if os.path.isdir(directory) else [])
+                    if name.endswith(EXTENSION))
+    return [group for group in canvas.list_all_process_groups(canvas.get_root_pg_id())
+            if group.component.name.startswith(TEST_GROUP_PREFIX) and group.id not in journaled
+            and _is_orphaned(group.component.comments)]
+
+
+def restore(journals, workers=RESTORE_WORKERS):
+    """
+    Undoes the changes of tests, all tests at once, in the steps of Journal.undo(). A journal is removed when
+        all its changes are undone
+
+    Args:
+        journals (list of Journal): The journals of the tests
+        workers (int): Maximum number of concurrent requests per test
+
+    Returns:
+        (list of Journal): The journals that could not be restored
+    """
+    failed = {}
+
+    def each(step, function):
+        for journal in journals:
+            if journal.path in failed:
+                continue
+            try:
+                function(journal)
+            except (ApiException, ValueError) as e:
+                logger.warning("Could not %s for test %s: %r", step, journal.entry["test"], e)
+                failed[journal.path] = journal
+
+    each("stop the components", Journal.stop_components)
+    each("point the connections back", lambda journal: journal.point_back_connections(workers))
+    each("delete the test group", lambda journal: journal.delete_test_group(workers))
+    each("recreate the connections", lambda journal: journal.recreate_connections(workers))
+    each("start the components", Journal.start_components)
+    for journal in journals:
+        if journal.path not in failed:
+            journal.finish()
+    return list(failed.values())
+
+
+def _delete_orphaned_group(group):
+    # The connections between the group and its parent are unknown; nifi refuses to delete a group they lead to
+    parent_id = group.component.parent_group_id
+    connections = [connection for connection in canvas.list_all_connections(parent_id, descendants=False)
+                   if group.id in (connection.source_group_id, connection.destination_group_id)]
+    canvas_ext.schedule_process_group(group.id, False)
+    # Their ends in the parent are stopped while they are deleted
+    outside = ScheduleScope({component_id: group_id for component_id, group_id
+                             in ScheduleScope.endpoints(connections).components.items()
+                             if group_id == parent_id}).running()
+    outside.schedule(False)
+    for connection in connections:
+        canvas_ext.delete_connection(connection, purge=True)
+    canvas.delete_process_group(canvas.get_process_group(group.id, 'id'), force=True)
+    outside.schedule(True)
+
+
+def _is_orphaned(comments):
+    # The comments of a test group name its owner, see owner()
+    try:
+        owned_by = json.loads(comments or "")
+        return _is_ended(owned_by["machine"], owned_by["pid"])
+    except (ValueError, TypeError, KeyError):
+        return False
+
+
+def _is_ended(machine, pid):
+    # Only processes on this machine can be checked
+    if machine != socket.gethostname():
+        return False
+    return pid != os.getpid() and not _is_running(pid)
+
+
+def _dumped(entities):
+    serializer = nifi.ApiClient()
+    return [serializer.sanitize_for_serialization(entity) for entity in entities]
+
+
+def _loaded(dumped_entities, entity_type="ConnectionEntity"):
+    # The api client deserializes the data of a response
+    deserializer = nifi.ApiClient()
+    return [deserializer.deserialize(SimpleNamespace(data=json.dumps(dumped)), entity_type)
+            for dumped in dumped_entities]
+
+
+def _discard(dumped_entities, entity_id):
+    # Removes an entity from a list in the entry, once its change is undone
+    dumped_entities[:] = [dumped for dumped in dumped_entities if dumped["id"] != entity_id]
+
+
+def _fetch(get, component_id):
+    # The component, or None when it does not exist (anymore)
+    if component_id is None:
+        return None
+    try:
+        return get(component_id)
+    except ApiException as e:
+        if e.status == 404:
+            return None
+        raise
+
+
+def _is_running(pid):
+    # Unless it is proven to have ended, a process is taken to run; other processes may be running tests
+    if os.name == "nt":
+        return _is_running_on_windows(pid)
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_running_on_windows(pid):
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        # No such process; when access is denied, it runs
+        return ctypes.get_last_error() != ERROR_INVALID_PARAMETER
+    try:
+        exit_code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return True
+        return exit_code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Restores the canvas from the journals of tests that were not "
+                                                 "closed")
+    parser.add_argument("--host", default=config.nifi_config.host, help="Nifi api url, e.g. "
+                                                                        "http://localhost:8080/nifi-api")
+    parser.add_argument("--directory", default=None, help="Directory of the journals")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    config.nifi_config.host = options.host
+    config.nifi_config.api_client = None
+    failed = recover(options.directory)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,25 +3,95 @@ Created on 18 Feb 2019
 
 @author: Frank Ypma
 """
+import io
+import mmap
 
 
 class FlowFile(object):
     """"
     Mock object for a nifi message, containing flowfile content and a dict of attributes
-    For now, only string content is accepted, but that could be expanded
+    The content can be a string, bytes, a (binary) file-like object, a memory-mapped file or an
+        iterator of byte chunks. Files and memory-mapped files are streamed when posted; iterators are
+        posted with chunked transfer encoding. Files and iterators can only be posted once
     """
 
     def __init__(self, content="", attributes=None):
-        assert isinstance(content, str)
-        assert isinstance(attributes, dict)
-        
+        assert isinstance(content, (str, bytes, bytearray, memoryview, mmap.mmap)) \
+            or hasattr(content, "read") or hasattr(content, "__next__")
+        assert attributes is None or isinstance(attributes, dict)
+
         self.content = content
         if attributes is None:
             self.attributes = {}
         else:
             self.attributes = attributes
-            
+
+    @classmethod
+    def from_file(cls, path, attributes=None, memory_map=False):
+        """
+        Creates a flowfile with the content of a file, without reading the file into memory.
+            Close the flowfile (or use it as context manager) to close the file
+
+        Args:
+            path (str): Path of the file
+            attributes (dict): The attributes of the flowfile
+            memory_map (bool): True to map the file into memory instead of reading it as a stream;
+                the flowfile can then be posted more than once
+
+        Returns:
+            (FlowFile)
+        """
+        file = open(path, "rb")
+        if not memory_map:
+            return cls(file, attributes)
+        with file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), attributes)
+
+    def body(self):
+        """
+        Returns:
+            The content as it should be posted. A memory-mapped file is posted through a view on the mapped
+                memory, so it is not copied and can be posted concurrently
+        """
+        if isinstance(self.content, mmap.mmap):
+            return memoryview(self.content)
+        return self.content
+
+    def read(self):
+        """
+        Returns:
+            (bytes): The complete content. Note that this reads streamed content into memory
+        """
+        if isinstance(self.content, str):
+            return self.content.encode("utf-8")
+        if isinstance(self.content, (bytes, bytearray, memoryview, mmap.mmap)):
+            return bytes(self.content[:])
+        if hasattr(self.content, "read"):
+            return self.content.read()
+        return b"".join(self.content)
+
+    def close(self):
+        """
+        Closes the content, when it is a file or memory-mapped file
+        """
+        if hasattr(self.content, "close"):
+            self.content.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def __str__(self):
-        return f"{{'content': '{self.content}', 'attributes': {self.attributes!r}}}"
+        if isinstance(self.content, str):
+            content = self.content
+        elif isinstance(self.content, (bytes, bytearray, memoryview, mmap.mmap)):
+            content = f"<{len(self.content)} bytes>"
+        elif isinstance(self.content, io.IOBase):
+            content = f"<{type(self.content).__name__}>"
+        else:
+            content = "<stream>"
+        return f"{{'content': '{content}', 'attributes': {self.attributes!r}}}"
 
     __repr__ = __str__
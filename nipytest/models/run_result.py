@@ -0,0 +1,37 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+
+import requests
+
+
+class RunResult(object):
+    """
+    Outcome of a single test case in a batch: the output flowfile if the case succeeded,
+    the error if it did not
+    """
+
+    def __init__(self, input_name, flowfile, output=None, error=None):
+        assert isinstance(input_name, str)
+
+        self.input_name = input_name
+        self.flowfile = flowfile
+        self.output = output
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def timed_out(self):
+        return isinstance(self.error, requests.exceptions.Timeout)
+
+    def __str__(self):
+        if self.ok:
+            return f"{{'input_name': '{self.input_name}', 'output': {self.output!r}}}"
+        return f"{{'input_name': '{self.input_name}', 'error': {self.error!r}}}"
+
+    __repr__ = __str__
@@ -0,0 +1,117 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Ports for the HandleHttpRequest of the tests. Tests that are open at the same time against the same nifi
+need a port each; a test without a fixed port takes one from the pool when it is opened and returns it when
+it is closed. Workers of a parallel run (see worker) each take ports from their own part of the range
+"""
+import collections
+import os
+import socket
+import threading
+
+from nipytest import worker
+
+# Ports handed out by the default pool
+DEFAULT_PORTS: range = range(18000, 19000)
+
+# Seconds to wait for a connection when checking whether a port is in use
+PROBE_TIMEOUT: float = 0.5
+
+# Seconds to wait for a connection to a port on this machine; it is refused right away when nothing listens
+LOOPBACK_PROBE_TIMEOUT: float = 0.05
+
+# Host names of this machine
+LOOPBACK_HOSTS: tuple = ("localhost", "127.0.0.1", "::1")
+
+
+class PortPool(object):
+    """
+    Hands out ports that are not handed out already and on which nothing accepts connections on the nifi
+    host. Processes start looking at a different port (by process id), so tests in different processes
+    rarely try the same port at the same time. Ports that were released are handed out again first, without
+    checking them again. Safe to use from concurrent threads
+    """
+
+    def __init__(self, ports=DEFAULT_PORTS):
+        """
+        Args:
+            ports (range): The ports to hand out
+        """
+        assert isinstance(ports, range) and len(ports) > 0
+
+        self.ports = ports
+        self.__lock = threading.Lock()
+        self.__in_use = set()
+        # Ports that were handed out and released, known to be free; the longest released first
+        self.__released = collections.deque()
+        self.__next = os.getpid() % len(ports)
+
+    def acquire(self, host):
+        """
+        Args:
+            host (str): The nifi host the port will be listened on
+
+        Returns:
+            (int): A free port; to be released when no longer used
+        """
+        assert isinstance(host, str)
+
+        with self.__lock:
+            while self.__released:
+                port = self.__released.popleft()
+                if port not in self.__in_use:
+                    self.__in_use.add(port)
+                    return port
+        timeout = LOOPBACK_PROBE_TIMEOUT if host in LOOPBACK_HOSTS else PROBE_TIMEOUT
+        for _ in range(len(self.ports)):
+            with self.__lock:
+                port = self.ports[self.__next]
+                self.__next = (self.__next + 1) % len(self.ports)
+                if port in self.__in_use:
+                    continue
+                self.__in_use.add(port)
+            if not accepts_connections(host, port, timeout):
+                return port
+            self.release(port, reusable=False)
+        raise ValueError("No free port in %d-%d on %s" % (self.ports[0], self.ports[-1], host))
+
+    def release(self, port, reusable=True):
+        """
+        Args:
+            port (int): A port handed out by acquire()
+            reusable (bool): False when the port may still be in use, e.g. after a failed open; it is checked
+                again before it is handed out again
+        """
+        with self.__lock:
+            if port in self.__in_use:
+                self.__in_use.discard(port)
+                if reusable:
+                    self.__released.append(port)
+
+    def in_use(self):
+        with self.__lock:
+            return sorted(self.__in_use)
+
+
+# The pool of the tests without a fixed port; when run as one of several workers, its share of the ports
+default_pool = PortPool(worker.share(DEFAULT_PORTS))
+
+
+def accepts_connections(host, port, timeout=PROBE_TIMEOUT):
+    """
+    Args:
+        host (str): The host
+        port (int): The port
+        timeout (float): Seconds to wait for the connection
+
+    Returns:
+        (bool): True when something listens on the port
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
@@ -0,0 +1,22 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Fixtures for tests run with pytest, also in parallel with pytest-xdist (pytest -n <workers>). Enable with
+    pytest_plugins = ["nipytest.pytest_plugin"]
+in conftest.py. The worker of each process is taken from the environment of pytest-xdist, see worker
+"""
+import pytest
+
+from nipytest import worker
+
+
+@pytest.fixture(scope="session")
+def nifi_sandbox():
+    """
+    The process group of this worker to build tests in, removed at the end of the session. The nifi host
+        must be configured before the fixture is used
+    """
+    yield worker.sandbox()
+    worker.remove_sandbox()
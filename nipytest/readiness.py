@@ -0,0 +1,91 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Readiness of a test after it was started. Nifi returns from starting a process group before its controller
+services are enabled and before a HandleHttpRequest has bound its port; and components that were still
+invalid at that moment (e.g. waiting for an enabling controller service) are not started at all.
+wait_until_ready polls until the test can take requests, instead of sleeping for a fixed time
+"""
+import time
+
+from nipyapi import nifi
+from nipytest import canvas_extension as canvas_ext
+from nipytest import port_pool
+
+# Seconds to wait for a test to become ready
+DEFAULT_TIMEOUT: float = 30.0
+
+# Seconds between the first polls; doubled after every poll, up to MAX_POLL_DELAY
+FIRST_POLL_DELAY: float = 0.02
+
+# Maximum number of seconds between polls
+MAX_POLL_DELAY: float = 1.0
+
+# Run status of components that will not start
+IDLE_RUN_STATUSES: tuple = ("Stopped", "Invalid", "Validating")
+
+
+def wait_until_ready(group_ids, host, port, timeout=DEFAULT_TIMEOUT):
+    """
+    Waits until the controller services in the process groups are enabled, their processors and ports run
+        and the port accepts connections. Each poll costs a status and a controller services request per
+        process group. Components that could not be started before, e.g. because a controller service
+        was still enabling, are started again
+
+    Args:
+        group_ids (list of str): Ids of the process groups to wait for; their child groups are not checked
+        host (str): Host the port is on
+        port (int): Port the HandleHttpRequest listens on
+        timeout (float): Seconds to wait
+
+    Returns:
+        (int): Number of polls it took
+    """
+    assert isinstance(group_ids, list)
+    assert isinstance(host, str)
+    assert isinstance(port, int)
+
+    deadline = time.perf_counter() + timeout
+    delay = FIRST_POLL_DELAY
+    polls = 0
+    while True:
+        polls += 1
+        waiting_for = _waiting_for(group_ids, host, port)
+        if waiting_for is None:
+            return polls
+        if time.perf_counter() + delay > deadline:
+            raise ValueError("Timed out waiting for " + waiting_for)
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_POLL_DELAY)
+
+
+def _waiting_for(group_ids, host, port):
+    # Description of what is not ready yet, or None when ready
+    for group_id in group_ids:
+        services = nifi.FlowApi().get_controller_services_from_group(
+            id=group_id,
+            include_ancestor_groups=False,
+            include_descendant_groups=False
+        ).controller_services
+        enabling = [service.component.name for service in services if service.component.state != "ENABLED"]
+        if enabling:
+            return "controller services " + ", ".join(enabling) + " to be enabled"
+
+        idle = _idle_components(group_id)
+        if idle:
+            # Started again; the ones that are still invalid are skipped by nifi
+            canvas_ext.schedule_process_group(group_id, True)
+            return "components " + ", ".join(idle) + " to run"
+    if not port_pool.accepts_connections(host, port, MAX_POLL_DELAY):
+        return "port %d to accept connections" % port
+    return None
+
+
+def _idle_components(group_id):
+    snapshot = nifi.FlowApi().get_process_group_status(id=group_id).process_group_status.aggregate_snapshot
+    statuses = [entity.processor_status_snapshot for entity in snapshot.processor_status_snapshots or []]
+    statuses += [entity.port_status_snapshot for entity in (snapshot.input_port_status_snapshots or []) +
+                 (snapshot.output_port_status_snapshots or [])]
+    return [status.name for status in statuses if status.run_status in IDLE_RUN_STATUSES]
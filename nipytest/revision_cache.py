@@ -0,0 +1,180 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+The latest known revision of the components on the canvas. Nifi rejects an update or delete that does not
+carry the latest revision of the component (409 Conflict). Instead of fetching a component before every
+change, the revisions are learned from the responses of the nifi api (see install()), and the changes in
+canvas_extension use them, with a single refetch and retry when a revision turns out to be outdated
+"""
+import threading
+
+from nipyapi import nifi
+from nipytest import instrumentation
+
+# Attributes of the responses that hold lists of entities, e.g. the processors of a FlowDTO
+CONTAINER_TYPES: tuple = (nifi.ProcessGroupFlowEntity, nifi.ProcessGroupFlowDTO, nifi.FlowEntity, nifi.FlowDTO,
+                          nifi.ControllerServicesEntity, nifi.ConnectionsEntity, nifi.ProcessorsEntity,
+                          nifi.ProcessGroupsEntity, nifi.InputPortsEntity, nifi.OutputPortsEntity)
+
+# Entities that change revision when their process group is started or stopped
+SCHEDULABLE_TYPES: tuple = (nifi.ProcessorEntity, nifi.PortEntity)
+
+
+class RevisionCache(object):
+    """
+    Revision per component id, with the process group each component is in. A revision that is known to be
+    raised without being returned, e.g. by starting a whole process group, is outdated: it has to be fetched
+    before the next change. Safe to use from concurrent calls. As instrumentation listener, it learns from
+    every response
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.__lock:
+            self.__revisions = {}
+            self.__outdated = set()
+            self.__groups = {}
+            self.__schedulable = set()
+
+    def __len__(self):
+        return len(self.__revisions)
+
+    def __call__(self, record):
+        if record.status is None or record.status >= 400 or record.response is None:
+            return
+        if record.method == "DELETE":
+            self.forget(getattr(record.response, "id", None))
+        elif isinstance(record.response, nifi.ScheduleComponentsEntity):
+            # The revisions of the components that changed state are raised, but are not returned
+            self.outdate_descendants(record.response.id)
+        else:
+            self.learn(record.response)
+
+    def learn(self, response):
+        """
+        Records the revisions of all entities in a response; a single entity, or the entities in a flow
+            or list
+
+        Args:
+            response: The deserialized response, e.g. a ProcessorEntity or ProcessGroupFlowEntity
+        """
+        if isinstance(response, list):
+            for item in response:
+                self.learn(item)
+        elif isinstance(response, CONTAINER_TYPES):
+            for attribute in response.swagger_types:
+                self.learn(getattr(response, attribute))
+        elif isinstance(getattr(response, "revision", None), nifi.RevisionDTO) and hasattr(response, "id"):
+            component = getattr(response, "component", None)
+            self.update(response.id, response.revision, getattr(component, "parent_group_id", None))
+            if isinstance(response, SCHEDULABLE_TYPES):
+                with self.__lock:
+                    self.__schedulable.add(response.id)
+
+    def update(self, component_id, revision, group_id=None):
+        """
+        Records the revision of a component, unless a newer one is known
+
+        Args:
+            component_id (str): Id of the component
+            revision (RevisionDTO): The revision
+            group_id (str): Id of the process group the component is in, if known
+        """
+        if component_id is None or revision.version is None:
+            return
+        with self.__lock:
+            known = self.__revisions.get(component_id)
+            if known is None or known.version <= revision.version:
+                self.__revisions[component_id] = nifi.RevisionDTO(version=revision.version,
+                                                                  client_id=revision.client_id)
+                self.__outdated.discard(component_id)
+            if group_id is not None:
+                self.__groups[component_id] = group_id
+
+    def get(self, component_id):
+        """
+        Args:
+            component_id (str): Id of the component
+
+        Returns:
+            (RevisionDTO): The latest known revision, or None when unknown or outdated
+        """
+        with self.__lock:
+            return self.__revisions.get(component_id)
+
+    def is_outdated(self, component_id):
+        with self.__lock:
+            return component_id in self.__outdated
+
+    def forget(self, component_id):
+        with self.__lock:
+            self.__revisions.pop(component_id, None)
+            self.__outdated.discard(component_id)
+            self.__groups.pop(component_id, None)
+            self.__schedulable.discard(component_id)
+
+    def outdate_descendants(self, group_id):
+        """
+        Marks the revisions of the processors and ports inside a process group as outdated, including those
+            in its child groups; e.g. after the whole group was started or stopped
+
+        Args:
+            group_id (str): Id of the process group
+        """
+        with self.__lock:
+            descendants = [component_id for component_id in self.__revisions
+                           if component_id in self.__schedulable and self.__is_descendant(component_id, group_id)]
+            for component_id in descendants:
+                del self.__revisions[component_id]
+                self.__outdated.add(component_id)
+
+    def __is_descendant(self, component_id, group_id):
+        seen = set()
+        parent_id = self.__groups.get(component_id)
+        while parent_id is not None and parent_id not in seen:
+            if parent_id == group_id:
+                return True
+            seen.add(parent_id)
+            parent_id = self.__groups.get(parent_id)
+        return False
+
+
+# The revisions learned from the calls of this process, see install()
+cache = RevisionCache()
+_lock = threading.Lock()
+_installs = 0
+
+
+def install():
+    """
+    Starts learning revisions from all nipyapi calls, until uninstall() is called as often as install(). Each
+        open test installs the cache for as long as it is open
+    """
+    global _installs
+    with _lock:
+        if _installs == 0:
+            instrumentation.add_listener(cache)
+        _installs += 1
+
+
+def uninstall():
+    """
+    Undoes an install(); the last one stops learning and forgets the revisions
+    """
+    global _installs
+    with _lock:
+        if _installs == 0:
+            return
+        _installs -= 1
+        if _installs == 0:
+            instrumentation.remove_listener(cache)
+            cache.clear()
+
+
+def is_installed():
+    return _installs > 0
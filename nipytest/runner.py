@@ -0,0 +1,256 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Runs unittest suites in several worker processes at the same time. The test classes are divided over the
+workers (a class is never split, so its setUpClass runs once), each worker runs its share with its own
+ports and sandbox process group (see worker), and the results are merged into one report:
+
+    python -m nipytest.runner -n 4 -s tests -p "*_tests.py"
+
+With pytest, run pytest-xdist (pytest -n 4) and use the nifi_sandbox fixture of nipytest.pytest_plugin
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import queue as queues
+import sys
+import time
+import unittest
+import uuid
+
+from nipytest import worker
+
+# Separators of the report, like the ones of unittest
+SEPARATOR_1: str = "=" * 70
+SEPARATOR_2: str = "-" * 70
+
+# Seconds to wait for a result before checking whether the workers still run
+RESULT_POLL_DELAY: float = 1.0
+
+
+class ShardResult(object):
+    """
+    Outcome of the tests of one worker, in a form that can be sent between processes
+    """
+
+    def __init__(self, worker_index, tests_run, failures, errors, skipped, seconds, output):
+        """
+        Args:
+            worker_index (int): Index of the worker
+            tests_run (int): Number of tests run
+            failures (list of (str, str)): Id and traceback of the failed tests
+            errors (list of (str, str)): Id and traceback of the tests that raised an error
+            skipped (int): Number of skipped tests
+            seconds (float): Duration
+            output (str): What the test runner of the worker wrote
+        """
+        self.worker_index = worker_index
+        self.tests_run = tests_run
+        self.failures = failures
+        self.errors = errors
+        self.skipped = skipped
+        self.seconds = seconds
+        self.output = output
+
+    def was_successful(self):
+        return not self.failures and not self.errors
+
+
+def test_classes(suite):
+    """
+    Args:
+        suite (unittest.TestSuite): Suite, e.g. from discovery
+
+    Returns:
+        (dict of str: int): Number of tests per test class, by the id of the class (module.Class)
+    """
+    classes = {}
+    for test in _flatten(suite):
+        if isinstance(test, unittest.loader._FailedTest):
+            # Module that failed to import; loading it by name in the worker reports the error
+            name = test._testMethodName
+        else:
+            name = type(test).__module__ + "." + type(test).__name__
+        classes[name] = classes.get(name, 0) + 1
+    return classes
+
+
+def shard(classes, workers):
+    """
+    Divides test classes over workers; the largest classes first, each to the worker with the fewest tests
+
+    Args:
+        classes (dict of str: int): Number of tests per test class
+        workers (int): Number of workers
+
+    Returns:
+        (list of list of str): The test classes of each worker; empty workers are left out
+    """
+    assert isinstance(workers, int) and workers > 0
+
+    shards = [[] for _ in range(workers)]
+    sizes = [0] * workers
+    for name, size in sorted(classes.items(), key=lambda item: (-item[1], item[0])):
+        smallest = sizes.index(min(sizes))
+        shards[smallest].append(name)
+        sizes[smallest] += size
+    return [names for names in shards if names]
+
+
+def run(start_dir=".", pattern="test*.py", top_level_dir=None, workers=None, verbosity=1, stream=sys.stderr):
+    """
+    Discovers the tests and runs them in worker processes. When a worker dies before it reports, e.g.
+        because a test ended the process, its test classes are reported as errors
+
+    Args:
+        start_dir (str): Directory to discover the tests in
+        pattern (str): Pattern of the test files
+        top_level_dir (str): Directory the test modules are imported from; start_dir by default
+        workers (int): Number of worker processes; by default the number of cpus
+        verbosity (int): Verbosity of the output of the workers
+        stream: Where to write the report
+
+    Returns:
+        (list of ShardResult): The results of the workers
+    """
+    workers = workers or os.cpu_count() or 1
+    top_level_dir = os.path.abspath(top_level_dir or start_dir)
+    suite = unittest.TestLoader().discover(start_dir, pattern, top_level_dir)
+    shards = shard(test_classes(suite), workers)
+
+    start = time.perf_counter()
+    run_id = uuid.uuid4().hex[:8]
+    # Fresh interpreters, so the workers read their environment when importing nipytest
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    processes = [context.Process(target=_run_shard, args=(i, len(shards), run_id, top_level_dir, names, verbosity,
+                                                          queue), name="nipytest-worker-%d" % i)
+                 for i, names in enumerate(shards)]
+    for process in processes:
+        process.start()
+    results = _collect(processes, shards, queue, start)
+    for process in processes:
+        process.join()
+
+    report(results, time.perf_counter() - start, stream, verbosity)
+    return results
+
+
+def report(results, seconds, stream, verbosity=1):
+    """
+    Writes the merged results of the workers, like unittest.TextTestRunner
+
+    Args:
+        results (list of ShardResult): Results of the workers
+        seconds (float): Duration of the run
+        stream: Where to write the report
+        verbosity (int): With more than 1, the output of every worker is included
+    """
+    for result in results:
+        status = "OK" if result.was_successful() else "FAILED"
+        stream.write("worker %d: %d tests in %.3fs, %s\n" % (result.worker_index, result.tests_run, result.seconds,
+                                                             status))
+        if verbosity > 1:
+            stream.write(result.output)
+
+    for result in results:
+        for kind, tests in [("ERROR", result.errors), ("FAIL", result.failures)]:
+            for test_id, traceback in tests:
+                stream.write("%s\n%s: %s [worker %d]\n%s\n%s\n" % (SEPARATOR_1, kind, test_id, result.worker_index,
+                                                                   SEPARATOR_2, traceback))
+
+    tests_run = sum(result.tests_run for result in results)
+    failures = sum(len(result.failures) for result in results)
+    errors = sum(len(result.errors) for result in results)
+    skipped = sum(result.skipped for result in results)
+    stream.write("%s\nRan %d tests in %.3fs on %d workers\n\n" % (SEPARATOR_2, tests_run, seconds, len(results)))
+    details = ["%s=%d" % (name, number) for name, number in
+               [("failures", failures), ("errors", errors), ("skipped", skipped)] if number]
+    status = "FAILED" if failures or errors else "OK"
+    stream.write(status + (" (%s)" % ", ".join(details) if details else "") + "\n")
+
+
+def _collect(processes, shards, queue, start):
+    # The results of the workers, by worker index
+    results = {}
+
+    def receive(timeout):
+        # False when no result came in time
+        try:
+            result = queue.get(timeout=timeout)
+        except queues.Empty:
+            return False
+        results[result.worker_index] = result
+        return True
+
+    while len(results) < len(processes):
+        if receive(RESULT_POLL_DELAY):
+            continue
+        ended = [i for i, process in enumerate(processes) if i not in results and process.exitcode is not None]
+        # A worker may have ended right after it reported
+        while ended and receive(RESULT_POLL_DELAY):
+            pass
+        for i in ended:
+            if i in results:
+                continue
+            reason = "Worker %d ended with exit code %d before reporting" % (i, processes[i].exitcode)
+            results[i] = ShardResult(i, 0, [], [(name, reason) for name in shards[i]], 0,
+                                     time.perf_counter() - start, "")
+    return [results[i] for i in sorted(results)]
+
+
+def _run_shard(worker_index, workers, run_id, top_level_dir, names, verbosity, queue):
+    # Runs in the worker process
+    os.environ[worker.WORKER_ENV] = str(worker_index)
+    os.environ[worker.WORKERS_ENV] = str(workers)
+    os.environ[worker.RUN_ENV] = run_id
+    sys.path.insert(0, top_level_dir)
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        suite = unittest.TestLoader().loadTestsFromNames(names)
+        result = unittest.TextTestRunner(stream=output, verbosity=verbosity).run(suite)
+        failures = [(str(test), traceback) for test, traceback in result.failures]
+        failures += [(str(test), "Unexpected success") for test in result.unexpectedSuccesses]
+        errors = [(str(test), traceback) for test, traceback in result.errors]
+        tests_run, skipped = result.testsRun, len(result.skipped)
+    except Exception as e:
+        failures, errors, tests_run, skipped = [], [("worker %d" % worker_index, repr(e))], 0, 0
+    try:
+        # Only when the tests used it
+        worker.remove_sandbox()
+    except Exception as e:
+        errors.append(("sandbox of worker %d" % worker_index, repr(e)))
+    shard_result = ShardResult(worker_index, tests_run, failures, errors, skipped, time.perf_counter() - start,
+                               output.getvalue())
+    queue.put(shard_result)
+
+
+def _flatten(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _flatten(test)
+        else:
+            yield test
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs unittest suites in parallel worker processes")
+    parser.add_argument("-n", "--workers", type=int, default=None, help="Number of worker processes; default: cpus")
+    parser.add_argument("-s", "--start-directory", default=".", help="Directory to start discovery")
+    parser.add_argument("-p", "--pattern", default="test*.py", help="Pattern to match tests")
+    parser.add_argument("-t", "--top-level-directory", default=None, help="Top level directory of the project")
+    parser.add_argument("-v", "--verbose", action="store_const", const=2, default=1, help="Verbose output")
+    options = parser.parse_args(args)
+
+    results = run(options.start_directory, options.pattern, options.top_level_directory, options.workers,
+                  options.verbose)
+    return 0 if all(result.was_successful() for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+The components of the flow under test, so a test can start and stop just those instead of the whole base
+process group
+"""
+from nipyapi import canvas, utils
+from nipytest import canvas_extension as canvas_ext
+
+# Connectable types that can be started and stopped
+SCHEDULABLE_TYPES: tuple = ("PROCESSOR", "INPUT_PORT", "OUTPUT_PORT")
+
+
+class ScheduleScope(object):
+    """
+    Set of components, by the process group they are in. Components that are already in the requested state
+    are skipped, and components are scheduled with a single request per process group
+    """
+
+    def __init__(self, components):
+        """
+        Args:
+            components (dict of str: str): The process group id of each component id in the scope
+        """
+        assert isinstance(components, dict)
+
+        self.components = dict(components)
+
+    @classmethod
+    def reachable(cls, index, inputs, outputs):
+        """
+        Collects the components a flowfile can reach from the inputs, following the connections up to the
+            outputs. The inputs and outputs are part of the scope themselves
+
+        Args:
+            index (ConnectionIndex): The connections of the flow under test
+            inputs (list of ProcessorEntity and PortEntity): The components the test posts to
+            outputs (list of ProcessorEntity and PortEntity): The components the test reads from
+
+        Returns:
+            (ScheduleScope)
+        """
+        output_ids = set(output.component.id for output in outputs)
+        components = {}
+        for component in inputs + outputs:
+            components[component.component.id] = component.component.parent_group_id
+
+        visited = set()
+        to_visit = [component.component.id for component in inputs]
+        while to_visit:
+            component_id = to_visit.pop()
+            if component_id in visited or component_id in output_ids:
+                continue
+            visited.add(component_id)
+            for connection in index.outgoing(component_id):
+                # Funnels are followed, but can not be scheduled
+                if connection.destination_type in SCHEDULABLE_TYPES:
+                    components[connection.destination_id] = connection.destination_group_id
+                to_visit.append(connection.destination_id)
+        return cls(components)
+
+    @classmethod
+    def endpoints(cls, connections):
+        """
+        Collects the sources and destinations of connections
+
+        Args:
+            connections (list of ConnectionEntity): The connections
+
+        Returns:
+            (ScheduleScope)
+        """
+        components = {}
+        for connection in connections:
+            if connection.source_type in SCHEDULABLE_TYPES:
+                components[connection.source_id] = connection.source_group_id
+            if connection.destination_type in SCHEDULABLE_TYPES:
+                components[connection.destination_id] = connection.destination_group_id
+        return cls(components)
+
+    def union(self, other):
+        """
+        Args:
+            other (ScheduleScope): The scope to add
+
+        Returns:
+            (ScheduleScope): A scope with the components of both scopes
+        """
+        components = dict(self.components)
+        components.update(other.components)
+        return ScheduleScope(components)
+
+    def running(self):
+        """
+        Returns:
+            (ScheduleScope): The components of this scope that are running now
+        """
+        return ScheduleScope({component_id: group_id for component_id, (group_id, entity) in self.__entities().items()
+                              if entity.component.state == "RUNNING"})
+
+    def schedule(self, scheduled):
+        """
+        Starts or stops the components of this scope. Components in the requested state are skipped, as
+            are disabled components. Invalid components are not started. Stopping waits until the threads
+            of the components have ended
+
+        Args:
+            scheduled (bool): True to start, False to stop
+        """
+        assert isinstance(scheduled, bool)
+
+        state = "RUNNING" if scheduled else "STOPPED"
+        to_schedule = {}
+        for component_id, (group_id, entity) in self.__entities().items():
+            if entity.component.state in (state, "DISABLED"):
+                continue
+            if scheduled and entity.component.validation_errors:
+                continue
+            to_schedule.setdefault(group_id, []).append(entity)
+
+        for group_id, entities in to_schedule.items():
+            canvas_ext.schedule_components(group_id, scheduled, entities)
+        if not scheduled and to_schedule:
+            # Like canvas.schedule_process_group, wait for the threads of the stopped components to end
+            utils.wait_to_complete(self.__stopped)
+
+    def __stopped(self):
+        for group_id, entity in self.__entities().values():
+            snapshot = entity.status.aggregate_snapshot if entity.status is not None else None
+            if snapshot is not None and snapshot.active_thread_count:
+                return False
+        return True
+
+    def __entities(self):
+        # Current state and revision of the components, with a single flow request per process group
+        entities = {}
+        for group_id in set(self.components.values()):
+            flow = canvas.get_flow(group_id).process_group_flow.flow
+            for entity in flow.processors + flow.input_ports + flow.output_ports:
+                if self.components.get(entity.id) == group_id:
+                    entities[entity.id] = (group_id, entity)
+        return entities
@@ -0,0 +1,337 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Latency statistics of test runs, kept in log-linear (HDR style) histograms: every value is recorded with a
+fixed relative precision, in constant memory, however many runs are recorded
+"""
+import math
+import threading
+
+# Default number of significant decimal digits kept for every recorded value
+DEFAULT_SIGNIFICANT_DIGITS: int = 2
+
+# Default highest value a histogram tracks; higher values are recorded as this value. One hour in microseconds
+DEFAULT_HIGHEST_TRACKABLE_VALUE: int = 3600 * 1000 * 1000
+
+# Percentiles in the reports
+REPORT_PERCENTILES: tuple = (50.0, 90.0, 99.0)
+
+
+class Histogram(object):
+    """
+    Histogram of non-negative integer values. Values are counted in buckets that double in size, each split
+    into the same number of sub buckets, so values are kept with significant_digits of precision
+    """
+
+    def __init__(self, highest_trackable_value=DEFAULT_HIGHEST_TRACKABLE_VALUE,
+                 significant_digits=DEFAULT_SIGNIFICANT_DIGITS):
+        """
+        Args:
+            highest_trackable_value (int): Highest value to track; higher values are recorded as this value
+            significant_digits (int): Number of significant decimal digits to keep, 1 to 5
+        """
+        assert isinstance(highest_trackable_value, int) and highest_trackable_value > 0
+        assert isinstance(significant_digits, int) and 1 <= significant_digits <= 5
+
+        self.highest_trackable_value = highest_trackable_value
+        self.significant_digits = significant_digits
+
+        sub_bucket_count = 2 ** math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.__sub_bucket_half_count_magnitude = int(math.log2(sub_bucket_count)) - 1
+        self.__sub_bucket_half_count = sub_bucket_count // 2
+        self.__sub_bucket_mask = sub_bucket_count - 1
+        self.__counts = [0] * (self.__index(highest_trackable_value) + 1)
+        self.reset()
+
+    def reset(self):
+        """
+        Removes all recorded values
+        """
+        for i in range(len(self.__counts)):
+            self.__counts[i] = 0
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value, count=1):
+        """
+        Args:
+            value (int): The value to record; negative values are recorded as 0
+            count (int): Number of times to record the value
+        """
+        value = min(max(int(value), 0), self.highest_trackable_value)
+        self.__counts[self.__index(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        Adds all values of another histogram with the same settings
+
+        Args:
+            other (Histogram): The histogram to add
+        """
+        assert isinstance(other, Histogram)
+        assert (other.highest_trackable_value, other.significant_digits) == \
+            (self.highest_trackable_value, self.significant_digits)
+
+        for i, count in enumerate(other.__counts):
+            self.__counts[i] += count
+        if other.count > 0:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def mean(self):
+        """
+        Returns:
+            (float): The mean of the recorded values, or None if nothing was recorded
+        """
+        return self.total / self.count if self.count > 0 else None
+
+    def value_at_percentile(self, percentile):
+        """
+        Args:
+            percentile (float): Percentile, from 0 to 100
+
+        Returns:
+            (int): The highest value (within the precision of the histogram) of the lowest percentile of
+                the recorded values, or None if nothing was recorded
+        """
+        assert 0 <= percentile <= 100
+
+        if self.count == 0:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for i, count in enumerate(self.__counts):
+            seen += count
+            if seen >= rank:
+                return min(self.__highest_equivalent_value(i), self.max)
+        return self.max
+
+    def __index(self, value):
+        bucket_index = (value | self.__sub_bucket_mask).bit_length() - self.__sub_bucket_half_count_magnitude - 1
+        sub_bucket_index = value >> bucket_index
+        return ((bucket_index + 1) << self.__sub_bucket_half_count_magnitude) \
+            + (sub_bucket_index - self.__sub_bucket_half_count)
+
+    def __highest_equivalent_value(self, index):
+        bucket_index = (index >> self.__sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self.__sub_bucket_half_count - 1)) + self.__sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.__sub_bucket_half_count
+            bucket_index = 0
+        return (sub_bucket_index << bucket_index) + (1 << bucket_index) - 1
+
+
+class RunStatistics(object):
+    """
+    Collects the latency of test runs: the round trip time seen by the client and the duration inside the
+    flow, taken from the test_duration attribute of the outputs. Times are recorded in microseconds and
+    reported in milliseconds. Safe to use from concurrent runs
+    """
+
+    def __init__(self, significant_digits=DEFAULT_SIGNIFICANT_DIGITS):
+        """
+        Args:
+            significant_digits (int): Number of significant decimal digits to keep
+        """
+        self.round_trip = Histogram(significant_digits=significant_digits)
+        self.flow = Histogram(significant_digits=significant_digits)
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Removes all recorded runs
+        """
+        with self.__lock:
+            self.round_trip.reset()
+            self.flow.reset()
+            self.errors = 0
+            self.timeouts = 0
+
+    def record_round_trip(self, seconds):
+        """
+        Args:
+            seconds (float): Time from posting the flowfile until the response was received (its headers,
+                for a streamed response)
+        """
+        with self.__lock:
+            self.round_trip.record(round(seconds * 1000000))
+
+    def record_output(self, output):
+        """
+        Records the duration inside the flow of an output
+
+        Args:
+            output (FlowFile): An output with a test_duration attribute in milliseconds; outputs without
+                are skipped
+        """
+        try:
+            milliseconds = int(output.attributes.get("test_duration"))
+        except (TypeError, ValueError):
+            return
+        with self.__lock:
+            self.flow.record(milliseconds * 1000)
+
+    def record_error(self, timed_out=False):
+        """
+        Args:
+            timed_out (bool): True if the run failed because it timed out
+        """
+        with self.__lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def summary(self):
+        """
+        Returns:
+            (dict): Number of runs, errors and timeouts, and for the round trip and flow latencies:
+                count, mean, p50, p90, p99 and max in milliseconds
+        """
+        with self.__lock:
+            return {
+                "runs": self.round_trip.count + self.errors + self.timeouts,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "round_trip_ms": _latencies(self.round_trip),
+                "flow_ms": _latencies(self.flow)
+            }
+
+    def report(self):
+        """
+        Returns:
+            (str): The summary as a table
+        """
+        summary = self.summary()
+        return "runs: %d, errors: %d, timeouts: %d\n" % (summary["runs"], summary["errors"], summary["timeouts"]) \
+            + _latency_table([("round_trip", summary["round_trip_ms"]), ("flow", summary["flow_ms"])])
+
+
+class LoadReport(object):
+    """
+    Outcome of a load test. Latencies are measured from the moment a request was scheduled to be sent, not
+    from the moment it was actually sent, so requests that had to wait for a slow system count as slow
+    (no coordinated omission). Safe to use from concurrent requests
+    """
+
+    def __init__(self, target_rate, significant_digits=DEFAULT_SIGNIFICANT_DIGITS):
+        """
+        Args:
+            target_rate (float): Requests per second that were scheduled
+            significant_digits (int): Number of significant decimal digits to keep
+        """
+        self.target_rate = target_rate
+        self.latency = Histogram(significant_digits=significant_digits)
+        self.sent = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.duration = None
+        self.__lock = threading.Lock()
+
+    def record_sent(self):
+        with self.__lock:
+            self.sent += 1
+
+    def record_latency(self, seconds):
+        """
+        Args:
+            seconds (float): Time from the scheduled start of a request until its output was received
+        """
+        with self.__lock:
+            self.latency.record(round(seconds * 1000000))
+
+    def record_error(self, timed_out=False):
+        """
+        Args:
+            timed_out (bool): True if the request failed because it timed out
+        """
+        with self.__lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def finish(self, duration):
+        """
+        Args:
+            duration (float): Seconds from the first scheduled request until the last request finished
+        """
+        self.duration = duration
+
+    @property
+    def completed(self):
+        return self.latency.count
+
+    @property
+    def throughput(self):
+        """
+        Returns:
+            (float): Completed requests per second
+        """
+        return self.completed / self.duration if self.duration else None
+
+    def summary(self):
+        """
+        Returns:
+            (dict): Target rate and achieved throughput in requests per second, number of requests sent,
+                completed, failed and timed out, and latency count, mean, p50, p90, p99 and max in milliseconds
+        """
+        with self.__lock:
+            return {
+                "target_rate": self.target_rate,
+                "throughput": self.throughput,
+                "duration": self.duration,
+                "sent": self.sent,
+                "completed": self.completed,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "latency_ms": _latencies(self.latency)
+            }
+
+    def report(self):
+        """
+        Returns:
+            (str): The summary as a table
+        """
+        summary = self.summary()
+        throughput = "-" if summary["throughput"] is None else "%.1f" % summary["throughput"]
+        return "target: %g/s, achieved: %s/s, sent: %d, completed: %d, errors: %d, timeouts: %d\n" % (
+            summary["target_rate"], throughput, summary["sent"], summary["completed"], summary["errors"],
+            summary["timeouts"]) + _latency_table([("latency", summary["latency_ms"])])
+
+    def __str__(self):
+        return self.report()
+
+
+def _latencies(histogram):
+    # Summary of a histogram of microseconds, in milliseconds
+    def ms(value):
+        return None if value is None else value / 1000
+
+    latencies = {"count": histogram.count, "mean": ms(histogram.mean())}
+    for percentile in REPORT_PERCENTILES:
+        latencies["p%g" % percentile] = ms(histogram.value_at_percentile(percentile))
+    latencies["max"] = ms(histogram.max)
+    return latencies
+
+
+def _latency_table(rows):
+    # Table of (name, latencies in milliseconds) rows
+    columns = ["count", "mean"] + ["p%g" % p for p in REPORT_PERCENTILES] + ["max"]
+    lines = ["%-12s" % "latency (ms)" + "".join("%10s" % column for column in columns)]
+    for name, latencies in rows:
+        values = ["%10s" % ("-" if latencies[column] is None else "%.3f" % latencies[column])
+                  for column in columns[1:]]
+        lines.append("%-12s%10d" % (name, latencies["count"]) + "".join(values))
+    return "\n".join(lines)
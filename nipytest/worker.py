@@ -0,0 +1,113 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Identity of the process a test runs in, when tests are run by several processes at the same time: by
+nipytest.runner, or by pytest-xdist. Each worker gets its own share of the test ports and its own sandbox
+process group to build its tests in, so workers do not interfere
+"""
+import os
+import threading
+
+from nipyapi import canvas, nifi
+
+# Environment variables set by nipytest.runner: the index of the worker, the number of workers and the
+# id of the run
+WORKER_ENV: str = "NIPYTEST_WORKER"
+WORKERS_ENV: str = "NIPYTEST_WORKERS"
+RUN_ENV: str = "NIPYTEST_RUN"
+
+# Environment variables set by pytest-xdist; the worker is named gw<index>
+XDIST_WORKER_ENV: str = "PYTEST_XDIST_WORKER"
+XDIST_WORKERS_ENV: str = "PYTEST_XDIST_WORKER_COUNT"
+XDIST_RUN_ENV: str = "PYTEST_XDIST_TESTRUNUID"
+
+# Prefix of the names of the sandbox process groups
+SANDBOX_PREFIX: str = "nipytest_"
+
+_lock = threading.Lock()
+_sandbox = None
+
+
+def index():
+    """
+    Returns:
+        (int): Index of this worker, from 0; None when not run as worker
+    """
+    if os.environ.get(WORKER_ENV):
+        return int(os.environ[WORKER_ENV])
+    if os.environ.get(XDIST_WORKER_ENV):
+        return int(os.environ[XDIST_WORKER_ENV].lstrip("gw"))
+    return None
+
+
+def count():
+    """
+    Returns:
+        (int): Number of workers in the run; 1 when not run as worker
+    """
+    return int(os.environ.get(WORKERS_ENV) or os.environ.get(XDIST_WORKERS_ENV) or 1)
+
+
+def run_id():
+    """
+    Returns:
+        (str): Id shared by the workers of a run; the process id when not run as worker
+    """
+    run = os.environ.get(RUN_ENV) or os.environ.get(XDIST_RUN_ENV)
+    return run[:8] if run else str(os.getpid())
+
+
+def share(ports):
+    """
+    Args:
+        ports (range): Ports for all workers
+
+    Returns:
+        (range): The part of the ports for this worker; all ports when not run as worker
+    """
+    worker = index()
+    if worker is None:
+        return ports
+    size = len(ports) // count()
+    assert size > 0, "Less ports than workers"
+    return ports[worker * size:(worker + 1) * size]
+
+
+def sandbox_name():
+    worker = index()
+    return SANDBOX_PREFIX + run_id() + ("" if worker is None else "_%d" % worker)
+
+
+def sandbox():
+    """
+    The process group for the tests of this worker, in the root process group. Created on first use
+
+    Returns:
+        (ProcessGroupEntity)
+    """
+    global _sandbox
+    with _lock:
+        if _sandbox is None:
+            name = sandbox_name()
+            root_id = canvas.get_root_pg_id()
+            existing = [group for group in canvas.get_flow(root_id).process_group_flow.flow.process_groups
+                        if group.component.name == name]
+            if existing:
+                _sandbox = existing[0]
+            else:
+                root = nifi.ProcessGroupsApi().get_process_group(root_id)
+                _sandbox = canvas.create_process_group(root, name, (0, 0))
+        return _sandbox
+
+
+def remove_sandbox():
+    """
+    Deletes the sandbox process group of this worker with all its contents, if it was created
+    """
+    global _sandbox
+    with _lock:
+        if _sandbox is not None:
+            canvas.delete_process_group(canvas.get_process_group(_sandbox.id, 'id'), force=True)
+            _sandbox = None
@@ -7,6 +7,7 @@ import unittest
 from nipyapi import nifi, config, canvas
 from nipytest import canvas_extension as canvas_ext
 from nipytest.canvas_navigator import CanvasNavigator
+from nipytest.flow_plan import FlowPlan
 from nipytest.models.location import Location
 
 PORT = 80
@@ -193,6 +194,29 @@ class CanvasExtensionTest(unittest.TestCase):
         canvas.delete_port(input_port)
         canvas.delete_port(output_port)
 
+    def test_create_plan(self):
+        nav = CanvasNavigator()
+        loc = Location()
+        name = "nipytest - unit test - test_create_plan"
+        test_group = canvas.create_process_group(nav.current, name, (0, 0))
+        # Plan a http context with a processor referring to it, and a port per input
+        plan = FlowPlan()
+        context_id = plan.add_controller_service("http_context", canvas_ext.http_context_map_component(name))
+        plan.add_processor("http_in", canvas_ext.request_handler_component(loc, context_id, PORT))
+        for i in range(10):
+            plan.add_output_port("input:%d" % i, canvas_ext.test_input_component(loc, name + " " + str(i)))
+            plan.connect("http_in", "input:%d" % i, ["success"])
+        # Run function
+        created = canvas_ext.create_plan(test_group, plan, workers=4)
+        # All components should be created, and refer to each other by their actual ids
+        self.assertEqual(sorted(created), sorted(plan.keys()))
+        self.assertEqual(created["http_in"].component.config.properties["HTTP Context Map"],
+                         created["http_context"].id)
+        self.assertIn(created["http_context"].component.state, ["ENABLED", "ENABLING"])
+        self.assertEqual(len(canvas.list_all_connections(test_group.id, descendants=False)), 10)
+        # Remove temporary created object(s)
+        canvas.delete_process_group(test_group, force=True)
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -3,9 +3,13 @@ Created on 11 Feb 2019
 
 @author: Frank Ypma
 """
+import contextlib
+import io
 import unittest
-from nipytest.canvas_navigator import CanvasNavigator
-from nipyapi import config, canvas
+from nipytest import instrumentation
+from nipytest.canvas_navigator import CanvasNavigator, SEPARATOR
+from nipyapi import config, canvas, nifi
+from fake_nifi_case import FakeNifiTestCase
 
 CANVAS_CENTER: tuple = (0, 0)
 
@@ -103,6 +107,26 @@ class CanvasNavigatorTest(unittest.TestCase):
         self.nav.cd("/")
         self.assertEqual(self.nav.current.component.name, "NiFi Flow", 'incorrect jump to root')
 
+    def test_current_path(self):
+        print("Testing current path")
+        self.assertEqual(self.nav.current_path(), "/", 'incorrect root path')
+        self.nav.cd("/parent/child1/grandchild1")
+        self.assertEqual(self.nav.current_path(), "/parent/child1/grandchild1", 'incorrect nested path')
+        self.nav.cd("..")
+        self.assertEqual(self.nav.current_path(), "/parent/child1", 'incorrect parent path')
+        self.nav.cd_to_id(CanvasNavigatorTest.pg_grandchild1.component.id)
+        self.assertEqual(self.nav.current_path(), "/parent/child1/grandchild1", 'known id not resolved to path')
+
+    def test_cd_after_delete(self):
+        print("Testing cd after structural change")
+        pg_child3 = canvas.create_process_group(CanvasNavigatorTest.pg_parent, "child3", CANVAS_CENTER)
+        self.nav.cd("/parent/child3")
+        self.assertEqual(self.nav.current_id(), pg_child3.component.id, 'incorrect jump to new child')
+        canvas.delete_process_group(pg_child3)
+        self.nav.cd("/parent")
+        self.nav.refresh()
+        self.assertRaises(Exception, self.nav.cd, "child3")
+
     def test_current_id(self):
         print("Testing current id")
         self.assertEqual(self.nav.current_id(), canvas.get_root_pg_id(), 'incorrect current id')
@@ -157,6 +181,71 @@ class CanvasNavigatorTest(unittest.TestCase):
                          CanvasNavigatorTest.controller.component.id,
                          'incorrect controller service')
 
+    def test_refresh(self):
+        print("Testing refresh")
+        self.nav.cd("parent")
+        self.assertEqual(len(self.nav.groups("child3")), 0)
+        pg_child3 = canvas.create_process_group(CanvasNavigatorTest.pg_parent, "child3", CANVAS_CENTER)
+        # A lookup that finds nothing in the cached flow loads it again
+        self.assertEqual(self.nav.group("child3").component.id, pg_child3.component.id, 'new group not found')
+        canvas.delete_process_group(pg_child3)
+        # Deleted group is still cached until refreshed
+        self.assertEqual(len(self.nav.groups("child3")), 1)
+        self.nav.refresh()
+        self.assertEqual(len(self.nav.groups("child3")), 0)
+
+
+class CanvasNavigatorFakeTest(FakeNifiTestCase):
+
+    def setUp(self):
+        super(CanvasNavigatorFakeTest, self).setUp()
+        self.pg_child = canvas.create_process_group(self.pg_test, "child", CANVAS_CENTER)
+        self.path = SEPARATOR + self.pg_test.component.name + SEPARATOR + "child"
+        self.calls = []
+        instrumentation.add_listener(self.calls.append)
+
+    def tearDown(self):
+        instrumentation.remove_listener(self.calls.append)
+        super(CanvasNavigatorFakeTest, self).tearDown()
+
+    def flow_requests(self):
+        return len([call for call in self.calls if call.endpoint == "/flow/process-groups/{id}"])
+
+    def test_ls(self):
+        processor = canvas.create_processor(self.pg_test, canvas.get_processor_type("DebugFlow"), CANVAS_CENTER,
+                                            "proc")
+        nav = CanvasNavigator()
+        nav.cd_to_id(self.pg_test.component.id)
+        self.calls.clear()
+        listing = io.StringIO()
+        with contextlib.redirect_stdout(listing):
+            nav.ls()
+            # The listed flow is used for the lookups
+            self.assertEqual(nav.processor("proc").id, processor.id)
+            nav.cd("child")
+        self.assertEqual(listing.getvalue().splitlines()[1:], [
+            "\t%s - PG - child" % self.pg_child.component.id, "\t%s - Pr - proc" % processor.component.id])
+        self.assertEqual(self.flow_requests(), 1)
+
+    def test_path_ttl(self):
+        nav = CanvasNavigator(cache_ttl=60)
+        nav.cd(self.path)
+        nav.cd("/")
+        self.calls.clear()
+        # A known path costs no requests until it expires
+        nav.cd(self.path)
+        nav.cd_to_id(self.pg_child.component.id)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(nav.current_id(), self.pg_child.component.id)
+
+        canvas.delete_process_group(canvas.get_process_group(self.pg_child.id, 'id'))
+        nav.cache_ttl = 0
+        nav.cd("/")
+        with self.assertRaises(Exception):
+            nav.cd(self.path)
+        with self.assertRaises(nifi.rest.ApiException):
+            nav.cd_to_id(self.pg_child.component.id)
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,42 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+from nipyapi import nifi
+from nipytest.connection_index import ConnectionIndex
+
+
+def connection(connection_id, source_id, destination_id):
+    return nifi.ConnectionEntity(id=connection_id, source_id=source_id, destination_id=destination_id,
+                                 source_type="PROCESSOR", destination_type="PROCESSOR")
+
+
+class ConnectionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ConnectionIndex([
+            connection("c1", "start", "proc2"),
+            connection("c2", "proc2", "proc3"),
+            connection("c3", "proc3", "end1"),
+            connection("c4", "proc3", "end2")
+        ])
+
+    def test_incoming(self):
+        self.assertEqual([x.id for x in self.index.incoming("proc2")], ["c1"])
+        self.assertEqual(self.index.incoming("start"), [])
+
+    def test_outgoing(self):
+        self.assertEqual([x.id for x in self.index.outgoing("proc3")], ["c3", "c4"])
+        self.assertEqual(self.index.outgoing("end1"), [])
+
+    def test_connections(self):
+        self.assertEqual(len(self.index.connections), 4)
+        with self.assertRaises(AssertionError):
+            ConnectionIndex(["not a connection"])
+
+
+if __name__ == "__main__":
+    # import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+
+Base test case for the tests against nipytest.fake_nifi
+"""
+import socket
+import unittest
+from nipyapi import nifi, config, canvas
+from nipytest.canvas_navigator import CanvasNavigator
+from nipytest.fake_nifi import FakeNifi
+
+# Position of the components created by the tests
+CANVAS_CENTER: tuple = (0, 0)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeNifiTestCase(unittest.TestCase):
+    """
+    Runs the tests of a class against a fake nifi of its own, each test in a process group of its own (pg_test)
+    """
+    fake: FakeNifi = None
+    host: str = None
+    # Keyword arguments of the fake nifi
+    fake_options: dict = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super(FakeNifiTestCase, cls).setUpClass()
+        cls.host = config.nifi_config.host
+        cls.fake = FakeNifi(**cls.fake_options).start()
+        cls.fake.configure()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake.stop()
+        config.nifi_config.host = cls.host
+        config.nifi_config.api_client = None
+        super(FakeNifiTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        self.pg_test = canvas.create_process_group(CanvasNavigator().current, self.id(), CANVAS_CENTER)
+
+    def tearDown(self):
+        canvas.delete_process_group(canvas.get_process_group(self.pg_test.id, 'id'), force=True)
+
+    def create_processor(self, processor_type, name, parent_pg=None):
+        return canvas.create_processor(parent_pg or self.pg_test, canvas.get_processor_type(processor_type),
+                                       CANVAS_CENTER, name)
+
+    def create_flow(self, names, connections, parent_pg=None):
+        """
+        Creates a running flow: the first processor generates flowfiles, the others are DebugFlow
+            processors. Processors without outgoing connections end the flow
+
+        Args:
+            names (list of str): Names of the processors
+            connections (list of (str, str)): Names of the source and destination of each connection
+            parent_pg (ProcessGroupEntity): Process group of the flow; pg_test by default
+
+        Returns:
+            (list of ProcessorEntity): The processors, in the order of names
+        """
+        parent_pg = parent_pg or self.pg_test
+        processors = {name: self.create_processor("DebugFlow" if i else "GenerateFlowFile", name, parent_pg)
+                      for i, name in enumerate(names)}
+        sources = set(source for source, destination in connections)
+        for name in names:
+            if name not in sources:
+                canvas.update_processor(processors[name], nifi.ProcessorConfigDTO(
+                    auto_terminated_relationships=["success", "failure"]))
+        for source, destination in connections:
+            # GenerateFlowFile only has a success relationship
+            relationships = ["success", "failure"] if source != names[0] else ["success"]
+            canvas.create_connection(processors[source], processors[destination], relationships)
+        canvas.schedule_process_group(parent_pg.component.id, True)
+        return [processors[name] for name in names]
@@ -0,0 +1,209 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+
+import contextlib
+import io
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from nipyapi import nifi, canvas
+from nipytest import canvas_extension as canvas_ext
+from nipytest import http_session
+from nipytest import journal
+from nipytest import port_pool
+from nipytest import revision_cache
+from nipytest.test_1_to_1 import Test1To1
+from nipytest.test_1_to_n import Test1ToN
+from nipytest.models.flowfile import FlowFile
+from fake_nifi_case import FakeNifiTestCase, CANVAS_CENTER, free_port
+
+
+class FakeNifiTest(FakeNifiTestCase):
+    fake_options: dict = {"request_expiration": 1}
+
+    def setUp(self):
+        super(FakeNifiTest, self).setUp()
+        # Simple flow to test: Start -> Processor 2 -> Processor 3 -> End 1 and End 2
+        self.proc_start, self.proc_2, self.proc_3, self.proc_end_1, self.proc_end_2 = self.create_flow(
+            ["Start", "Processor 2", "Processor 3", "End 1", "End 2"],
+            [("Start", "Processor 2"), ("Processor 2", "Processor 3"), ("Processor 3", "End 1"),
+             ("Processor 3", "End 2")])
+
+    def test_build_flow(self):
+        flow = canvas.get_flow(self.pg_test.id).process_group_flow.flow
+        assert len(flow.processors) == 5
+        assert len(flow.connections) == 4
+        # All processors are valid and running
+        assert all(proc.component.state == "RUNNING" for proc in flow.processors)
+
+        # A processor with an unconnected relationship is invalid, and not started with its group
+        proc = self.create_processor("DebugFlow", "Unconnected")
+        assert len(proc.component.validation_errors) == 2
+        canvas.schedule_process_group(self.pg_test.component.id, True)
+        assert canvas.get_processor(proc.id, 'id').component.state == "STOPPED"
+
+    def test_revision_conflict(self):
+        canvas.schedule_process_group(self.pg_test.component.id, False)
+        stale = canvas.get_processor(self.proc_2.id, 'id')
+        canvas.update_processor(stale, nifi.ProcessorConfigDTO(properties={"a": "1"}))
+        with self.assertRaises(ValueError) as context:
+            canvas.update_processor(stale, nifi.ProcessorConfigDTO(properties={"a": "2"}))
+        assert "not the most up-to-date revision" in str(context.exception)
+
+    def test_update_running(self):
+        # A running processor can not be updated
+        proc = canvas.get_processor(self.proc_2.id, 'id')
+        with self.assertRaises(ValueError):
+            canvas.update_processor(proc, nifi.ProcessorConfigDTO(properties={"a": "1"}))
+
+    def test_delete_all_connections(self):
+        canvas.schedule_process_group(self.pg_test.component.id, False)
+        stdout = io.StringIO()
+        with self.assertLogs("nipytest.canvas_extension", "INFO") as logs, contextlib.redirect_stdout(stdout):
+            deleted = canvas_ext.delete_all_connections(self.pg_test, workers=4)
+        assert len(deleted) == 4
+        assert canvas.list_all_connections(self.pg_test.component.id) == []
+        assert stdout.getvalue() == ""
+        assert "Deleted 4 connections" in logs.output[-1]
+
+    def test_latency(self):
+        self.fake.latency = 0.05
+        try:
+            start = time.perf_counter()
+            canvas.get_processor(self.proc_2.id, 'id')
+            assert time.perf_counter() - start >= 0.05
+        finally:
+            self.fake.latency = 0.0
+
+    def test_run_1_to_1(self):
+        for use_template in [True, False]:
+            test = Test1To1("fake 1 to 1", self.pg_test, port=free_port(), use_template=use_template)
+            test.add_input(self.proc_2)
+            test.add_output(self.proc_3)
+            with test:
+                result = test.run("Processor 2", FlowFile("Content", {"attribute1": "value1"}))
+                assert result.content == "Content"
+                assert result.attributes["test_input_name"] == "Processor 2"
+                assert result.attributes["test_output_name"] == "Processor 3"
+                assert int(result.attributes["test_duration"]) >= 0
+                # Only while the test is open
+                assert revision_cache.is_installed()
+
+                # An input without a route does not return
+                results = test.run_many([("Unknown input", FlowFile("Never routed"))], timeout=5)
+                assert results[0].output is None
+
+            assert not revision_cache.is_installed()
+            # The canvas is restored
+            assert len(canvas.list_all_process_groups(self.pg_test.component.id)) == 1
+            assert len(canvas.list_all_connections(self.pg_test.component.id, descendants=False)) == 4
+            assert all(proc.component.state == "RUNNING"
+                       for proc in canvas.get_flow(self.pg_test.id).process_group_flow.flow.processors)
+
+    def test_run_scoped(self):
+        test = Test1To1("fake scoped", self.pg_test, port=free_port(), scoped_scheduling=True)
+        test.add_input(self.proc_2)
+        test.add_output(self.proc_3)
+        result = test.run("Processor 2", FlowFile("Scoped content", {}))
+        assert result.content == "Scoped content"
+
+    def test_run_redirected(self):
+        connections = {connection.id: connection.component.destination.id
+                       for connection in canvas.list_all_connections(self.pg_test.component.id)}
+        for scoped_scheduling in [False, True]:
+            test = Test1To1("fake redirected", self.pg_test, port=free_port(), scoped_scheduling=scoped_scheduling,
+                            redirect_connections=True)
+            test.add_input(self.proc_2)
+            test.add_output(self.proc_3)
+            with test:
+                # Start -> parking port; Processor 3 -> test port, the duplicate to End 2 is deleted
+                destinations = {connection.id: connection.component.destination.name
+                                for connection in canvas.list_all_connections(self.pg_test.component.id)}
+                assert len(test.redirected_connections) == 2
+                assert sorted(destinations[connection.id] for connection in test.redirected_connections) == \
+                    ["Parked connections", "Processor 3"]
+                result = test.run("Processor 2", FlowFile("Redirected content", {}))
+                assert result.content == "Redirected content"
+
+            # The redirected connections keep their id
+            restored = {connection.id: connection.component.destination.id
+                        for connection in canvas.list_all_connections(self.pg_test.component.id)}
+            assert len(restored) == 4
+            assert len(set(restored.items()) & set(connections.items())) == 3
+            assert len(canvas.list_all_process_groups(self.pg_test.component.id)) == 1
+            assert all(proc.component.state == "RUNNING"
+                       for proc in canvas.get_flow(self.pg_test.id).process_group_flow.flow.processors)
+            connections = restored
+
+    def test_load(self):
+        test = Test1To1("fake load", self.pg_test, port=free_port())
+        test.add_input(self.proc_2)
+        test.add_output(self.proc_3)
+        # A connection is kept alive for every worker
+        with mock.patch.object(http_session, "create", wraps=http_session.create) as create:
+            report = test.load("Processor 2", FlowFile("Load", {}), rate=40, duration=0.5, workers=12)
+        assert create.call_args.kwargs["pool_size"] == 12
+        assert report.sent == 20
+        assert report.errors == 0
+
+    def test_load_unexpected_error(self):
+        test = Test1To1("fake load error", self.pg_test, port=free_port())
+        test.add_input(self.proc_2)
+        test.add_output(self.proc_3)
+        # Not one of the request failures the load test expects
+        with mock.patch.object(Test1To1, "_exchange", side_effect=KeyError("bug")):
+            with self.assertLogs(test.logger, "ERROR"):
+                report = test.load("Processor 2", FlowFile("Load", {}), rate=40, duration=0.25, workers=4)
+        assert report.sent == 10
+        assert report.errors == 10
+
+    def test_concurrent_instances(self):
+        # Instances of the same test, on different bases, with a port from the pool each
+        bases = [canvas.create_process_group(self.pg_test, "Base %d" % i, CANVAS_CENTER) for i in range(3)]
+        tests = []
+        for base in bases:
+            processor = self.create_processor("DebugFlow", "Flow", base)
+            test = Test1To1("fake concurrent", base)
+            test.add_input(processor)
+            test.add_output(processor)
+            tests.append(test)
+
+        def run(test):
+            with test:
+                return test.port, test.run("Flow", FlowFile(test.name, {})).content
+
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            results = list(executor.map(run, tests))
+        assert len(set(port for port, content in results)) == len(tests)
+        assert [content for port, content in results] == [test.name for test in tests]
+        assert len(set(test.name for test in tests)) == len(tests)
+        assert all(test.port is None for test in tests)
+
+    def test_open_without_journal(self):
+        test = Test1To1("fake no journal", self.pg_test)
+        test.add_input(self.proc_2)
+        test.add_output(self.proc_3)
+        with mock.patch.object(journal.Journal, "start", side_effect=OSError("Read-only file system")):
+            with self.assertRaises(OSError):
+                test.open()
+        # What was taken is released
+        self.assertIsNone(test.port)
+        self.assertEqual(port_pool.default_pool.in_use(), [])
+        self.assertFalse(revision_cache.is_installed())
+
+    def test_run_1_to_n(self):
+        test = Test1ToN("fake 1 to n", self.pg_test, port=free_port())
+        test.add_input(self.proc_2)
+        test.add_output(self.proc_end_1)
+        test.add_output(self.proc_end_2)
+        outputs = list(test.run("Processor 2", FlowFile("Content", {"attribute1": "value1"}), number_output_messages=2))
+        assert sorted(output.attributes["test_output_name"] for output in outputs) == ["End 1", "End 2"]
+        assert all(output.content == b"Content" for output in outputs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+import xml.etree.ElementTree as ElementTree
+from nipytest.flow_plan import FlowPlan, COMMENTS_PREFIX
+from nipytest.models.location import Location
+from nipytest import canvas_extension as canvas_ext
+
+
+class FlowPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.plan = FlowPlan()
+        self.context_id = self.plan.add_controller_service("http_context",
+                                                           canvas_ext.http_context_map_component("test"))
+        self.plan.add_processor("http_in", canvas_ext.request_handler_component(Location(), self.context_id, 8080))
+        self.plan.add_output_port("input:0", canvas_ext.test_input_component(Location(), "Processor 2"))
+        self.plan.connect("http_in", "input:0", ["success"])
+
+    def test_add(self):
+        self.assertEqual(self.plan.planned_id("http_context"), self.context_id)
+        self.assertEqual(self.plan.keys(), ["http_context", "http_in", "input:0"])
+        self.assertEqual(self.plan.kind("http_in"), "PROCESSOR")
+        self.assertEqual(self.plan.kind("input:0"), "OUTPUT_PORT")
+        with self.assertRaises(AssertionError):
+            self.plan.add_processor("http_in", canvas_ext.input_attribute_component(Location(), "duplicate"))
+
+    def test_connect(self):
+        # Processors have to specify their relationships
+        with self.assertRaises(AssertionError):
+            self.plan.connect("http_in", "input:0")
+        with self.assertRaises(AssertionError):
+            self.plan.connect("http_in", "unknown", ["success"])
+
+    def test_key_of(self):
+        self.assertEqual(self.plan.key_of(COMMENTS_PREFIX + "http_in"), "http_in")
+        self.assertIsNone(self.plan.key_of(COMMENTS_PREFIX + "unknown"))
+        self.assertIsNone(self.plan.key_of("user comments"))
+        self.assertIsNone(self.plan.key_of(None))
+
+    def test_to_template(self):
+        template = ElementTree.fromstring(self.plan.to_template("template name"))
+        self.assertEqual(template.find("name").text, "template name")
+
+        snippet = template.find("snippet")
+        processor = snippet.find("processors")
+        self.assertEqual(processor.find("config/comments").text, COMMENTS_PREFIX + "http_in")
+        self.assertEqual(processor.find("config/schedulingStrategy").text, "TIMER_DRIVEN")
+        self.assertEqual(processor.find("config/lossTolerant").text, "false")
+        properties = {entry.find("key").text: entry.find("value").text
+                      for entry in processor.findall("config/properties/entry")}
+        self.assertEqual(properties["HTTP Context Map"], self.context_id)
+
+        port = snippet.find("outputPorts")
+        self.assertEqual(port.find("type").text, "OUTPUT_PORT")
+        self.assertEqual(port.find("comments").text, COMMENTS_PREFIX + "input:0")
+
+        connection = snippet.find("connections")
+        self.assertEqual(connection.find("source/id").text, self.plan.planned_id("http_in"))
+        self.assertEqual(connection.find("destination/type").text, "OUTPUT_PORT")
+        self.assertEqual(connection.find("selectedRelationships").text, "success")
+
+
+if __name__ == "__main__":
+    unittest.main()
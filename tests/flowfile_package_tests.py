@@ -0,0 +1,62 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import io
+import unittest
+from nipytest import flowfile_package
+from nipytest.models.flowfile import FlowFile
+
+
+def packed(*flowfiles):
+    stream = io.BytesIO()
+    for flowfile in flowfiles:
+        flowfile_package.pack(flowfile, stream)
+    stream.seek(0)
+    return stream
+
+
+class FlowFilePackageTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        stream = packed(FlowFile("line 1\n\"quoted\"", {"test_output_name": "End 1"}),
+                        FlowFile(b"\x00\xff" * 10, {"test_output_name": "End 2", "empty": ""}),
+                        FlowFile(io.BytesIO(b"from file"), {}))
+
+        flowfiles = list(flowfile_package.unpack(stream))
+        self.assertEqual(len(flowfiles), 3)
+        self.assertEqual(flowfiles[0].content, "line 1\n\"quoted\"".encode("utf-8"))
+        self.assertEqual(flowfiles[0].attributes, {"test_output_name": "End 1"})
+        self.assertEqual(flowfiles[1].content, b"\x00\xff" * 10)
+        self.assertEqual(flowfiles[1].attributes, {"test_output_name": "End 2", "empty": ""})
+        self.assertEqual(flowfiles[2].content, b"from file")
+
+    def test_format(self):
+        stream = packed(FlowFile(b"ab", {"k": "v"}))
+        self.assertEqual(stream.getvalue(),
+                         b"NiFiFF3" + b"\x00\x01" + b"\x00\x01k" + b"\x00\x01v" + b"\x00" * 7 + b"\x02" + b"ab")
+
+    def test_long_values(self):
+        # Lengths from 0xFFFF on are written in 4 extra bytes
+        value = "x" * 0x10000
+        flowfile = next(flowfile_package.unpack(packed(FlowFile("", {"long": value}))))
+        self.assertEqual(flowfile.attributes["long"], value)
+
+    def test_spool(self):
+        content = bytes(range(256)) * 100
+        flowfile = next(flowfile_package.unpack(packed(FlowFile(content, {})), spool_max_size=1000))
+        # Large content is returned as file-like object
+        self.assertEqual(flowfile.read(), content)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(flowfile_package.unpack(io.BytesIO(b"[{\"flowfile\":\"\"}]")))
+        truncated = packed(FlowFile(b"content", {})).getvalue()[:-2]
+        with self.assertRaises(ValueError):
+            list(flowfile_package.unpack(io.BytesIO(truncated)))
+        self.assertEqual(list(flowfile_package.unpack(io.BytesIO(b""))), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
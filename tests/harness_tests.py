@@ -0,0 +1,40 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+from unittest import mock
+from nipyapi import nifi
+from nipytest.harness import TestHarness
+from nipytest.test_1_to_1 import Test1To1
+from nipytest.test_1_to_n import Test1ToN
+
+
+class IncompleteTest(TestHarness):
+    # Reads responses, but does not plan its outputs
+
+    def _read_response(self, response, stream_response=False):
+        return response.text
+
+
+class HarnessTest(unittest.TestCase):
+
+    def test_abstract(self):
+        # Fails before anything is changed on the canvas
+        with self.assertRaises(TypeError):
+            IncompleteTest("incomplete", nifi.ProcessGroupEntity())
+        with self.assertRaises(TypeError):
+            TestHarness("abstract", nifi.ProcessGroupEntity())
+
+    def test_failed_response(self):
+        # A failed response is closed, so its connection goes back to the pool
+        for harness in [Test1To1, Test1ToN]:
+            response = mock.Mock(status_code=503, reason="Service Unavailable")
+            with self.assertRaises(AssertionError):
+                harness("failed", nifi.ProcessGroupEntity())._read_response(response, stream_response=True)
+            response.close.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
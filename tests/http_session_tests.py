@@ -0,0 +1,41 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+from nipytest import http_session
+
+
+class HttpSessionTest(unittest.TestCase):
+
+    def tearDown(self):
+        http_session.configure(pool_size=http_session.DEFAULT_POOL_SIZE, retries=http_session.DEFAULT_RETRIES,
+                               backoff=http_session.DEFAULT_BACKOFF, keep_alive=True)
+
+    def test_get(self):
+        session = http_session.get("http://nifi:8081/test_a")
+        # Same host and port share a session
+        self.assertIs(http_session.get("http://nifi:8081/test_b"), session)
+        # Other port or scheme do not
+        self.assertIsNot(http_session.get("http://nifi:8082/test_a"), session)
+        self.assertIsNot(http_session.get("https://nifi:8081/test_a"), session)
+
+    def test_configure(self):
+        session = http_session.get("http://nifi:8081/test")
+        http_session.configure(pool_size=25, retries=1, keep_alive=False)
+
+        new_session = http_session.get("http://nifi:8081/test")
+        self.assertIsNot(new_session, session)
+        adapter = new_session.get_adapter("http://nifi:8081/test")
+        self.assertEqual(adapter._pool_maxsize, 25)
+        self.assertEqual(adapter.max_retries.connect, 1)
+        # Flowfiles that reached nifi are never posted twice
+        self.assertEqual(adapter.max_retries.read, 0)
+        self.assertEqual(new_session.headers["Connection"], "close")
+        self.assertEqual(http_session.settings(), {"pool_size": 25, "retries": 1, "keep_alive": False,
+                                                   "backoff": http_session.DEFAULT_BACKOFF})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import threading
+import unittest
+from nipyapi.nifi import ApiClient
+from nipytest import instrumentation
+from nipytest.instrumentation import CallRecord, Profile
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_enable(self):
+        # Listeners, e.g. the revision cache, may have wrapped the calls already
+        original = ApiClient.call_api
+        instrumentation.enable()
+        instrumentation.enable()  # Enabling twice does not wrap twice
+        self.assertTrue(instrumentation.is_enabled())
+        self.assertIs(ApiClient.call_api, instrumentation._call_api)
+        instrumentation.disable()
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIs(ApiClient.call_api, original)
+
+    def test_listener(self):
+        original = ApiClient.call_api
+        records = []
+        instrumentation.add_listener(records.append)
+        # Listeners are called without enabling
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIs(ApiClient.call_api, instrumentation._call_api)
+        instrumentation._notify(CallRecord("GET", "/processors/{id}", "build", 200, 0.010, 0, 1000))
+        instrumentation.remove_listener(records.append)
+        self.assertIs(ApiClient.call_api, original)
+        self.assertEqual(len(records), 1)
+
+    def test_phase(self):
+        self.assertEqual(instrumentation.current_phase(), instrumentation.NO_PHASE)
+        phases = []
+        with instrumentation.phase("build"):
+            self.assertEqual(instrumentation.current_phase(), "build")
+            # Other threads only get the phase when it is propagated
+            thread = threading.Thread(target=lambda: phases.append(instrumentation.current_phase()))
+            propagated = threading.Thread(
+                target=instrumentation.propagate(lambda: phases.append(instrumentation.current_phase())))
+            for t in [thread, propagated]:
+                t.start()
+                t.join()
+        self.assertEqual(instrumentation.current_phase(), instrumentation.NO_PHASE)
+        self.assertEqual(phases, [instrumentation.NO_PHASE, "build"])
+
+    def test_profile(self):
+        profile = Profile()
+        profile(CallRecord("GET", "/flow/process-groups/{id}", "build", 200, 0.010, 0, 1000))
+        profile(CallRecord("GET", "/flow/process-groups/{id}", "build", 200, 0.030, 0, 3000))
+        profile(CallRecord("POST", "/process-groups/{id}/processors", "build", 201, 0.050, 500, 2000))
+        profile(CallRecord("DELETE", "/connections/{id}", "teardown", 409, 0.005, 0, 100))
+
+        entries = profile.entries()
+        # Slowest first
+        self.assertEqual([entry["endpoint"] for entry in entries],
+                         ["/process-groups/{id}/processors", "/flow/process-groups/{id}", "/connections/{id}"])
+        self.assertEqual(entries[1]["count"], 2)
+        self.assertAlmostEqual(entries[1]["total_ms"], 40)
+        self.assertAlmostEqual(entries[1]["max_ms"], 30)
+        self.assertEqual(entries[1]["response_bytes"], 4000)
+        self.assertEqual(entries[2]["errors"], 1)
+        self.assertEqual(profile.phases()["build"]["count"], 3)
+        self.assertIn("/connections/{id}", profile.report())
+
+        profile.reset()
+        self.assertEqual(profile.entries(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from nipyapi import config, canvas
+from nipytest import journal, port_pool, revision_cache
+from nipytest.test_1_to_1 import Test1To1
+from fake_nifi_case import FakeNifiTestCase, CANVAS_CENTER
+
+
+def ended_pid():
+    # Id of a process that is not running anymore
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+class JournalTest(FakeNifiTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.environment = os.environ.get(journal.DIRECTORY_ENV)
+        os.environ[journal.DIRECTORY_ENV] = self.directory.name
+
+        super(JournalTest, self).setUp()
+        # Start -> Processor 2 -> End
+        self.proc_start, self.proc_2, self.proc_end = self.create_flow(
+            ["Start", "Processor 2", "End"], [("Start", "Processor 2"), ("Processor 2", "End")])
+
+    def tearDown(self):
+        super(JournalTest, self).tearDown()
+        if self.environment is None:
+            del os.environ[journal.DIRECTORY_ENV]
+        else:
+            os.environ[journal.DIRECTORY_ENV] = self.environment
+        self.directory.cleanup()
+
+    def crash(self, scoped_scheduling, redirect_connections=False):
+        # Opens a test and leaves it open, as if its process was killed
+        test = Test1To1("crashed", self.pg_test, scoped_scheduling=scoped_scheduling,
+                        redirect_connections=redirect_connections)
+        test.add_input(self.proc_2)
+        test.add_output(self.proc_2)
+        self.leave_open(test)
+        return test
+
+    def leave_open(self, test):
+        # Opens a test and leaves only its journal, as if its process was killed
+        test.open()
+        port_pool.default_pool.release(test.port, reusable=False)
+        revision_cache.uninstall()
+        test.journal.update(pid=ended_pid())
+
+    def assert_restored(self):
+        flow = canvas.get_flow(self.pg_test.id).process_group_flow.flow
+        self.assertEqual(len(flow.process_groups), 0)
+        self.assertEqual(len(flow.connections), 2)
+        self.assertTrue(all(proc.component.state == "RUNNING" for proc in flow.processors))
+
+    def test_journal(self):
+        test = Test1To1("journaled", self.pg_test)
+        test.add_input(self.proc_2)
+        test.add_output(self.proc_2)
+        with test:
+            entry = journal.Journal.load(test.journal.path).entry
+            self.assertEqual(entry["test_group_id"], test.test_group.id)
+            self.assertEqual(len(entry["test_connections"]), 2)
+            self.assertEqual(len(entry["removed_connections"]), 2)
+            self.assertEqual(len(entry["deleted_connection_ids"]), 2)
+            # The process is still running
+            self.assertEqual(journal.pending(), [])
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_recover(self):
+        for scoped_scheduling in [False, True]:
+            self.crash(scoped_scheduling)
+            self.assertFalse(revision_cache.is_installed())
+            self.assertEqual(len(journal.pending()), 1)
+            self.assertEqual(journal.recover(), [])
+            self.assert_restored()
+            self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_recover_redirected(self):
+        connections = set(connection.id for connection in canvas.list_all_connections(self.pg_test.component.id))
+        for scoped_scheduling in [False, True]:
+            test = self.crash(scoped_scheduling, redirect_connections=True)
+            self.assertEqual(len(test.redirected_connections), 2)
+            self.assertEqual(journal.recover(), [])
+            self.assert_restored()
+            self.assertEqual(set(connection.id for connection in canvas.list_all_connections(
+                self.pg_test.component.id)), connections)
+
+    def test_recover_failed_close(self):
+        connections = set(connection.id for connection in canvas.list_all_connections(self.pg_test.component.id))
+        for redirect_connections in [False, True]:
+            test = Test1To1("failing", self.pg_test, redirect_connections=redirect_connections)
+            test.add_input(self.proc_2)
+            test.add_output(self.proc_2)
+            test.open()
+            # The connections are restored, starting the base fails
+            with mock.patch.object(journal.Journal, "start_components", side_effect=ValueError("Failed")):
+                with self.assertRaises(ValueError):
+                    test.close()
+            self.assertFalse(test.is_open)
+            self.assertIsNone(test.port)
+            test.close()
+
+            self.assertEqual(journal.recover(), [])
+            self.assert_restored()
+            restored = set(connection.id for connection in canvas.list_all_connections(self.pg_test.component.id))
+            if redirect_connections:
+                self.assertEqual(restored, connections)
+            connections = restored
+
+    def test_recover_many(self):
+        # Tests on different bases, restored in one pass
+        bases = [canvas.create_process_group(self.pg_test, "Base %d" % i, CANVAS_CENTER) for i in range(3)]
+        for base in bases:
+            start, flow = self.create_flow(["In", "Flow"], [("In", "Flow")], base)
+            test = Test1To1("crashed", base)
+            test.add_input(flow)
+            test.add_output(flow)
+            self.leave_open(test)
+
+        self.assertEqual(journal.main(["--host", config.nifi_config.host]), 0)
+        for base in bases:
+            flow = canvas.get_flow(base.id).process_group_flow.flow
+            self.assertEqual(len(flow.process_groups), 0)
+            self.assertEqual(len(flow.connections), 1)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_recover_orphaned(self):
+        # The journal of a crashed test is lost; its group is found by name and owner
+        with mock.patch.object(journal, "owner", return_value=json.dumps({"machine": socket.gethostname(),
+                                                                          "pid": ended_pid()})):
+            test = self.crash(False)
+        test.journal.finish()
+        self.assertTrue(test.name.startswith(journal.TEST_GROUP_PREFIX))
+        self.assertEqual([group.id for group in journal.orphaned_groups()], [test.test_group.id])
+
+        # Groups of tests that are still open are kept
+        running = Test1To1("open", self.pg_test)
+        running.add_input(self.proc_end)
+        running.add_output(self.proc_end)
+        with running:
+            self.assertEqual(journal.recover(), [])
+            groups = canvas.get_flow(self.pg_test.id).process_group_flow.flow.process_groups
+            self.assertEqual([group.id for group in groups], [running.test_group.id])
+        self.assertEqual(canvas.get_flow(self.pg_test.id).process_group_flow.flow.process_groups, [])
+
+    def test_is_running(self):
+        self.assertTrue(journal._is_running(os.getpid()))
+        pid = ended_pid()
+        self.assertFalse(journal._is_running(pid))
+        # Unless it can be checked, a process runs
+        with mock.patch.object(journal.os, "name", "unknown"):
+            self.assertTrue(journal._is_running(pid))
+
+    def test_recover_other_host(self):
+        self.crash(False).journal.update(host="http://elsewhere:8080/nifi-api")
+        self.assertEqual(journal.pending(), [])
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,9 @@ Created on 22 Feb 2019
 
 @author: Frank Ypma
 """
+import io
+import os
+import tempfile
 import unittest
 from nipytest.models.flowfile import FlowFile
 
@@ -11,7 +14,31 @@ class TestFlowFile(unittest.TestCase):
 
     def test_init(self):
         FlowFile("content", {"attribute1": "value1"})
-        
+        assert FlowFile("content").attributes == {}
+        with self.assertRaises(AssertionError):
+            FlowFile(1, {})
+
+    def test_binary_content(self):
+        assert FlowFile(b"\x00\x01", {}).read() == b"\x00\x01"
+        assert FlowFile(io.BytesIO(b"\x00\x01"), {}).read() == b"\x00\x01"
+        assert FlowFile(iter([b"\x00", b"\x01"]), {}).read() == b"\x00\x01"
+        assert FlowFile("content", {}).read() == b"content"
+
+    def test_from_file(self):
+        handle, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(b"\x00" * 1000)
+            with FlowFile.from_file(path, {"attribute1": "value1"}) as msg:
+                assert msg.read() == b"\x00" * 1000
+            with FlowFile.from_file(path, memory_map=True) as msg:
+                # A memory-mapped file can be posted repeatedly
+                assert bytes(msg.body()) == b"\x00" * 1000
+                assert bytes(msg.body()) == b"\x00" * 1000
+                assert str(msg) == "{'content': '<1000 bytes>', 'attributes': {}}"
+        finally:
+            os.remove(path)
+
     def test_to_string(self):
         msg = FlowFile("content '", {"attribute1": "value1"})
         assert msg.__str__() == "{'content': 'content \'', 'attributes': {'attribute1': 'value1'}}"
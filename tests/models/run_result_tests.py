@@ -0,0 +1,32 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+import requests
+from nipytest.models.flowfile import FlowFile
+from nipytest.models.run_result import RunResult
+
+
+class TestRunResult(unittest.TestCase):
+
+    def test_ok(self):
+        result = RunResult("input", FlowFile("content", {}), FlowFile("output", {}))
+        assert result.ok
+        assert not result.timed_out
+
+    def test_timed_out(self):
+        result = RunResult("input", FlowFile("content", {}), error=requests.exceptions.ReadTimeout())
+        assert not result.ok
+        assert result.timed_out
+
+    def test_error(self):
+        result = RunResult("input", FlowFile("content", {}), error=AssertionError())
+        assert not result.ok
+        assert not result.timed_out
+
+
+if __name__ == "__main__":
+    # import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import socket
+import unittest
+from unittest import mock
+from nipytest import port_pool
+from nipytest.port_pool import PortPool
+
+
+def free_ports(number):
+    # A range of consecutive ports nothing listens on
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        first = s.getsockname()[1]
+    return range(first, first + number)
+
+
+class PortPoolTest(unittest.TestCase):
+
+    def test_acquire(self):
+        pool = PortPool(free_ports(3))
+        ports = [pool.acquire("127.0.0.1") for _ in range(3)]
+        self.assertEqual(sorted(ports), list(pool.ports))
+        self.assertEqual(pool.in_use(), list(pool.ports))
+        with self.assertRaises(ValueError):
+            pool.acquire("127.0.0.1")
+
+        pool.release(ports[1])
+        self.assertEqual(pool.acquire("127.0.0.1"), ports[1])
+
+    def test_reuse_released(self):
+        pool = PortPool(free_ports(3))
+        port = pool.acquire("127.0.0.1")
+        pool.release(port)
+        # A released port is handed out again without checking it
+        with mock.patch.object(port_pool, "accepts_connections") as accepts_connections:
+            self.assertEqual(pool.acquire("127.0.0.1"), port)
+            accepts_connections.assert_not_called()
+            pool.release(port, reusable=False)
+            accepts_connections.return_value = False
+            self.assertNotEqual(pool.acquire("127.0.0.1"), port)
+            accepts_connections.assert_called_once_with("127.0.0.1", mock.ANY, port_pool.LOOPBACK_PROBE_TIMEOUT)
+
+    def test_skip_listening(self):
+        # A port something listens on is not handed out
+        with socket.socket() as listening:
+            listening.bind(("127.0.0.1", 0))
+            listening.listen()
+            port = listening.getsockname()[1]
+            pool = PortPool(range(port, port + 1))
+            with self.assertRaises(ValueError):
+                pool.acquire("127.0.0.1")
+            self.assertEqual(pool.in_use(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
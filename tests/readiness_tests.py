@@ -0,0 +1,47 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+from nipyapi import nifi, canvas
+from nipytest import canvas_extension as canvas_ext
+from nipytest import readiness
+from nipytest.models.location import Location
+from fake_nifi_case import FakeNifiTestCase, free_port
+
+
+class ReadinessTest(FakeNifiTestCase):
+
+    def setUp(self):
+        super(ReadinessTest, self).setUp()
+        # HandleHttpRequest -> HandleHttpResponse
+        self.port = free_port()
+        self.http_context = canvas_ext.create_http_context_map(self.pg_test, "Context")
+        self.http_in = canvas_ext.create_request_handler(self.pg_test, Location(), self.http_context, self.port)
+        self.http_out = canvas_ext.create_response_handler(self.pg_test, Location(), self.http_context)
+        canvas_ext.connect(self.pg_test.id, self.http_in, self.http_out, ["success"])
+
+    def test_ready(self):
+        canvas_ext.schedule_process_group(self.pg_test.id, True)
+        self.assertEqual(readiness.wait_until_ready([self.pg_test.id], "127.0.0.1", self.port), 1)
+
+    def test_start_idle(self):
+        # A component that was not started with its group is started
+        canvas_ext.schedule_process_group(self.pg_test.id, True)
+        canvas_ext.schedule_processor(canvas.get_processor(self.http_out.id, 'id'), False)
+        self.assertEqual(readiness.wait_until_ready([self.pg_test.id], "127.0.0.1", self.port), 2)
+        self.assertEqual(canvas.get_processor(self.http_out.id, 'id').component.state, "RUNNING")
+
+    def test_timeout(self):
+        # Not started: the HandleHttpRequest does not listen. A disabled component is not waited for
+        for processor in [self.http_in, self.http_out]:
+            nifi.ProcessorsApi().update_run_status(id=processor.id, body=nifi.ProcessorRunStatusEntity(
+                revision=canvas.get_processor(processor.id, 'id').revision, state="DISABLED"))
+        with self.assertRaises(ValueError) as context:
+            readiness.wait_until_ready([self.pg_test.id], "127.0.0.1", self.port, timeout=0.2)
+        self.assertIn("port %d" % self.port, str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import requests
+import unittest
+from nipyapi import nifi
+from nipytest import canvas_extension as canvas_ext
+from nipytest import instrumentation
+from nipytest import revision_cache
+from nipytest.instrumentation import CallRecord
+from nipytest.revision_cache import RevisionCache
+from fake_nifi_case import FakeNifiTestCase
+
+
+def processor(processor_id, version, group_id):
+    return nifi.ProcessorEntity(id=processor_id, revision=nifi.RevisionDTO(version=version),
+                                component=nifi.ProcessorDTO(id=processor_id, parent_group_id=group_id))
+
+
+def connection(connection_id, version, group_id):
+    return nifi.ConnectionEntity(id=connection_id, revision=nifi.RevisionDTO(version=version),
+                                 source_type="PROCESSOR", destination_type="PROCESSOR",
+                                 component=nifi.ConnectionDTO(id=connection_id, parent_group_id=group_id))
+
+
+def process_group(group_id, version, parent_id):
+    return nifi.ProcessGroupEntity(id=group_id, revision=nifi.RevisionDTO(version=version),
+                                   component=nifi.ProcessGroupDTO(id=group_id, parent_group_id=parent_id))
+
+
+class RevisionCacheTest(unittest.TestCase):
+
+    def test_learn(self):
+        cache = RevisionCache()
+        flow = nifi.ProcessGroupFlowEntity(process_group_flow=nifi.ProcessGroupFlowDTO(id="base", flow=nifi.FlowDTO(
+            processors=[processor("p1", 3, "base")],
+            process_groups=[process_group("child", 1, "base")],
+            connections=[connection("c1", 2, "base")])))
+        cache.learn(flow)
+        cache.learn(processor("p2", 1, "child"))
+        self.assertEqual(len(cache), 4)
+        self.assertEqual(cache.get("p1").version, 3)
+        self.assertEqual(cache.get("c1").version, 2)
+
+        # An older revision does not replace a newer one
+        cache.update("p1", nifi.RevisionDTO(version=2))
+        self.assertEqual(cache.get("p1").version, 3)
+
+        # Starting the base raises the revisions of the processors in it and in its child groups
+        cache(CallRecord("PUT", "/flow/process-groups/{id}", "-", 200, 0.0, 0, 0,
+                         nifi.ScheduleComponentsEntity(id="base", state="RUNNING")))
+        for component_id in ["p1", "p2"]:
+            self.assertIsNone(cache.get(component_id))
+            self.assertTrue(cache.is_outdated(component_id))
+        self.assertEqual(cache.get("c1").version, 2)
+        self.assertEqual(cache.get("child").version, 1)
+
+        # A deleted component is forgotten; a failed call is ignored
+        cache(CallRecord("DELETE", "/connections/{id}", "-", 409, 0.0, 0, 0, None))
+        self.assertEqual(cache.get("c1").version, 2)
+        cache(CallRecord("DELETE", "/connections/{id}", "-", 200, 0.0, 0, 0, connection("c1", 2, "base")))
+        self.assertIsNone(cache.get("c1"))
+        self.assertFalse(cache.is_outdated("c1"))
+
+
+class InstallTest(unittest.TestCase):
+
+    def test_install(self):
+        listener = instrumentation.ApiClient.call_api
+        revision_cache.install()
+        revision_cache.install()
+        revision_cache.uninstall()
+        # Installed until every install is undone
+        self.assertTrue(revision_cache.is_installed())
+        revision_cache.uninstall()
+        self.assertFalse(revision_cache.is_installed())
+        self.assertIs(instrumentation.ApiClient.call_api, listener)
+        revision_cache.uninstall()
+        self.assertFalse(revision_cache.is_installed())
+
+
+class RevisionRetryTest(FakeNifiTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(RevisionRetryTest, cls).setUpClass()
+        revision_cache.install()
+
+    @classmethod
+    def tearDownClass(cls):
+        revision_cache.uninstall()
+        super(RevisionRetryTest, cls).tearDownClass()
+
+    def setUp(self):
+        super(RevisionRetryTest, self).setUp()
+        self.processor = self.create_processor("DebugFlow", "Processor")
+        self.calls = []
+        instrumentation.add_listener(self.calls.append)
+
+    def tearDown(self):
+        instrumentation.remove_listener(self.calls.append)
+        super(RevisionRetryTest, self).tearDown()
+
+    def methods(self):
+        return [call.method for call in self.calls]
+
+    def test_cached_revision(self):
+        # The revision of the first update is used for the second, without fetching the processor
+        canvas_ext.update_processor(self.processor, nifi.ProcessorConfigDTO(properties={"a": "1"}))
+        updated = canvas_ext.update_processor(self.processor, nifi.ProcessorConfigDTO(properties={"a": "2"}))
+        self.assertEqual(updated.component.config.properties["a"], "2")
+        self.assertEqual(self.methods(), ["PUT", "PUT"])
+
+    def test_retry(self):
+        # Changed by another client: the update is retried once with the fetched revision
+        canvas_ext.update_processor(self.processor, nifi.ProcessorConfigDTO(properties={"a": "1"}))
+        other_client = requests.put(self.fake.url + "/processors/" + self.processor.id, json={
+            "revision": {"version": 2}, "component": {"id": self.processor.id, "name": "Renamed"}})
+        self.assertEqual(other_client.status_code, 200)
+        self.calls.clear()
+        updated = canvas_ext.update_processor(self.processor, nifi.ProcessorConfigDTO(properties={"a": "2"}))
+        self.assertEqual(updated.component.config.properties["a"], "2")
+        self.assertEqual(self.methods(), ["PUT", "GET", "PUT"])
+        self.assertEqual([call.status for call in self.calls], [409, 200, 200])
+
+    def test_outdated(self):
+        # Starting the group raises the revision of the processor; it is fetched before stopping it
+        canvas_ext.update_processor(self.processor, nifi.ProcessorConfigDTO(auto_terminated_relationships=[
+            "success", "failure"]))
+        canvas_ext.schedule_process_group(self.pg_test.id, True)
+        self.calls.clear()
+        stopped = canvas_ext.schedule_processor(self.processor, False)
+        self.assertEqual(stopped.component.state, "STOPPED")
+        self.assertEqual(self.methods(), ["GET", "PUT"])
+
+    def test_no_conflict(self):
+        # A conflict that is not caused by the revision is not retried
+        canvas_ext.update_processor(self.processor, nifi.ProcessorConfigDTO(auto_terminated_relationships=[
+            "success", "failure"]))
+        canvas_ext.schedule_processor(self.processor, True)
+        self.calls.clear()
+        with self.assertRaises(nifi.rest.ApiException) as context:
+            canvas_ext.update_processor(self.processor, nifi.ProcessorConfigDTO(properties={"a": "1"}))
+        self.assertEqual(context.exception.status, 409)
+        self.assertEqual(self.methods(), ["PUT", "GET"])
+        canvas_ext.schedule_processor(self.processor, False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from nipytest import runner, worker
+
+# Test module for the runner; every test records the worker it ran in
+SAMPLE_TESTS: str = '''
+import os
+import unittest
+
+
+class Sample{0}Test(unittest.TestCase):
+
+    def test_worker(self):
+        self.assertIsNotNone(os.environ.get("NIPYTEST_WORKER"))
+
+    def test_fail(self):
+        self.assertEqual({0}, 0)
+'''
+
+
+# Test module that ends its worker process
+EXITING_TESTS: str = '''
+import os
+import unittest
+
+
+class ExitingTest(unittest.TestCase):
+
+    def test_exit(self):
+        os._exit(3)
+'''
+
+
+class RunnerTest(unittest.TestCase):
+
+    def test_shard(self):
+        classes = {"a.A": 5, "b.B": 3, "c.C": 2, "d.D": 1}
+        self.assertEqual(runner.shard(classes, 2), [["a.A", "d.D"], ["b.B", "c.C"]])
+        self.assertEqual(runner.shard(classes, 1), [["a.A", "b.B", "c.C", "d.D"]])
+        # No empty workers
+        self.assertEqual(len(runner.shard({"a.A": 1}, 4)), 1)
+
+    def test_worker(self):
+        with mock.patch.dict(os.environ, {worker.XDIST_WORKER_ENV: "gw2", worker.XDIST_WORKERS_ENV: "4",
+                                          worker.XDIST_RUN_ENV: "0123456789"}):
+            self.assertEqual(worker.index(), 2)
+            self.assertEqual(worker.count(), 4)
+            self.assertEqual(worker.share(range(18000, 19000)), range(18500, 18750))
+            self.assertEqual(worker.sandbox_name(), "nipytest_01234567_2")
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(3):
+                with open(os.path.join(directory, "sample_%d_tests.py" % i), "w") as file:
+                    file.write(SAMPLE_TESTS.format(i))
+            stream = io.StringIO()
+            results = runner.run(directory, "*_tests.py", workers=2, stream=stream)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(sum(result.tests_run for result in results), 6)
+        self.assertEqual(sum(len(result.errors) for result in results), 0)
+        failures = [test_id for result in results for test_id, traceback in result.failures]
+        self.assertEqual(len(failures), 2)
+        self.assertIn("Ran 6 tests", stream.getvalue())
+        self.assertIn("FAILED (failures=2)", stream.getvalue())
+
+    def test_run_worker_died(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "surviving_tests.py"), "w") as file:
+                file.write(SAMPLE_TESTS.format(0))
+            with open(os.path.join(directory, "exiting_tests.py"), "w") as file:
+                file.write(EXITING_TESTS)
+            stream = io.StringIO()
+            with mock.patch.object(runner, "RESULT_POLL_DELAY", 0.1):
+                results = runner.run(directory, "*_tests.py", workers=2, stream=stream)
+
+        # The other worker still reports
+        self.assertEqual([result.tests_run for result in results], [2, 0])
+        self.assertEqual([result.was_successful() for result in results], [True, False])
+        self.assertEqual([test_id for test_id, reason in results[1].errors], ["exiting_tests.ExitingTest"])
+        self.assertIn("exit code 3", results[1].errors[0][1])
+        self.assertIn("FAILED (errors=1)", stream.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
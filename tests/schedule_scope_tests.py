@@ -0,0 +1,56 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+from nipyapi import nifi
+from nipytest.connection_index import ConnectionIndex
+from nipytest.schedule_scope import ScheduleScope
+
+
+def processor(processor_id):
+    return nifi.ProcessorEntity(id=processor_id, component=nifi.ProcessorDTO(id=processor_id, parent_group_id="pg"))
+
+
+def connection(connection_id, source_id, destination_id, destination_type="PROCESSOR", destination_group_id="pg"):
+    return nifi.ConnectionEntity(id=connection_id, source_id=source_id, source_group_id="pg",
+                                 destination_id=destination_id, destination_group_id=destination_group_id,
+                                 source_type="PROCESSOR", destination_type=destination_type)
+
+
+class ScheduleScopeTest(unittest.TestCase):
+
+    def setUp(self):
+        # start -> proc2 -> funnel -> proc3 -> end, proc2 -> child port -> child, unrelated -> end
+        self.connections = [
+            connection("c1", "start", "proc2"),
+            connection("c2", "proc2", "funnel", "FUNNEL"),
+            connection("c3", "funnel", "proc3"),
+            connection("c4", "proc3", "end"),
+            connection("c5", "proc2", "port", "INPUT_PORT", "child_pg"),
+            connection("c6", "port", "child", "PROCESSOR", "child_pg"),
+            connection("c7", "unrelated", "end")
+        ]
+        self.index = ConnectionIndex(self.connections)
+
+    def test_reachable(self):
+        scope = ScheduleScope.reachable(self.index, [processor("proc2")], [processor("proc3")])
+        self.assertEqual(scope.components, {
+            "proc2": "pg",
+            "proc3": "pg",
+            "port": "child_pg",
+            "child": "child_pg"
+        })
+
+    def test_endpoints(self):
+        scope = ScheduleScope.endpoints([self.connections[0], self.connections[1]])
+        self.assertEqual(scope.components, {"start": "pg", "proc2": "pg"})
+
+    def test_union(self):
+        scope = ScheduleScope({"proc2": "pg"}).union(ScheduleScope({"port": "child_pg"}))
+        self.assertEqual(scope.components, {"proc2": "pg", "port": "child_pg"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Created on 17 Oct 2026
+
+@author: Frank Ypma
+"""
+import unittest
+from nipytest.models.flowfile import FlowFile
+from nipytest.statistics import Histogram, RunStatistics
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 100000)
+        self.assertEqual(histogram.min, 1)
+        self.assertEqual(histogram.max, 100000)
+        self.assertAlmostEqual(histogram.mean(), 50000.5)
+        # Values are kept with 2 significant digits
+        for percentile, expected in [(50, 50000), (90, 90000), (99, 99000)]:
+            self.assertAlmostEqual(histogram.value_at_percentile(percentile), expected, delta=expected / 100)
+        self.assertEqual(histogram.value_at_percentile(100), 100000)
+
+    def test_exact_small_values(self):
+        histogram = Histogram()
+        for value in range(100):
+            histogram.record(value)
+        self.assertEqual(histogram.value_at_percentile(50), 49)
+
+    def test_highest_trackable_value(self):
+        histogram = Histogram(highest_trackable_value=1000)
+        histogram.record(5000)
+        self.assertEqual(histogram.max, 1000)
+
+    def test_merge(self):
+        histogram = Histogram()
+        other = Histogram()
+        histogram.record(10)
+        other.record(1000, count=3)
+        histogram.merge(other)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.min, 10)
+        self.assertEqual(histogram.value_at_percentile(50), 1000)
+
+    def test_empty(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.value_at_percentile(50))
+        self.assertIsNone(histogram.mean())
+
+
+class RunStatisticsTest(unittest.TestCase):
+
+    def test_summary(self):
+        statistics = RunStatistics()
+        statistics.record_round_trip(0.25)
+        statistics.record_output(FlowFile("", {"test_duration": "120"}))
+        statistics.record_output(FlowFile("", {}))
+        statistics.record_error()
+        statistics.record_error(timed_out=True)
+
+        summary = statistics.summary()
+        self.assertEqual(summary["runs"], 3)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["timeouts"], 1)
+        self.assertAlmostEqual(summary["round_trip_ms"]["p50"], 250, delta=2.5)
+        self.assertEqual(summary["flow_ms"]["count"], 1)
+        self.assertAlmostEqual(summary["flow_ms"]["max"], 120)
+        self.assertIn("round_trip", statistics.report())
+
+        statistics.reset()
+        self.assertEqual(statistics.summary()["runs"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
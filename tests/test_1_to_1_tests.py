@@ -121,6 +121,85 @@ class Test1To1Test(unittest.TestCase):
         # Check if connections were built again; there should be 3 now
         assert len(canvas.list_all_connections(Test1To1Test.pg_test.component.id, descendants=False)) == 3
 
+    def test_run_stream(self):
+        content_bytes = bytes(range(256)) * 4096  # 1 MB of binary content
+
+        # Content is posted in chunks and the output is spooled instead of read into memory
+        message = FlowFile(iter([content_bytes[i:i + 65536] for i in range(0, len(content_bytes), 65536)]),
+                           {"attribute1": "value1"})
+        result = Test1To1Test.test.run("Processor 2", message, stream_response=True)
+        with result:
+            assert result.read() == content_bytes
+
+    def test_run_open(self):
+        with Test1To1Test.test as test:
+            # The test process group should stay on the canvas between runs
+            assert len(canvas.list_all_process_groups(Test1To1Test.pg_test.component.id)) == 2
+            for i in range(3):
+                content_string = "Message " + str(i)
+                result = test.run("Processor 2", FlowFile(content_string, {"attribute1": "value1"}))
+                assert result.content == content_string
+                assert len(canvas.list_all_process_groups(Test1To1Test.pg_test.component.id)) == 2
+
+        assert not Test1To1Test.test.is_open
+        assert len(canvas.list_all_process_groups(Test1To1Test.pg_test.component.id)) == 1  # Only counting self
+        assert len(canvas.list_all_connections(Test1To1Test.pg_test.component.id, descendants=False)) == 3
+
+    def test_run_many(self):
+        cases = [("Processor 2", FlowFile("Message " + str(i), {"attribute1": "value1"})) for i in range(5)]
+        cases.append(("Unknown input", FlowFile("Never routed", {})))
+
+        results = Test1To1Test.test.run_many(cases, timeout=2)
+        # Results are returned in the order of the cases
+        assert len(results) == 6
+        for i in range(5):
+            assert results[i].ok
+            assert results[i].output.content == "Message " + str(i)
+        # A case that does not return does not abort the batch
+        assert results[5].timed_out
+
+        assert len(canvas.list_all_process_groups(Test1To1Test.pg_test.component.id)) == 1  # Only counting self
+
+    def test_run_many_concurrent(self):
+        cases = [("Processor 2", FlowFile("Message " + str(i), {"attribute1": "value1"})) for i in range(20)]
+
+        Test1To1Test.test.statistics.reset()
+        results = Test1To1Test.test.run_many(cases, workers=8)
+        # Every output should be matched to its own input
+        for i in range(20):
+            assert results[i].ok
+            assert results[i].output.content == "Message " + str(i)
+            assert len(results[i].output.attributes['test_correlation_id']) > 0
+        # Every run is in the statistics
+        summary = Test1To1Test.test.statistics.summary()
+        assert summary["round_trip_ms"]["count"] == 20
+        assert summary["flow_ms"]["count"] == 20
+        print(Test1To1Test.test.statistics.report())
+
+    def test_load(self):
+        flowfiles = (FlowFile("Message " + str(i), {"attribute1": "value1"}) for i in range(1000))
+        report = Test1To1Test.test.load("Processor 2", flowfiles, rate=10, duration=3)
+
+        print(report)
+        assert report.sent == 30
+        assert report.completed + report.errors + report.timeouts == 30
+        assert report.completed > 0
+        assert report.summary()["latency_ms"]["p99"] > 0
+        assert len(canvas.list_all_process_groups(Test1To1Test.pg_test.component.id)) == 1  # Only counting self
+
+    def test_run_scoped(self):
+        test = Test1To1("testing the scoped tester", Test1To1Test.pg_test, scoped_scheduling=True)
+        test.add_input(Test1To1Test.proc_2)
+        test.add_output(Test1To1Test.proc_3)
+
+        content_string = "This is the content of the scoped test message"
+        result = test.run("Processor 2", FlowFile(content_string, {"attribute1": "value1"}))
+        assert result.content == content_string
+
+        # Components that were running before the test should be running again
+        for proc in [Test1To1Test.proc_start, Test1To1Test.proc_2, Test1To1Test.proc_3, Test1To1Test.proc_end]:
+            assert canvas.get_processor(proc.id, 'id').component.state == "RUNNING"
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -119,9 +119,11 @@ class Test1ToNTest(unittest.TestCase):
         content_string = "This is the content of the test message"
 
         message = FlowFile(content_string, {"attribute1": "value1"})
-        result = test.run("Processor 2", message)
+        results = list(test.run("Processor 2", message))
         # Check result
-        assert result.content == content_string
+        assert len(results) == 1
+        result = results[0]
+        assert result.content == content_string.encode("utf-8")
         assert result.attributes['test_input_name'] == self.proc_2.component.name
         assert result.attributes['test_output_name'] == self.proc_3.component.name
         assert int(result.attributes['test_start_time']) > 0